@@ -1,21 +1,15 @@
 from flask import Flask
-from flask_restful import Api
-from .extensions import db
+from .extensions import db, migrate
 from .config import Config
-from flask_cors import CORS
 import logging
 from .services.database_service import DatabaseService
 from .extensions import make_celery
 
 
+def _celery_config():
+    from kombu import Queue
 
-def create_app():
-    # Configure logging first
-    Config.configure_logging()
-    
-    app = Flask(__name__)
-    app.config.from_object(Config)
-    app.config["CELERY"] = {
+    return {
         'broker_url': Config.CELERY_BROKER_URL,
         'result_backend': Config.CELERY_RESULT_BACKEND,
         'accept_content': Config.CELERY_ACCEPT_CONTENT,
@@ -23,14 +17,77 @@ def create_app():
         'result_serializer': Config.CELERY_RESULT_SERIALIZER,
         'timezone': Config.CELERY_TIMEZONE,
         'enable_utc': True,
-        'include': ['app.worker.tasks']
+        'include': ['app.worker.tasks'],
+        # Keep the queue based logging configured by create_app
+        'worker_hijack_root_logger': False,
+        'task_queues': [Queue(name) for name in Config.CELERY_QUEUE_CONCURRENCY],
+        'task_default_queue': 'interactive',
+        # Priority 0 is served first; it only orders tasks within a queue
+        'task_routes': {
+            'app.worker.tasks.run_single_file_scan': {'queue': 'interactive', 'priority': 0},
+            'app.worker.tasks.rescan_scan_result': {'queue': 'interactive', 'priority': 3},
+            'app.worker.tasks.index_batch_peers': {'queue': 'bulk', 'priority': 5},
+            'app.worker.tasks.scan_batch_file': {'queue': 'bulk', 'priority': 5},
+            'app.worker.tasks.process_outbox_events': {'queue': 'indexing', 'priority': 5},
+            'app.worker.tasks.compact_storage': {'queue': 'maintenance', 'priority': 9},
+            'app.worker.tasks.rebuild_boilerplate': {'queue': 'maintenance', 'priority': 9}
+        },
+        'broker_transport_options': {
+            'queue_order_strategy': 'priority',
+            'priority_steps': list(range(10)),
+            'sep': ':'
+        },
+        'beat_schedule': {
+            'compact-storage': {
+                'task': 'app.worker.tasks.compact_storage',
+                'schedule': Config.COMPACTION_INTERVAL
+            },
+            'rebuild-boilerplate': {
+                'task': 'app.worker.tasks.rebuild_boilerplate',
+                'schedule': Config.BOILERPLATE_REBUILD_INTERVAL
+            }
+        }
     }
-    CORS(app, resources={r"/*": {"origins": "*"}})
 
+
+def _check_celery_tasks(config):
+    """Fail at startup when a route or beat entry names a task that is not registered"""
+    from .extensions import celery
+    from .worker import tasks  # noqa: F401, registers the tasks
+
+    names = set(config['task_routes']) | {entry['task'] for entry in config['beat_schedule'].values()}
+    missing = sorted(name for name in names if name not in celery.tasks)
+    if missing:
+        raise RuntimeError(f"Celery tasks routed or scheduled but not registered: {', '.join(missing)}")
+
+
+def _create_base_app():
+    # Configure logging first
+    Config.configure_logging()
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config["CELERY"] = _celery_config()
     make_celery(app)
 
     # Initialize database
     db.init_app(app)
+    migrate.init_app(app, db)
+    DatabaseService(db)
+
+    # Register the models with SQLAlchemy; the schema itself is created by `flask db upgrade`
+    from . import models
+    _check_celery_tasks(app.config["CELERY"])
+
+    return app
+
+
+def create_app():
+    from flask_cors import CORS
+    from flask_restful import Api
+
+    app = _create_base_app()
+    CORS(app, resources={r"/*": {"origins": "*"}})
 
     # Import routes after db initialization to avoid circular imports
     from .api.routes import initialize_routes
@@ -38,18 +95,9 @@ def create_app():
     api = Api(app)
 
     initialize_routes(api)
-    DatabaseService(db)
 
-    # Create database tables
-    with app.app_context():
-        # Import models here to register them with SQLAlchemy
-        from .models.document import Document
-        from .models.scan_result import ScanResult
-        from .models.scan_resource import ScanResource
-        from .models.scan_status import ScanStatus
-        from .models.user import User
-        
-        db.create_all()
+    from .cli import register_commands
+    register_commands(app)
 
     # Log application startup
     logger = logging.getLogger(__name__)
@@ -57,3 +105,10 @@ def create_app():
     logger.info(f"Database connected to: {app.config['SQLALCHEMY_DATABASE_URI']}")
 
     return app
+
+
+def create_worker_app():
+    """App for Celery workers and beat: database and Celery only, no routes or CLI commands"""
+    app = _create_base_app()
+    logging.getLogger(__name__).info("PlagCheck worker app started")
+    return app
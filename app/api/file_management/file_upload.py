@@ -6,6 +6,10 @@ from app.models import OutboxEvent
 from app.services.file_service import FileService
 from app.services.solr_service import SolrService
 from app.services.database_service import DatabaseService
+from app.services.minhash_service import MinHashService
+from app.services.extraction_service import ExtractionService
+from app.services.admission_service import AdmissionService
+from app.config import Config
 from app.outbox_publisher.publisher import OutboxEventPublisher
 from app.worker.tasks import process_outbox_events
 
@@ -21,6 +25,9 @@ class SingleFileUpload(Resource):
         self.solr_service = SolrService()
         self.db_service = DatabaseService()
         self.outbox_publisher = OutboxEventPublisher(self.db_service)
+        self.minhash_service = MinHashService()
+        self.extraction_service = ExtractionService()
+        self.admission_service = AdmissionService()
 
     def post(self):
         description = request.form.get('description', '')
@@ -34,6 +41,10 @@ class SingleFileUpload(Resource):
         if not file.filename or research_name == '' or description == '':
             return {"status": 0,"data": None,"message": "Nhập thiếu dữ liệu: tên nghiên cứu, mô tả hoặc tên tệp"}, 400
 
+        rejection = self.admission_service.admit_upload(self.db_service)
+        if rejection:
+            return rejection.response()
+
         content = file.read()
         sha1_file = FileService.calculate_sha1(content)
         file.seek(0)
@@ -45,7 +56,18 @@ class SingleFileUpload(Resource):
             msg = f"Tài liệu {file.filename} đã tồn tại trong cơ sở dữ liệu"
             return {"status": 0, "data": None, "message": msg}, 400
 
+        # Check for re-saved or re-exported copies of an existing document: one extraction, a vectorised
+        # signature and an LSH band lookup, so the uploader learns about it before getting a 202
+        signature = None
+        if Config.NEAR_DUPLICATE_CHECK:
+            signature = self._compute_signature(file.filename, content, file.mimetype)
+            duplicates = self.minhash_service.find_near_duplicates(signature)
+            if duplicates:
+                msg = f"Tài liệu {file.filename} gần trùng với tài liệu {duplicates[0]['fileName']} đã tồn tại trong cơ sở dữ liệu"
+                return {"status": 0, "data": {"duplicates": duplicates}, "message": msg}, 409
+
         file_path = None
+        document = None
 
         try:
             file_path = FileService.save_original_file(file, sha1_file, file.filename)
@@ -61,6 +83,9 @@ class SingleFileUpload(Resource):
                 file_path=file_path
             )
 
+            if signature:
+                self.minhash_service.index_document(document.id, signature)
+
             outbox_payload = {
                 "sha1_file": sha1_file,
                 "filename": file.filename,
@@ -114,3 +139,11 @@ class SingleFileUpload(Resource):
                 "data": None,
                 "message": "Lỗi trong khi xử lý tệp"
             }, 500
+
+    def _compute_signature(self, filename, content, mimetype):
+        """Extract the text of an upload and compute its MinHash signature"""
+        try:
+            return self.minhash_service.compute_signature(self.extraction_service.extract(filename, content, mimetype))
+        except Exception as e:
+            logger.warning(f"Skipping near-duplicate check for {filename}: {e}")
+            return None
@@ -1,21 +1,47 @@
+import json
+import time
 import logging
-from flask import request
+from flask import request, Response, stream_with_context
 from flask_restful import Resource
 from ..services.database_service import DatabaseService
+from ..services.report_renderer import ReportRenderer
+from ..services.wire_format import WireFormat
+from ..services.scan_result_cache import ScanResultCache
+from ..services.progress_service import ProgressReporter, TERMINAL_STAGES
+from ..config import Config
+from ..worker.tasks import rescan_scan_result
 logger = logging.getLogger(__name__)
 
 class FileScanResult(Resource):
     def __init__(self):
         self.db_service = DatabaseService()
+        self.result_cache = ScanResultCache()
 
     def get(self):
         try:
-            scan_status_id = int(request.args.get('scan_status_id'))
+            # Missing or non-numeric ids come back as None and are refused below with a 400
+            scan_status_id = request.args.get('scan_status_id', type=int)
+            output_format = request.args.get('format', 'default').lower()
+            # Superseded versions are read back from the archive table
+            version = request.args.get('version', type=int)
             # Validate scan_status_id
             if not scan_status_id or scan_status_id <= 0:
                 raise ValueError("ID quét không hợp lệ")
+            if output_format not in WireFormat.FORMATS:
+                raise ValueError("Định dạng kết quả không hợp lệ")
+            if version is not None and version <= 0:
+                raise ValueError("Phiên bản kết quả không hợp lệ")
 
-            scan_result = self.db_service.get_scan_result_by_scan_status_id(scan_status_id)
+            # Stored result versions never change: answer from Redis when the client or the cache has it
+            etag, generation = self.result_cache.get_etag(scan_status_id, version, output_format)
+            if etag:
+                if request.if_none_match.contains(etag):
+                    return self._with_etag(Response(status=304), etag)
+                body = self.result_cache.get(etag)
+                if body is not None:
+                    return self._with_etag(WireFormat.gzip_body_response(body, 200), etag)
+
+            scan_result = self.db_service.get_scan_result_by_scan_status_id(scan_status_id, version=version)
 
             if not scan_result:
                 return {
@@ -24,11 +50,21 @@ class FileScanResult(Resource):
                     "message": "Không tìm thấy lịch sử quét cho tài liệu này"
                 }, 404
 
-            return {
+            if output_format == 'compact':
+                scan_result["output_data"] = WireFormat.apply_format(scan_result["output_data"], output_format)
+
+            body = WireFormat.serialize({
                 "status": 1,
                 "data": scan_result,
                 "message": "Lấy lịch sử quét thành công"
-            }, 200
+            })
+            etag = ScanResultCache.make_etag(scan_result["id"], scan_result["version"], output_format)
+            gzipped = self.result_cache.put(scan_status_id, version, output_format, etag, body, generation)
+            if request.if_none_match.contains(etag):
+                return self._with_etag(Response(status=304), etag)
+            if gzipped is not None:
+                return self._with_etag(WireFormat.gzip_body_response(gzipped, 200), etag)
+            return self._with_etag(WireFormat.body_response(body, 200), etag)
 
         except ValueError as e:
             return {
@@ -44,6 +80,57 @@ class FileScanResult(Resource):
                 "message": str(e)
             }, 500
 
+    @staticmethod
+    def _with_etag(response, etag):
+        response.set_etag(etag)
+        # Let the browser keep the result but revalidate it on every use
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class FileScanReport(Resource):
+    def __init__(self):
+        self.db_service = DatabaseService()
+
+    def get(self):
+        try:
+            # Missing or non-numeric ids come back as None and are refused below with a 400
+            scan_status_id = request.args.get('scan_status_id', type=int)
+            fmt = request.args.get('format', 'markdown').lower()
+            if not scan_status_id or scan_status_id <= 0:
+                raise ValueError("ID quét không hợp lệ")
+            if fmt not in ReportRenderer.FORMATS:
+                raise ValueError("Định dạng báo cáo không hợp lệ")
+
+            scan_result = self.db_service.get_scan_result_by_scan_status_id(scan_status_id)
+
+            if not scan_result:
+                return {
+                    "status": 0,
+                    "data": None,
+                    "message": "Không tìm thấy lịch sử quét cho tài liệu này"
+                }, 404
+
+            renderer = ReportRenderer.from_scan_result(scan_result)
+            return Response(
+                stream_with_context(renderer.render(fmt)),
+                mimetype=ReportRenderer.MIMETYPES[fmt]
+            )
+
+        except ValueError as e:
+            return {
+                "status": 0,
+                "data": None,
+                "message": str(e)
+            }, 400
+        except Exception as e:
+            logger.error(f"Error rendering scan report: {str(e)}")
+            return {
+                "status": 0,
+                "data": None,
+                "message": str(e)
+            }, 500
+
 
 class FileScanList(Resource):
     def __init__(self):
@@ -60,7 +147,7 @@ class FileScanList(Resource):
             # Calculate offset
             offset = (page - 1) * per_page
 
-            # Get documents with pagination
+            # Get documents with pagination; one item per document
             documents = self.db_service.get_documents_with_scan_status(
                 limit=per_page,
                 offset=offset
@@ -72,7 +159,7 @@ class FileScanList(Resource):
                     "items": documents,
                     "page": page,
                     "per_page": per_page,
-                    "total": len(documents)
+                    "total": self.db_service.count_documents()
                 },
                 "message": "Lấy danh sách tài liệu thành công"
             }, 200
@@ -90,3 +177,197 @@ class FileScanList(Resource):
                 "data": None,
                 "message": str(e)
             }, 500
+
+
+
+class FileScanCancel(Resource):
+    def __init__(self):
+        self.db_service = DatabaseService()
+
+    def post(self):
+        try:
+            data = request.get_json(silent=True) or request.form
+            batch_id = data.get('batch_id')
+            scan_status_id = data.get('scan_status_id')
+
+            if not batch_id and not scan_status_id:
+                raise ValueError("Cần cung cấp batch_id hoặc scan_status_id")
+            if scan_status_id is not None:
+                scan_status_id = int(scan_status_id)
+
+            cancelled_ids = self.db_service.cancel_scans(batch_id=batch_id, scan_status_id=scan_status_id)
+
+            return {
+                "status": 1,
+                "data": {
+                    "cancelled_scan_status_ids": cancelled_ids
+                },
+                "message": f"Đã hủy {len(cancelled_ids)} lượt quét"
+            }, 200
+
+        except ValueError as e:
+            return {
+                "status": 0,
+                "data": None,
+                "message": str(e)
+            }, 400
+        except Exception as e:
+            logger.error(f"Error cancelling scans: {str(e)}")
+            return {
+                "status": 0,
+                "data": None,
+                "message": str(e)
+            }, 500
+
+
+class FileScanProgress(Resource):
+    """Live progress of scans from Redis; ?stream=true pushes changes as server-sent events"""
+    # Scans without progress in Redis (queued, or finished a while ago) are described by their status
+    DB_STAGES = {'pending': 'queued', 'processing': 'processing'}
+
+    def __init__(self):
+        self.db_service = DatabaseService()
+
+    def get(self):
+        try:
+            ids = [i.strip() for i in request.args.get('scan_status_ids', '').split(',') if i.strip()]
+            if not ids or not all(i.isdigit() and int(i) > 0 for i in ids):
+                raise ValueError("ID quét không hợp lệ")
+            scan_status_ids = [int(i) for i in ids]
+            if len(scan_status_ids) > Config.SCAN_PROGRESS_MAX_IDS:
+                raise ValueError(f"Tối đa {Config.SCAN_PROGRESS_MAX_IDS} lượt quét mỗi yêu cầu")
+            scan_status_ids = list(dict.fromkeys(scan_status_ids))
+
+            if request.args.get('stream', 'false').lower() == 'true':
+                if not self.streaming_supported():
+                    raise ValueError("Luồng tiến độ chỉ hỗ trợ trên dịch vụ chạy gevent, vui lòng truy vấn định kỳ")
+                return Response(
+                    stream_with_context(self.stream(scan_status_ids)),
+                    mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+                )
+
+            return {
+                "status": 1,
+                "data": self.read(scan_status_ids),
+                "message": "Lấy tiến độ quét thành công"
+            }, 200
+
+        except ValueError as e:
+            return {
+                "status": 0,
+                "data": None,
+                "message": str(e)
+            }, 400
+        except Exception as e:
+            logger.error(f"Error getting scan progress: {str(e)}")
+            return {
+                "status": 0,
+                "data": None,
+                "message": str(e)
+            }, 500
+
+    @staticmethod
+    def streaming_supported() -> bool:
+        """A stream holds its worker until it ends; only gevent workers serve other requests meanwhile"""
+        try:
+            from gevent import monkey
+        except ImportError:
+            return False
+        return monkey.is_module_patched('socket')
+
+    def read(self, scan_status_ids):
+        progress = ProgressReporter.get_scan_progress(scan_status_ids)
+        missing = [i for i, p in progress.items() if p is None]
+        if missing:
+            states = self.db_service.get_scan_status_states(missing)
+            for scan_status_id in missing:
+                status = states.get(scan_status_id)
+                progress[scan_status_id] = None if status is None else {
+                    "stage": self.DB_STAGES.get(status, status),
+                    "samples_total": None,
+                    "samples_done": None,
+                    "percent": 100.0 if status == 'completed' else None,
+                    "eta_seconds": None,
+                    "updated_at": None
+                }
+        return {str(scan_status_id): p for scan_status_id, p in progress.items()}
+
+    def stream(self, scan_status_ids):
+        """Send the progress of every scan, then each change, until all are finished or the stream times out"""
+        deadline = time.monotonic() + Config.SCAN_PROGRESS_STREAM_TIMEOUT
+        sent = {}
+        last_event = time.monotonic()
+        while True:
+            progress = self.read(scan_status_ids)
+            for scan_status_id, p in progress.items():
+                if p != sent.get(scan_status_id):
+                    sent[scan_status_id] = p
+                    last_event = time.monotonic()
+                    yield f"event: progress\ndata: {json.dumps({'scan_status_id': int(scan_status_id), **(p or {})})}\n\n"
+
+            if all(p is None or p["stage"] in TERMINAL_STAGES for p in progress.values()):
+                yield "event: end\ndata: {}\n\n"
+                return
+            if time.monotonic() >= deadline:
+                # The client reconnects (EventSource does so by itself) and gets the current state again
+                yield "event: timeout\ndata: {}\n\n"
+                return
+            if time.monotonic() - last_event >= Config.SCAN_PROGRESS_STREAM_KEEPALIVE:
+                last_event = time.monotonic()
+                yield ": keepalive\n\n"
+            time.sleep(Config.SCAN_PROGRESS_INTERVAL)
+
+
+class FileScanRescan(Resource):
+    def __init__(self):
+        self.db_service = DatabaseService()
+
+    def post(self):
+        try:
+            data = request.get_json(silent=True) or request.form
+            scan_status_id = int(data.get('scan_status_id', 0))
+            if scan_status_id <= 0:
+                raise ValueError("ID quét không hợp lệ")
+
+            scan_status = self.db_service.get_scan_status(scan_status_id)
+            if not scan_status or not self.db_service.get_latest_scan_result(scan_status_id):
+                return {
+                    "status": 0,
+                    "data": None,
+                    "message": "Không tìm thấy lịch sử quét cho tài liệu này"
+                }, 404
+
+            if scan_status.status in ('pending', 'processing'):
+                return {
+                    "status": 0,
+                    "data": None,
+                    "message": "Tài liệu đang được quét, vui lòng thử lại sau"
+                }, 409
+
+            self.db_service.update_scan_status(scan_status_id=scan_status_id, status='pending')
+            # Replace the progress of the previous run
+            ProgressReporter.for_scan(scan_status_id).stage('queued', total=0)
+            rescan_scan_result.delay(scan_status_id)
+
+            return {
+                "status": 1,
+                "data": {
+                    "scan_status_id": scan_status_id
+                },
+                "message": "Đã bắt đầu quét bổ sung với các tài liệu mới"
+            }, 202
+
+        except ValueError as e:
+            return {
+                "status": 0,
+                "data": None,
+                "message": str(e)
+            }, 400
+        except Exception as e:
+            logger.error(f"Error starting re-scan: {str(e)}")
+            return {
+                "status": 0,
+                "data": None,
+                "message": str(e)
+            }, 500
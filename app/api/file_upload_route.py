@@ -1,4 +1,3 @@
-import re
 import logging
 import requests
 from flask import request
@@ -7,17 +6,22 @@ from ..config import Config
 from ..services.file_service import FileService
 from ..services.solr_service import SolrService
 from ..services.database_service import DatabaseService
-from openpyxl import load_workbook
-from io import BytesIO
-import datetime
-import threading
+from ..services.scan_service import ScanService, ScanError
+from ..services.scan_job_service import ScanJobService
+from ..services.wire_format import WireFormat
+from ..services.manifest_service import ManifestService, ManifestError
+from ..services.admission_service import AdmissionService
+from ..services.profiling_service import ScanProfiler
+from ..worker.tasks import run_single_file_scan, scan_batch_file, index_batch_peers
+import uuid
 import os
+import contextlib
 from flask import send_file
-from ..utils import Utils
-import pysolr
 
 logger = logging.getLogger(__name__)
 
+SAMPLING_MODES = ('full', 'adaptive')
+
 
 """
 Author: Khanh Trong Do
@@ -36,7 +40,7 @@ class SingleFileUpload(Resource):
         author = request.form.get('author', '')
         file = request.files.get('file')
 
-        logger.info(f"Received file upload request for {file.filename} with research name '{research_name}'")
+        logger.info("Received file upload request for %s with research name '%s'", file.filename, research_name)
 
 
         resources_created = {
@@ -62,7 +66,7 @@ class SingleFileUpload(Resource):
             }, 400
 
 
-        logger.info(f"Processing file: {file.filename}")
+        logger.info("Processing file: %s", file.filename)
 
 
         content = file.read()
@@ -152,7 +156,6 @@ class SingleFileUpload(Resource):
             try:
                 if resources_created['solr']:
                     if self.solr_service.delete_file(sha1_file):
-                        self.solr_service.commit_changes()
                         logger.info(f"Solr entry deleted during rollback for hash: {sha1_file}")
                 if resources_created['local_file']:
                     FileService.delete_file(resources_created['local_file'])
@@ -203,262 +206,16 @@ class DownloadExcelSample(Resource):
 
 class MultipleFileSearch(Resource):
     def __init__(self):
-        self.solr_service = SolrService()
         self.db_service = DatabaseService()
-        from .. import create_app
-        self.app = create_app()
-
-    def process_single_file(self, file_info, expmin, expmax, multisource, document_id):
-        """
-        Process a single file for plagiarism detection
-        """
-        
-        with self.app.app_context():
-
-            scan_status_id = None
-            try:
-                file_name = file_info['file_name']
-                file_content = file_info['file_content']
-                file_mimetype = file_info['file_mimetype']
-                description = file_info.get('description', '')
-                logger.info(f"Processing file in thread: {file_name}")
-
-                # Create a scan status record for this document
-                scan_status = self.db_service.create_scan_status(
-                    document_id=document_id,
-                    status='processing'
-                )
-
-                scan_status_id = scan_status.id
-                
-                # Read file content
-                content = file_content
-                sha1_file = FileService.calculate_sha1(content)
-                description = file_info.get('description', '')
-
-                logger.info(f"Uploading file {file_name} to Solr")
-
-
-                is_in_solr = False
-                check_response = requests.get(f"{Config.SOLR_URL}/query?q=id:{sha1_file}")
-                if check_response.status_code == 200:
-                    result = check_response.json()
-                    if result.get("response", {}).get("numFound", 0) > 0:
-                        is_in_solr = True
-                        logger.info(f"Document {file_name} already exists in Solr with hash: {sha1_file}")
-
-                if not is_in_solr:
-                    upload_response = self.solr_service.upload_file(
-                        sha1_file=sha1_file,
-                        filename=file_name,
-                        content=content,
-                        mimetype=file_mimetype,
-                        description=description,
-                        overwrite="false"
-                    )
-
-                    if upload_response.status_code != 200:
-                        error_msg = f"Failed to upload file to Solr: {file_name}. Status code: {upload_response.status_code}"
-                        logger.error(error_msg)
-                        self.db_service.update_scan_status(scan_status_id=scan_status_id, status='failed')
-                        return
-
-                    upload_result = upload_response.json()
-                    if upload_result.get("responseHeader", {}).get("status", 0) != 0:
-                        error_msg = f"Failed to upload file to Solr: {file_name}. Solr response status: {upload_result.get('responseHeader', {}).get('status', 'unknown')}"
-                        logger.error(error_msg)
-                        self.db_service.update_scan_status(scan_status_id=scan_status_id, status='failed')
-                        return
-
-                    # Commit the changes to make sure the file is available for extraction
-                    commit_result = self.solr_service.commit_changes()
-                    if not commit_result:
-                        error_msg = "Failed to commit changes to Solr"
-                        logger.error(error_msg)
-                        self.db_service.update_scan_status(scan_status_id=scan_status_id, status='failed')
-                        return
-
-                # Extract text using Solr
-                response = self.solr_service.extract_text(file_name, content, file_mimetype)
-
-                if response.status_code != 200:
-                    logger.error(f"Failed to extract text from {file_name}")
-                    self.db_service.update_scan_status(scan_status_id=scan_status_id, status='failed')
-                    return
-
-                result = response.json()
-                if result.get("responseHeader", {}).get("status", 0) != 0:
-                    logger.error(f"Solr extraction error for {file_name}")
-                    self.db_service.update_scan_status(scan_status_id=scan_status_id, status='failed')
-                    return
-
-                document = result.get('file', "")
-                rows = 10 if multisource else 1
-
-                # Initialize metrics for plagiarism detection
-                sources = {}
-                words_doctotal = len(document.split())
-                words_scanned = 0
-                words_copied = 0
-                chars_doctotal = len(document)
-                chars_scanned = 0
-                chars_copied = 0
-                samples_scanned = 0
-                samples_copied = 0
-                current_sources = None
-                output = []
-
-                # Split document into lines and process for plagiarism
-                lines = [line.strip() for line in document.split('\n') if line.strip()]
-
-                for line_num, text in enumerate(lines, 1):
-                    while True:
-                        match = re.search(r'(\S*\w\S*([\s.,-]+|$)+){' + str(expmin) + ',' + str(expmax) + '}', text)
-                        if not match:
-                            break
-                        sample = match.group(0).strip()
-                        possample = match.start()
-
-                        presample = text[:possample]
-                        text = text[possample + len(sample):]
-
-                        samples_scanned += 1
-                        words_in_sample = len(sample.split())
-                        words_scanned += words_in_sample
-                        chars_scanned += len(sample)
-
-                        output.append({"type": "text", "content": presample})
-
-                        # Search for matches in Solr
-                        data = {
-                            "q": f'"{Utils.escape_solr_text(sample)}" AND NOT id:"{sha1_file}"',
-                            "fl": "id,resource_name,description",
-                            "rows": rows
-                        }
-                        response = requests.post(f"{Config.SOLR_URL}/query", data=data)
-                        result = response.json()
-
-                        if result.get("response", {}).get("numFound", 0) > 0:
-                            samples_copied += 1
-                            words_copied += words_in_sample
-                            chars_copied += len(sample)
-                            new_sources = {}
-
-                            for doc in result["response"]["docs"]:
-                                source_id = doc["id"]
-                                sources[source_id] = sources.get(source_id, {
-                                    "color": source_id[:6],
-                                    "name": doc.get("resource_name", ["Unknown"])[0],
-                                    "description": doc.get("description", [""])[0],
-                                    "words": 0,
-                                    "samples": 0
-                                })
-                                sources[source_id]["words"] += words_in_sample
-                                sources[source_id]["samples"] += 1
-                                new_sources[source_id] = True
-
-                            if current_sources != new_sources:
-                                current_sources = new_sources
-                                for source_id in new_sources:
-                                    output.append({
-                                        "type": "marker",
-                                        "id": f"{sha1_file}_{source_id}",
-                                        "color": sources[source_id]["color"],
-                                        "name": sources[source_id]["name"]
-                                    })
-
-                            output.append({
-                                "type": "highlight",
-                                "content": sample
-                            })
-                        else:
-                            output.append({"type": "text", "content": sample})
-
-                    output.append({"type": "text", "content": text})
-                    output.append({"type": "br"})
-
-                # Calculate ratios
-                chars_original = chars_scanned - chars_copied
-                chars_original_ratio = chars_original / chars_scanned if chars_scanned else 0
-                words_original = words_scanned - words_copied
-                words_original_ratio = words_original / words_scanned if words_scanned else 0
-                samples_original = samples_scanned - samples_copied
-                samples_original_ratio = samples_original / samples_scanned if samples_scanned else 0
-
-                # Sort sources by words
-                sorted_sources = sorted(sources.items(), key=lambda x: x[1]["words"], reverse=True)
-
-                # Create metrics and parameters dictionaries
-                metrics = {
-                    "chars_doctotal": chars_doctotal,
-                    "chars_scanned": chars_scanned,
-                    "chars_original": chars_original,
-                    "chars_copied": chars_copied,
-                    "chars_original_ratio": chars_original_ratio,
-                    "words_doctotal": words_doctotal,
-                    "words_scanned": words_scanned,
-                    "words_original": words_original,
-                    "words_copied": words_copied,
-                    "words_original_ratio": words_original_ratio,
-                    "samples_scanned": samples_scanned,
-                    "samples_original": samples_original,
-                    "samples_copied": samples_copied,
-                    "samples_original_ratio": samples_original_ratio
-                }
-
-                parameters = {
-                    "exp_min": expmin,
-                    "exp_max": expmax,
-                    "multi_source": multisource
-                }
-
-                # Create result object with output data
-                output_data = {
-                    "filename": file_name,
-                    "output": output
-                }
-
-                # Create scan result in database
-                scan_result = self.db_service.create_scan_result(
-                    status_id=scan_status_id,
-                    metrics=metrics,
-                    parameters=parameters,
-                    output_data=output_data
-                )
-
-                # Create scan resources records for sources
-                sources_list = [
-                    {
-                        "id": source_id,
-                        "color": info["color"],
-                        "name": info["name"],
-                        "description": info["description"],
-                        "words": info["words"],
-                        "samples": info["samples"]
-                    } for source_id, info in sorted_sources
-                ]
-
-                self.db_service.create_scan_resources(scan_result.id, sources_list)
-
-                # Mark scan as completed
-                self.db_service.update_scan_status(
-                scan_status_id=scan_status_id,
-                status='completed',
-                finished_date=datetime.datetime.utcnow()
-                )
-
-                logger.info(f"Successfully processed file: {file_name}")
+        self.admission_service = AdmissionService()
 
-            except Exception as e:
-                logger.error(f"Error processing file {file_info['file'].filename}: {str(e)}")
-                if 'scan_status_id' in locals():
-                    self.db_service.update_scan_status(scan_status_id=scan_status_id, status='failed')
     def post(self):
         files = request.files.getlist('files')
-        excel = request.files.get('excel')
+        manifest_file = request.files.get('manifest') or request.files.get('excel')
         expmin = int(request.form.get('expmin', '3'))
         expmax = int(request.form.get('expmax', '5'))
         multisource = request.form.get('multisource', 'false').lower() == 'true'
+        sampling_mode = request.form.get('sampling', Config.SCAN_SAMPLING_MODE)
 
         if expmin < 1 or expmax < expmin:
             return {
@@ -467,6 +224,13 @@ class MultipleFileSearch(Resource):
                 "message": "Giá trị expmin hoặc expmax không hợp lệ"
             }, 400
 
+        if sampling_mode not in SAMPLING_MODES:
+            return {
+                "status": 0,
+                "data": None,
+                "message": "Chế độ lấy mẫu không hợp lệ"
+            }, 400
+
         if not files:
             return {
                 "status": 0,
@@ -481,61 +245,65 @@ class MultipleFileSearch(Resource):
                 "message": "Một hoặc nhiều tệp không có tên"
             }, 400
 
-        if excel:
-            if not excel.filename.endswith(('.xlsx', '.xls')):
-                return {
-                    "status": 0,
-                    "data": None,
-                    "message": "Tệp Excel phải có định dạng .xlsx"
-                }, 400
-        else:
+        if not manifest_file:
             return {
                 "status": 0,
                 "data": None,
                 "message": "Tệp Excel không được cung cấp"
             }, 400
 
+        rejection = self.admission_service.admit_scan(AdmissionService.estimate_samples(files=len(files)), queued=True)
+        if rejection:
+            return rejection.response()
+
+        # Profiles are stored under each scan status id
+        profile = ScanProfiler.is_admin_request()
+
         try:
-            file_stream = BytesIO(excel.read())
-            workbook = load_workbook(file_stream)
-            sheet = workbook.active
+            manifest = ManifestService.parse(manifest_file.filename, manifest_file.stream)
+        except ManifestError as e:
+            return {
+                "status": 0,
+                "data": None,
+                "message": str(e)
+            }, 400
 
-            search_data = []
+        try:
+            matched, unmatched_files = ManifestService.match(manifest, [file.filename for file in files])
 
+            search_data = []
             for file in files:
-                file_matched = False
-                for row in sheet.iter_rows(min_row=2, values_only=True):
-                    if row[0] and row[1] and row[0] == file.filename:
-                        # Found a match in the Excel file
-                        file_info = {
-                            'file': file,
-                            'research_name': row[1],
-                            'description': row[2] if len(row) > 2 and row[2] else ''
-                        }
-                        search_data.append(file_info)
-                        file_matched = True
-                        logger.info(f"Matched file {file.filename} with Excel data")
-                        break
-
-                if not file_matched:
-                    logger.warning(f"No matching entry in Excel for file: {file.filename}")
+                entry = matched.get(file.filename)
+                if entry:
+                    search_data.append({
+                        'file': file,
+                        'research_name': entry['research_name'],
+                        'description': entry['description']
+                    })
+
+            if unmatched_files:
+                logger.warning(f"No matching manifest entry for files: {', '.join(unmatched_files)}")
 
             if not search_data:
                 return {
                     "status": 0,
-                    "data": None,
+                    "data": {
+                        "unmatched_files": unmatched_files,
+                        "duplicate_entries": manifest["duplicates"]
+                    },
                     "message": "Không có tệp nào khớp với dữ liệu trong tệp Excel"
                 }, 400
 
             logger.info(f"Successfully matched {len(search_data)} files with Excel data")
 
             # Save each file to DB with pending status and create documents
+            batch_id = str(uuid.uuid4())
             document_ids = []
             new_documents = []
             existing_documents = []
 
 
-            for file_info in search_data:
+            for i, file_info in enumerate(search_data):
                 file = file_info['file']
                 content = file.read()
                 file_info['file_content'] = content
@@ -547,14 +315,18 @@ class MultipleFileSearch(Resource):
 
                 existing_document = self.db_service.get_document_by_hash(sha1_file)
                 if existing_document:
-                    # Document already exists, use its ID
+                    # Document already exists, use its ID; the worker scans a temporary copy of the upload
+                    file_info['file_path'] = FileService.save_scan_job_file(
+                        file_info['file_content'], f"{batch_id}-{i}", file_info['file_name']
+                    )
+                    file_info['delete_file'] = True
                     document_ids.append(existing_document.id)
                     existing_documents.append({
                         'id': existing_document.id,
                         'filename': file_info['file_name'],
                         'hash': sha1_file
                     })
-                    logger.info(f"Document {file_info['file_name']} already exists in database with ID: {existing_document.id}")
+                    logger.info("Document %s already exists in database with ID: %s", file_info['file_name'], existing_document.id)
                 else:
                     # Save the original file to disk
                     file_path = FileService.save_original_file(file, sha1_file, file_info['file_name'])
@@ -567,45 +339,62 @@ class MultipleFileSearch(Resource):
                         mimetype=file_info['file_mimetype'],
                         file_size=len(file_info['file_content'])
                     )
+                    file_info['file_path'] = file_path
+                    file_info['delete_file'] = False
                     document_ids.append(document.id)
                     new_documents.append({
                         'id': document.id,
                         'filename': file_info['file_name'],
                         'hash': sha1_file
                     })
-                    logger.info(f"Created new document for {file_info['file_name']} with ID: {document.id}")
+                    logger.info("Created new document for %s with ID: %s", file_info['file_name'], document.id)
                 
                 file.close()  # Close the file stream after saving
             
-            # Process each file in separate threads sequentially
-            threads = []
-            for i, file_info in enumerate(search_data):
-                thread = threading.Thread(
-                    target=self.process_single_file,
-                    args=(file_info, expmin, expmax, multisource, document_ids[i])
+            # Queue a scan for every file so the whole batch can be cancelled
+            scan_status_ids = [
+                self.db_service.create_scan_status(document_id=document_id, status='pending', batch_id=batch_id).id
+                for document_id in document_ids
+            ]
+
+            from celery import chain
+
+            # Scan the files one after another on the bulk queue, so each file is indexed before the next is scanned
+            peer_check = Config.BATCH_PEER_CHECK and 1 < len(search_data) <= Config.BATCH_PEER_MAX_FILES
+            tasks = [
+                scan_batch_file.si(
+                    scan_status_ids[i], document_ids[i], file_info['file_path'], file_info['file_name'],
+                    file_info['file_mimetype'], file_info['description'], expmin, expmax, multisource,
+                    sampling_mode, file_info['delete_file'], profile, batch_id if peer_check else None
                 )
-                threads.append(thread)
-
-            # Create a thread coordinator to run threads sequentially
-            def run_threads_sequentially():
-                for i, thread in enumerate(threads):
-                    logger.info(f"Starting thread for processing file: {search_data[i]['file'].filename}")
-                    thread.start()
-                    thread.join()  # Wait for thread to complete before starting the next one
-                logger.info("All file processing threads completed")
-
-            # Start the coordinator thread
-            coordinator = threading.Thread(target=run_threads_sequentially)
-            coordinator.daemon = True
-            coordinator.start()
+                for i, file_info in enumerate(search_data)
+            ]
+            # Files of the batch copied from each other are found whatever their order
+            if peer_check:
+                tasks.insert(0, index_batch_peers.si(batch_id, [
+                    {
+                        "scan_status_id": scan_status_ids[i],
+                        "file_path": file_info['file_path'],
+                        "filename": file_info['file_name'],
+                        "mimetype": file_info['file_mimetype'],
+                        "description": file_info['description']
+                    }
+                    for i, file_info in enumerate(search_data)
+                ]))
+            chain(*tasks).apply_async()
 
             return {
                 "status": 1,
                 "data": {
+                    "batch_id": batch_id,
+                    "scan_status_ids": scan_status_ids,
                     "document_ids": document_ids,
                     "new_documents": new_documents,
                     "existing_documents": existing_documents,
-                    "matched_files": [item['file'].filename for item in search_data]
+                    "matched_files": [item['file'].filename for item in search_data],
+                    "unmatched_files": unmatched_files,
+                    "duplicate_entries": manifest["duplicates"],
+                    "skipped_rows": manifest["skipped_rows"]
                 },
                 "message": f"Đã tìm thấy {len(search_data)} tệp và bắt đầu phân tích. Vui lòng kiểm tra trạng thái sau."
             }, 200
@@ -622,172 +411,17 @@ class MultipleFileSearch(Resource):
 class SingleFileSearch(Resource):
     def __init__(self):
         self.solr_service = SolrService()
-
-    def process_document_optimized(self, document, sha1_file, expmin, expmax, multisource):
-
-        samples_with_positions = []
-        lines = [line.strip() for line in document.split('\n') if line.strip()]
-
-        # Extract all samples with proper positioning
-        for line_num, text in enumerate(lines, 1):
-            line_start = 0
-            while True:
-                match = re.search(r'(\S*\w\S*([\s.,-]+|$)+){' + str(expmin) + ',' + str(expmax) + '}', text[line_start:])
-                if not match:
-                    break
-
-                sample = match.group(0).strip()
-                sample = self._clean_search_sample(sample)
-
-                if sample and len(sample.strip()) >= 3:
-                    samples_with_positions.append({
-                        'index': len(samples_with_positions),
-                        'sample': sample,
-                        'line_num': line_num,
-                        'start_pos': line_start + match.start(),
-                        'end_pos': line_start + match.end(),
-                        'text_context': text
-                    })
-
-                line_start += match.end()
-
-        logger.info(f"Found {len(samples_with_positions)} samples to process")
-
-        # Use individual searches with connection reuse instead of batch
-        samples_for_search = [(item['index'], item['sample']) for item in samples_with_positions]
-        search_results = self.solr_service.search_samples(samples_for_search)
-
-        logger.info(f"Completed individual searches, found matches for {len(search_results)} samples")
-        return self._build_output_with_results(document, samples_with_positions, search_results, sha1_file, multisource)
-
-    def _build_output_with_results(self, document, samples_with_positions, search_results, sha1_file, multisource):
-
-        sources = {}
-        words_doctotal = len(document.split())
-        words_scanned = 0
-        words_copied = 0
-        chars_doctotal = len(document)
-        chars_scanned = 0
-        chars_copied = 0
-        samples_scanned = 0
-        samples_copied = 0
-        current_sources = None
-        output = []
-
-        lines = [line.strip() for line in document.split('\n') if line.strip()]
-
-        for line_num, text in enumerate(lines, 1):
-            line_samples = [s for s in samples_with_positions if s['line_num'] == line_num]
-            line_samples.sort(key=lambda x: x['start_pos'])
-
-            current_pos = 0
-
-            for sample_info in line_samples:
-                sample = sample_info['sample']
-                start_pos = sample_info['start_pos']
-                end_pos = sample_info['end_pos']
-                sample_idx = sample_info['index']
-
-                # Add text before sample
-                presample = text[current_pos:start_pos]
-                output.append({"type": "text", "content": presample})
-
-                # Update metrics
-                samples_scanned += 1
-                words_in_sample = len(sample.split())
-                words_scanned += words_in_sample
-                chars_scanned += len(sample)
-
-                # Check if sample has matches
-                if sample_idx in search_results:
-                    samples_copied += 1
-                    words_copied += words_in_sample
-                    chars_copied += len(sample)
-                    new_sources = {}
-
-                    docs = search_results[sample_idx][:10 if multisource else 1]
-
-                    for doc in docs:
-                        source_id = doc["id"]
-                        sources[source_id] = sources.get(source_id, {
-                            "color": source_id[:6],
-                            "name": doc.get("resource_name", "Unknown"),
-                            "description": doc.get("description", ""),
-                            "words": 0,
-                            "samples": 0
-                        })
-                        sources[source_id]["words"] += words_in_sample
-                        sources[source_id]["samples"] += 1
-                        new_sources[source_id] = True
-
-                    if current_sources != new_sources:
-                        current_sources = new_sources
-                        for source_id in new_sources:
-                            output.append({
-                                "type": "marker",
-                                "id": f"{sha1_file}_{source_id}",
-                                "color": sources[source_id]["color"],
-                                "name": sources[source_id]["name"]
-                            })
-
-                    output.append({"type": "highlight", "content": sample})
-                else:
-                    output.append({"type": "text", "content": sample})
-
-                current_pos = end_pos
-
-            # Add remaining text in line
-            remaining_text = text[current_pos:]
-            output.append({"type": "text", "content": remaining_text})
-            output.append({"type": "br"})
-
-        # Calculate ratios
-        chars_original = chars_scanned - chars_copied
-        chars_original_ratio = chars_original / chars_scanned if chars_scanned else 0
-        words_original = words_scanned - words_copied
-        words_original_ratio = words_original / words_scanned if words_scanned else 0
-        samples_original = samples_scanned - samples_copied
-        samples_original_ratio = samples_original / samples_scanned if samples_scanned else 0
-
-        # Sort sources by words
-        sorted_sources = sorted(sources.items(), key=lambda x: x[1]["words"], reverse=True)
-
-        return {
-            "filename": "processed_document",
-            "metrics": {
-                "chars_doctotal": chars_doctotal,
-                "chars_scanned": chars_scanned,
-                "chars_original": chars_original,
-                "chars_copied": chars_copied,
-                "chars_original_ratio": chars_original_ratio,
-                "words_doctotal": words_doctotal,
-                "words_scanned": words_scanned,
-                "words_original": words_original,
-                "words_copied": words_copied,
-                "words_original_ratio": words_original_ratio,
-                "samples_scanned": samples_scanned,
-                "samples_original": samples_original,
-                "samples_copied": samples_copied,
-                "samples_original_ratio": samples_original_ratio
-            },
-            "sources": [
-                {
-                    "id": source_id,
-                    "color": info["color"],
-                    "name": info["name"],
-                    "description": info["description"],
-                    "words": info["words"],
-                    "samples": info["samples"]
-                } for source_id, info in sorted_sources
-            ],
-            "output": output
-        }
+        self.scan_service = ScanService()
+        self.admission_service = AdmissionService()
 
     def post(self):
 
         expmin = int(request.form.get('expmin', '3'))
         expmax = int(request.form.get('expmax', '5'))
         multisource = request.form.get('multisource', 'false').lower() == 'true'
+        sampling_mode = request.form.get('sampling', Config.SCAN_SAMPLING_MODE)
+        run_async = request.form.get('mode', 'sync').lower() == 'async'
+        output_format = request.form.get('format', 'default').lower()
         file = request.files.get('file')
 
         if expmin < 1 or expmax < expmin:
@@ -797,6 +431,20 @@ class SingleFileSearch(Resource):
                 "message": "Giá trị expmin hoặc expmax không hợp lệ"
             }, 400
 
+        if sampling_mode not in SAMPLING_MODES:
+            return {
+                "status": 0,
+                "data": None,
+                "message": "Chế độ lấy mẫu không hợp lệ"
+            }, 400
+
+        if output_format not in WireFormat.FORMATS:
+            return {
+                "status": 0,
+                "data": None,
+                "message": "Định dạng kết quả không hợp lệ"
+            }, 400
+
         if not file:
             return {
                 "status": 0,
@@ -810,53 +458,48 @@ class SingleFileSearch(Resource):
                 "message": "Tệp không có tên"
             }, 400
 
+        rejection = self.admission_service.admit_scan(AdmissionService.estimate_samples(files=1), queued=run_async)
+        if rejection:
+            return rejection.response()
+
+        profile = ScanProfiler.is_admin_request()
+
         try:
             content = file.read()
             sha1_file = FileService.calculate_sha1(content)
             file.seek(0)
 
-            response = self.solr_service.extract_text(
-                filename=file.filename,
-                content=content,
-                mimetype=file.mimetype
-            )
-
-            if response.status_code != 200:
-                error_msg = f"Không thể kết nối đến máy chủ Solr cho tệp {file.filename}. Status code: {response.status_code}"
-                logger.error(error_msg)
-                return {
-                    "status": 0,
-                    "data": None,
-                    "message": error_msg
-                }, 500
-
-            result = response.json()
-
-            if result.get("responseHeader", {}).get("status", 0) != 0:
-                error_msg = f"Không thể trích xuất văn bản từ {file.filename}"
-                logger.error(
-                    f"{error_msg}. Solr response status: {result.get('responseHeader', {}).get('status', 'unknown')}")
-                return {
-                    "status": 0,
-                    "data": None,
-                    "message": error_msg
-                }, 500
-
-            document = result.get('file', "")
-
-            if file.mimetype == 'application/pdf' or file.filename.lower().endswith('.pdf'):
-                document = self._clean_pdf_text(document)
-
-            result = self.process_document_optimized(document, sha1_file, expmin, expmax, multisource)
-            result["filename"] = file.filename
+            if run_async:
+                return self._submit_job(file, content, expmin, expmax, multisource, sampling_mode, profile)
+
+            profiler = ScanProfiler(ScanProfiler.new_scan_id(), 'single_file_search', file.filename) if profile else None
+            with profiler or contextlib.nullcontext():
+                result = self.scan_service.scan_file(
+                    filename=file.filename,
+                    content=content,
+                    mimetype=file.mimetype,
+                    expmin=expmin,
+                    expmax=expmax,
+                    multisource=multisource,
+                    sha1_file=sha1_file,
+                    sampling_mode=sampling_mode
+                )
 
-            return {
+            response = WireFormat.json_response({
                 "status": 1,
-                "data": result,
+                "data": WireFormat.apply_format(result, output_format),
                 "message": "Phân tích đạo văn thành công"
-            }, 200
-
+            }, 200)
+            if profiler:
+                response.headers[ScanProfiler.ID_HEADER] = profiler.scan_id
+            return response
 
+        except ScanError as e:
+            return {
+                "status": 0,
+                "data": None,
+                "message": str(e)
+            }, 500
         except Exception as e:
             logger.error(str(e))
             return {
@@ -865,35 +508,60 @@ class SingleFileSearch(Resource):
                 "message": "Lỗi hệ thống: " + str(e)
             }, 500
 
-    def _clean_pdf_text(self, text):
-        """Clean PDF extracted text from common artifacts"""
-        if not text:
-            return text
+    def _submit_job(self, file, content, expmin, expmax, multisource, sampling_mode, profile=False):
+        """Queue the scan on a Celery worker and return the job id right away"""
+        job_service = ScanJobService()
+        job_id = job_service.create_job(file.filename, {
+            "exp_min": expmin,
+            "exp_max": expmax,
+            "multi_source": multisource,
+            "sampling": sampling_mode
+        })
+        file_path = FileService.save_scan_job_file(content, job_id, file.filename)
 
-        # Remove common PDF artifacts
-        text = re.sub(r'\x00', '', text)  # Remove null bytes
-        text = re.sub(r'[\x01-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)  # Remove control characters
-        text = re.sub(r'\ufeff', '', text)  # Remove BOM
-        text = re.sub(r'[\u200b-\u200f\u2028-\u202f\u205f-\u206f]', ' ', text)  # Remove zero-width chars
+        run_single_file_scan.delay(job_id, file_path, file.filename, file.mimetype,
+                                   expmin, expmax, multisource, sampling_mode, profile)
 
-        # Normalize whitespace
-        text = re.sub(r'\s+', ' ', text)
-        text = text.strip()
+        return {
+            "status": 1,
+            "data": {
+                "job_id": job_id,
+                "status": "queued"
+            },
+            "message": "Tệp đã được đưa vào hàng đợi phân tích"
+        }, 202, ({ScanProfiler.ID_HEADER: job_id} if profile else {})
 
-        return text
 
-    def _clean_search_sample(self, sample):
-        """Clean and validate search sample"""
-        if not sample:
-            return sample
+class SingleFileSearchJob(Resource):
+    def __init__(self):
+        self.job_service = ScanJobService()
 
-        # Remove problematic characters that can break Solr queries
-        sample = re.sub(r'[^\w\s\.,;:!?\-\'\"()]', ' ', sample)  # Keep only safe characters
-        sample = re.sub(r'\s+', ' ', sample)  # Normalize whitespace
-        sample = sample.strip()
+    def get(self, job_id):
+        output_format = request.args.get('format', 'default').lower()
+        try:
+            job = self.job_service.get_job(job_id)
+            if not job:
+                return {
+                    "status": 0,
+                    "data": None,
+                    "message": "Không tìm thấy yêu cầu phân tích hoặc kết quả đã hết hạn"
+                }, 404
 
-        # Remove very short or very long samples
-        if len(sample) < 3 or len(sample) > 1000:
-            return ""
+            result = self.job_service.get_result(job_id) if job["status"] == "completed" else None
+
+            return WireFormat.json_response({
+                "status": 1,
+                "data": {
+                    "job": job,
+                    "result": WireFormat.apply_format(result, output_format)
+                },
+                "message": "Lấy trạng thái phân tích thành công"
+            }, 200)
 
-        return sample
\ No newline at end of file
+        except Exception as e:
+            logger.error(f"Error getting scan job {job_id}: {str(e)}")
+            return {
+                "status": 0,
+                "data": None,
+                "message": str(e)
+            }, 500
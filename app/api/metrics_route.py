@@ -0,0 +1,55 @@
+import logging
+from datetime import datetime
+from flask_restful import Resource
+
+from ..config import Config
+from ..services.metrics_service import MetricsService
+from ..services.admission_service import AdmissionService
+
+logger = logging.getLogger(__name__)
+
+# Scheduled tasks and their interval; a task whose last run is older than two intervals is reported
+SCHEDULED_TASKS = {
+    "compaction": lambda: Config.COMPACTION_INTERVAL,
+    "boilerplate": lambda: Config.BOILERPLATE_REBUILD_INTERVAL
+}
+
+
+class Metrics(Resource):
+    def __init__(self):
+        self.metrics_service = MetricsService()
+
+    def get(self):
+        try:
+            metrics = self.metrics_service.snapshot()
+            alerts = self.overdue_tasks(metrics)
+            return {
+                "status": 1,
+                "data": {**metrics, **AdmissionService.limits(), "alerts": alerts},
+                "message": "Lấy số liệu hệ thống thành công"
+            }, 200
+        except Exception as e:
+            logger.error(f"Error getting metrics: {str(e)}")
+            return {
+                "status": 0,
+                "data": None,
+                "message": str(e)
+            }, 500
+
+    @staticmethod
+    def overdue_tasks(metrics):
+        """Scheduled tasks that never ran or missed two runs in a row (beat down, task not registered)"""
+        alerts = []
+        now = datetime.utcnow()
+        for name, interval in SCHEDULED_TASKS.items():
+            last_run = metrics.get(f"{name}.last_run_at")
+            if last_run is None:
+                alerts.append({"task": name, "reason": "never_run"})
+                continue
+            age = (now - datetime.fromisoformat(last_run)).total_seconds()
+            metrics[f"{name}.last_run_age_seconds"] = round(age)
+            if age > 2 * interval():
+                alerts.append({"task": name, "reason": "overdue", "last_run_at": last_run})
+        if alerts:
+            logger.warning("Scheduled tasks not running: %s", alerts)
+        return alerts
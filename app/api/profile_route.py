@@ -0,0 +1,60 @@
+import zlib
+import logging
+from flask import request, Response
+from flask_restful import Resource
+
+from ..services.database_service import DatabaseService
+from ..services.profiling_service import ScanProfiler
+
+logger = logging.getLogger(__name__)
+
+
+class ScanProfiles(Resource):
+    def __init__(self):
+        self.db_service = DatabaseService()
+
+    def get(self):
+        """Stored profiles of a scan (admin token required); format=collapsed returns the latest stacks as text"""
+        if not ScanProfiler.is_admin_request():
+            return {
+                "status": 0,
+                "data": None,
+                "message": "Không có quyền truy cập"
+            }, 403
+
+        try:
+            scan_id = request.args.get('scan_id', '').strip()
+            if not scan_id:
+                raise ValueError("ID quét không hợp lệ")
+
+            profiles = self.db_service.get_scan_profiles(scan_id)
+            if not profiles:
+                return {
+                    "status": 0,
+                    "data": None,
+                    "message": "Không tìm thấy hồ sơ hiệu năng cho lượt quét này"
+                }, 404
+
+            # Collapsed stacks as read by flamegraph.pl and speedscope
+            if request.args.get('format') == 'collapsed':
+                return Response(zlib.decompress(profiles[0].collapsed_stacks), mimetype='text/plain')
+
+            return {
+                "status": 1,
+                "data": [ScanProfiler.describe(profile, top=request.args.get('top', 50, type=int)) for profile in profiles],
+                "message": "Lấy hồ sơ hiệu năng thành công"
+            }, 200
+
+        except ValueError as e:
+            return {
+                "status": 0,
+                "data": None,
+                "message": str(e)
+            }, 400
+        except Exception as e:
+            logger.error(f"Error getting scan profiles: {str(e)}")
+            return {
+                "status": 0,
+                "data": None,
+                "message": str(e)
+            }, 500
@@ -3,10 +3,17 @@ import logging
 # from .file_upload_route import SingleFileUpload
 from .file_management.file_upload import SingleFileUpload
 from .file_upload_route import SingleFileSearch
+from .file_upload_route import SingleFileSearchJob
 from .file_upload_route import MultipleFileSearch
 from .file_management_route import FileScanList
 from .file_upload_route import DownloadExcelSample
 from .file_management_route import FileScanResult
+from .file_management_route import FileScanCancel
+from .file_management_route import FileScanReport
+from .file_management_route import FileScanRescan
+from .file_management_route import FileScanProgress
+from .metrics_route import Metrics
+from .profile_route import ScanProfiles
 
 from .file_management.file_list import FileList
 from .file_management.file_download import FileDownload
@@ -25,10 +32,17 @@ def initialize_routes(api):
     #Refactoring Route
     api.add_resource(SingleFileUpload, '/api/file-upload')
     api.add_resource(SingleFileSearch, '/api/file-search/single')
+    api.add_resource(SingleFileSearchJob, '/api/file-search/jobs/<string:job_id>')
     api.add_resource(MultipleFileSearch, '/api/file-search/multiple')
     api.add_resource(FileScanList, '/api/file-scan-list')
     api.add_resource(DownloadExcelSample, '/api/download-excel-sample')
     api.add_resource(FileScanResult, '/api/file-scan-result')
+    api.add_resource(FileScanCancel, '/api/file-scan-cancel')
+    api.add_resource(FileScanReport, '/api/file-scan-report')
+    api.add_resource(FileScanRescan, '/api/file-scan-rescan')
+    api.add_resource(FileScanProgress, '/api/file-scan-progress')
+    api.add_resource(Metrics, '/api/metrics')
+    api.add_resource(ScanProfiles, '/api/scan-profiles')
 
     # AI Scan Route
     api.add_resource(TextScanAI, '/api/file-search/ai/ask')
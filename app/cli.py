@@ -0,0 +1,91 @@
+import os
+import logging
+
+import click
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Flask CLI commands for maintaining the Solr core:
+flask solr-provision [--dry-run], flask solr-reindex [--batch-size N] and flask boilerplate-build [--dry-run].
+"""
+def register_commands(app):
+    @app.cli.command('solr-provision')
+    @click.option('--dry-run', is_flag=True, help='Only print the changes that would be applied.')
+    def solr_provision(dry_run):
+        """Create or update the phrase matching schema and cache settings of the Solr core."""
+        from .services.solr_schema_service import SolrSchemaService
+
+        changes = SolrSchemaService().provision(dry_run=dry_run)
+        if not changes:
+            click.echo('Solr core is up to date')
+        for change in changes:
+            click.echo(('would apply: ' if dry_run else 'applied: ') + change)
+
+    @app.cli.command('solr-reindex')
+    @click.option('--batch-size', default=100, show_default=True, help='Documents loaded per database query.')
+    def solr_reindex(batch_size):
+        """Re-index stored documents so copy fields added by solr-provision are populated."""
+        from .models.document import Document
+        from .services.solr_service import SolrService
+        from .services.extraction_service import ExtractionService
+        from .services.commit_coordinator import CommitCoordinator
+
+        solr_service = SolrService()
+        extraction_service = ExtractionService()
+        indexed = failed = 0
+        last_id = 0
+
+        while True:
+            documents = Document.query.filter(
+                Document.id > last_id,
+                Document.is_included_in_solr.is_(True)
+            ).order_by(Document.id).limit(batch_size).all()
+            if not documents:
+                break
+
+            for document in documents:
+                last_id = document.id
+                if not document.file_path or not os.path.exists(document.file_path):
+                    logger.warning(f"Skipping document {document.id}: file {document.file_path} not found")
+                    failed += 1
+                    continue
+
+                try:
+                    with open(document.file_path, 'rb') as f:
+                        content = f.read()
+                    text = extraction_service.extract(document.file_name, content, document.mimetype)
+                    response = solr_service.index_document(
+                        sha1_file=document.file_hash,
+                        filename=document.file_name,
+                        text=text,
+                        description=document.description,
+                        overwrite="true"
+                    )
+                    if response.status_code != 200:
+                        raise Exception(f"Solr status {response.status_code}")
+                    indexed += 1
+                except Exception as e:
+                    logger.error(f"Failed to re-index document {document.id}: {str(e)}")
+                    failed += 1
+
+            click.echo(f'{indexed} documents re-indexed, {failed} failed')
+
+        CommitCoordinator().soft_commit()
+        click.echo(f'Done: {indexed} documents re-indexed, {failed} failed. '
+                   f'Set SOLR_PHRASE_FIELD={Config.SOLR_SHINGLE_FIELD} to query the shingled field.')
+
+    @app.cli.command('boilerplate-build')
+    @click.option('--dry-run', is_flag=True, help='Only print how the table would change.')
+    def boilerplate_build(dry_run):
+        """Sync the boilerplate phrase table with the document frequencies in Solr."""
+        from .services.boilerplate_service import BoilerplateService
+
+        summary = BoilerplateService().build(dry_run=dry_run)
+        click.echo(('would apply: ' if dry_run else 'applied: ') +
+                   f"{summary['phrases']} phrases with df >= {Config.BOILERPLATE_MIN_DF}, "
+                   f"{summary['inserted']} inserted, {summary['updated']} updated, {summary['deleted']} deleted")
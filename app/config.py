@@ -1,5 +1,4 @@
 import os
-import logging
 from dotenv import load_dotenv
 from urllib.parse import quote_plus
 load_dotenv()
@@ -31,10 +30,37 @@ class Config:
     POOL_MAXSIZE = int(os.getenv('POOL_MAXSIZE', '20'))
     SOLR_TIMEOUT = int(os.getenv('SOLR_TIMEOUT', '60'))
     CONNECTION_KEEP_ALIVE_TIMEOUT = int(os.getenv('KEEP_ALIVE_TIMEOUT', '120'))
+    SOLR_QUERY_TIMEOUT = int(os.getenv('SOLR_QUERY_TIMEOUT', '10'))  # per sample phrase query
+    SOLR_READ_RETRIES = int(os.getenv('SOLR_READ_RETRIES', '0'))
+    SOLR_INDEXED_AT_FIELD = os.getenv('SOLR_INDEXED_AT_FIELD', 'indexed_at')  # pdate set when a document is indexed
+    SOLR_CONTENT_FIELD = os.getenv('SOLR_CONTENT_FIELD', '_text_')  # field holding the extracted text
+
+    #Phrase matching schema (flask solr-provision); switch SOLR_PHRASE_FIELD to SOLR_SHINGLE_FIELD after a reindex
+    SOLR_SHINGLE_FIELD = os.getenv('SOLR_SHINGLE_FIELD', 'content_shingled')
+    SOLR_SHINGLE_SIZE = int(os.getenv('SOLR_SHINGLE_SIZE', '3'))  # words per indexed shingle
+    SOLR_PHRASE_FIELD = os.getenv('SOLR_PHRASE_FIELD', SOLR_CONTENT_FIELD)  # field searched by sample queries (df)
+    SOLR_FILTER_CACHE_SIZE = int(os.getenv('SOLR_FILTER_CACHE_SIZE', '1024'))
+    SOLR_FILTER_CACHE_AUTOWARM = int(os.getenv('SOLR_FILTER_CACHE_AUTOWARM', '128'))
+    SOLR_QUERY_RESULT_CACHE_SIZE = int(os.getenv('SOLR_QUERY_RESULT_CACHE_SIZE', '4096'))
+    SOLR_QUERY_RESULT_CACHE_AUTOWARM = int(os.getenv('SOLR_QUERY_RESULT_CACHE_AUTOWARM', '256'))
+    SOLR_DOCUMENT_CACHE_SIZE = int(os.getenv('SOLR_DOCUMENT_CACHE_SIZE', '1024'))
+
+    #Index visibility: writes use commitWithin, read-your-writes callers poll and soft commit as a last resort
+    SOLR_COMMIT_WITHIN_MS = int(os.getenv('SOLR_COMMIT_WITHIN_MS', '5000'))
+    SOLR_VISIBILITY_TIMEOUT = float(os.getenv('SOLR_VISIBILITY_TIMEOUT', '10'))  # seconds
+    SOLR_VISIBILITY_POLL_INTERVAL = float(os.getenv('SOLR_VISIBILITY_POLL_INTERVAL', '0.25'))  # seconds
 
     #Config time-out for file processing
     SOLR_EXTRACT_TIMEOUT = int(os.getenv('SOLR_EXTRACT_TIMEOUT', '60'))  # 5 minutes for text extraction
 
+    #Local text extraction pool (PDF/DOCX/TXT/MD); other types and failures fall back to Tika in Solr
+    EXTRACTION_LOCAL = os.getenv('EXTRACTION_LOCAL', 'true').lower() == 'true'
+    EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', str(os.cpu_count() or 2)))
+    EXTRACTION_TIMEOUT = int(os.getenv('EXTRACTION_TIMEOUT', '60'))  # seconds per file, the worker is killed after it
+    EXTRACTION_MEMORY_LIMIT_MB = int(os.getenv('EXTRACTION_MEMORY_LIMIT_MB', '1024'))  # address space per worker, 0 = unlimited
+    EXTRACTION_MAX_TASKS_PER_WORKER = int(os.getenv('EXTRACTION_MAX_TASKS_PER_WORKER', '50'))
+    EXTRACTION_START_METHOD = os.getenv('EXTRACTION_START_METHOD', 'spawn')
+
     #Config Cellery
     CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
     CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
@@ -43,20 +69,141 @@ class Config:
     CELERY_RESULT_SERIALIZER = 'json'
     CELERY_TIMEZONE = os.getenv('CELERY_TIMEZONE', 'UTC')
 
+    #Celery queues: interactive scans, bulk (batch) scans, Solr indexing and maintenance, each with its own workers
+    CELERY_QUEUE_CONCURRENCY = {
+        'interactive': int(os.getenv('CELERY_INTERACTIVE_CONCURRENCY', '4')),
+        'bulk': int(os.getenv('CELERY_BULK_CONCURRENCY', '2')),
+        'indexing': int(os.getenv('CELERY_INDEXING_CONCURRENCY', '2')),
+        'maintenance': int(os.getenv('CELERY_MAINTENANCE_CONCURRENCY', '1'))
+    }
+    # Tasks reserved per worker process; long scans use 1 so a busy process does not hold queued scans
+    CELERY_QUEUE_PREFETCH = {
+        'interactive': int(os.getenv('CELERY_INTERACTIVE_PREFETCH', '1')),
+        'bulk': int(os.getenv('CELERY_BULK_PREFETCH', '1')),
+        'indexing': int(os.getenv('CELERY_INDEXING_PREFETCH', '4')),
+        'maintenance': int(os.getenv('CELERY_MAINTENANCE_PREFETCH', '1'))
+    }
+
+    #Redis for job state, caches and counters
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/1')
+    REDIS_TIMEOUT = float(os.getenv('REDIS_TIMEOUT', '5'))
+
+    #Asynchronous (job based) single file scans
+    SCAN_JOB_DIR = os.getenv('SCAN_JOB_DIR', 'scan_jobs')  # must be shared with the Celery workers
+    SCAN_JOB_TTL = int(os.getenv('SCAN_JOB_TTL', '86400'))  # seconds to keep job state and results
+
+    #Response compression for large JSON payloads (gzip, or br when Brotli is installed)
+    RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv('RESPONSE_COMPRESSION_MIN_SIZE', '1024'))  # bytes
+    RESPONSE_GZIP_LEVEL = int(os.getenv('RESPONSE_GZIP_LEVEL', '6'))
+    RESPONSE_BROTLI_QUALITY = int(os.getenv('RESPONSE_BROTLI_QUALITY', '5'))
+
+    #Admission control: sample query token buckets per user and overall, queue depth limits (HTTP 429)
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+    ADMISSION_USER_HEADER = os.getenv('ADMISSION_USER_HEADER', 'X-User-Id')  # falls back to the client address
+    ADMISSION_TRUSTED_PROXIES = [a.strip() for a in os.getenv('ADMISSION_TRUSTED_PROXIES', '').split(',') if a.strip()]  # only they may set the user header
+    ADMISSION_USER_SAMPLES_BURST = int(os.getenv('ADMISSION_USER_SAMPLES_BURST', '20000'))
+    ADMISSION_USER_SAMPLES_PER_SECOND = float(os.getenv('ADMISSION_USER_SAMPLES_PER_SECOND', '50'))
+    ADMISSION_GLOBAL_SAMPLES_BURST = int(os.getenv('ADMISSION_GLOBAL_SAMPLES_BURST', '100000'))
+    ADMISSION_GLOBAL_SAMPLES_PER_SECOND = float(os.getenv('ADMISSION_GLOBAL_SAMPLES_PER_SECOND', '400'))
+    ADMISSION_SAMPLES_PER_FILE = int(os.getenv('ADMISSION_SAMPLES_PER_FILE', '500'))  # estimate before extraction
+    ADMISSION_CHARS_PER_SAMPLE = int(os.getenv('ADMISSION_CHARS_PER_SAMPLE', '60'))  # estimate for raw text
+    ADMISSION_QUEUES = [q for q in os.getenv('ADMISSION_QUEUES', 'interactive,bulk').split(',') if q]  # Celery queues to watch
+    ADMISSION_MAX_QUEUE_DEPTH = int(os.getenv('ADMISSION_MAX_QUEUE_DEPTH', '200'))
+    ADMISSION_MAX_OUTBOX_BACKLOG = int(os.getenv('ADMISSION_MAX_OUTBOX_BACKLOG', '500'))
+    ADMISSION_QUEUE_RETRY_AFTER = int(os.getenv('ADMISSION_QUEUE_RETRY_AFTER', '30'))  # seconds
+
+    #Read-through Redis cache of FileScanResult responses (gzipped JSON, LRU within a size budget)
+    SCAN_RESULT_CACHE_ENABLED = os.getenv('SCAN_RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+    SCAN_RESULT_CACHE_TTL = int(os.getenv('SCAN_RESULT_CACHE_TTL', '86400'))  # seconds
+    SCAN_RESULT_CACHE_MAX_BYTES = int(os.getenv('SCAN_RESULT_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+    SCAN_RESULT_CACHE_MAX_ENTRY_BYTES = int(os.getenv('SCAN_RESULT_CACHE_MAX_ENTRY_BYTES', str(16 * 1024 * 1024)))
+
+    #Near-duplicate detection (MinHash/LSH) at upload time
+    NEAR_DUPLICATE_CHECK = os.getenv('NEAR_DUPLICATE_CHECK', 'true').lower() == 'true'
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', '0.85'))
+    MINHASH_NUM_PERM = int(os.getenv('MINHASH_NUM_PERM', '128'))
+    MINHASH_BANDS = int(os.getenv('MINHASH_BANDS', '32'))  # must divide MINHASH_NUM_PERM
+    MINHASH_SHINGLE_SIZE = int(os.getenv('MINHASH_SHINGLE_SIZE', '5'))
+    MINHASH_SEED = int(os.getenv('MINHASH_SEED', '1'))
+
+    #Batch peer check: the files of a multiple file search are compared with each other in memory before they are scanned
+    BATCH_PEER_CHECK = os.getenv('BATCH_PEER_CHECK', 'true').lower() == 'true'
+    BATCH_PEER_SHINGLE_SIZE = int(os.getenv('BATCH_PEER_SHINGLE_SIZE', '3'))  # words per shingle
+    BATCH_PEER_MAX_DF = float(os.getenv('BATCH_PEER_MAX_DF', '0.5'))  # shingles in a larger share of the files (assignment text) are ignored
+    BATCH_PEER_MAX_FILES = int(os.getenv('BATCH_PEER_MAX_FILES', '200'))  # larger batches are not compared
+    BATCH_PEER_TTL = int(os.getenv('BATCH_PEER_TTL', '86400'))  # seconds the batch index is kept in Redis
+
+    #Candidate-document preselection before sample queries
+    CANDIDATE_PRESELECTION = os.getenv('CANDIDATE_PRESELECTION', 'true').lower() == 'true'
+    CANDIDATE_TOP_K = int(os.getenv('CANDIDATE_TOP_K', '20'))
+    CANDIDATE_TERMS = int(os.getenv('CANDIDATE_TERMS', '60'))  # significant terms per query
+    CANDIDATE_TERM_POOL = int(os.getenv('CANDIDATE_TERM_POOL', '300'))  # most frequent terms per part weighted by IDF
+    CANDIDATE_MAX_DF = float(os.getenv('CANDIDATE_MAX_DF', '0.2'))  # terms in a larger share of the corpus are not used
+    CANDIDATE_QUERY_CHUNKS = int(os.getenv('CANDIDATE_QUERY_CHUNKS', '3'))  # candidate queries per scan
+    CANDIDATE_MIN_SAMPLES = int(os.getenv('CANDIDATE_MIN_SAMPLES', '50'))  # below this, search the whole corpus
+    CANDIDATE_PROBE_SAMPLES = int(os.getenv('CANDIDATE_PROBE_SAMPLES', '20'))
+    CANDIDATE_FALLBACK_RATIO = float(os.getenv('CANDIDATE_FALLBACK_RATIO', '0.1'))
+
+    #Sample selection: 'full' queries every sample, 'adaptive' probes every Nth sample and densifies around hits
+    SCAN_SAMPLING_MODE = os.getenv('SCAN_SAMPLING_MODE', 'full')
+    ADAPTIVE_SAMPLING_STRIDE = int(os.getenv('ADAPTIVE_SAMPLING_STRIDE', '4'))
+
+    #Per-scan budgets; a scan that runs out returns partial results marked as incomplete (0 = unlimited)
+    SCAN_TIME_BUDGET = int(os.getenv('SCAN_TIME_BUDGET', '900'))  # seconds
+    SCAN_QUERY_BUDGET = int(os.getenv('SCAN_QUERY_BUDGET', '20000'))  # sample queries
+    AI_SCAN_TIME_BUDGET = int(os.getenv('AI_SCAN_TIME_BUDGET', '120'))  # seconds
+    AI_SCAN_CONCURRENCY = int(os.getenv('AI_SCAN_CONCURRENCY', '8'))  # parallel sample queries per AI request
+    SCAN_CANCEL_CHECK_INTERVAL = float(os.getenv('SCAN_CANCEL_CHECK_INTERVAL', '2'))  # seconds between cancel checks
+
+    #Corpus boilerplate phrases (flask boilerplate-build): samples made only of them are not queried
+    BOILERPLATE_MODE = os.getenv('BOILERPLATE_MODE', 'mark')  # off, skip, or mark (skip and flag them in the output)
+    BOILERPLATE_MIN_DF = int(os.getenv('BOILERPLATE_MIN_DF', '200'))  # documents a shingle must occur in
+    BOILERPLATE_MAX_PHRASES = int(os.getenv('BOILERPLATE_MAX_PHRASES', '500000'))  # most frequent ones kept in memory
+    BOILERPLATE_RELOAD_INTERVAL = int(os.getenv('BOILERPLATE_RELOAD_INTERVAL', '3600'))  # seconds
+    BOILERPLATE_BATCH_SIZE = int(os.getenv('BOILERPLATE_BATCH_SIZE', '5000'))  # Solr terms per page, rows per transaction
+    BOILERPLATE_REBUILD_INTERVAL = int(os.getenv('BOILERPLATE_REBUILD_INTERVAL', '86400'))  # seconds between scheduled rebuilds
+
+    #On-demand scan profiling for admins (X-Scan-Profile header or profile parameter set to the token)
+    PROFILING_ADMIN_TOKEN = os.getenv('PROFILING_ADMIN_TOKEN', '')  # empty disables profiling
+    PROFILING_INTERVAL = float(os.getenv('PROFILING_INTERVAL', '0.005'))  # seconds between stack samples
+    PROFILING_MAX_SECONDS = int(os.getenv('PROFILING_MAX_SECONDS', '1800'))  # sampling stops after it
+    PROFILING_MAX_DEPTH = int(os.getenv('PROFILING_MAX_DEPTH', '64'))  # frames kept per stack
+
+    #Live scan progress in Redis (GET /api/file-scan-progress, ?stream=true for server-sent events)
+    SCAN_PROGRESS_INTERVAL = float(os.getenv('SCAN_PROGRESS_INTERVAL', '2'))  # seconds between progress writes and stream polls
+    SCAN_PROGRESS_TTL = int(os.getenv('SCAN_PROGRESS_TTL', '86400'))
+    SCAN_PROGRESS_MAX_IDS = int(os.getenv('SCAN_PROGRESS_MAX_IDS', '200'))  # scans per request
+    SCAN_PROGRESS_STREAM_TIMEOUT = int(os.getenv('SCAN_PROGRESS_STREAM_TIMEOUT', '300'))  # seconds, clients reconnect after it
+    SCAN_PROGRESS_STREAM_KEEPALIVE = int(os.getenv('SCAN_PROGRESS_STREAM_KEEPALIVE', '15'))
+
+    #Incremental re-scans only query documents indexed after the previous scan minus this margin (commit visibility lag)
+    RESCAN_INDEX_LAG = int(os.getenv('RESCAN_INDEX_LAG', '60'))  # seconds
+
+    #Retention and compaction (compact_storage, scheduled by Celery beat)
+    COMPACTION_INTERVAL = int(os.getenv('COMPACTION_INTERVAL', '3600'))  # seconds between runs
+    COMPACTION_MAX_SECONDS = int(os.getenv('COMPACTION_MAX_SECONDS', '300'))  # time limit of one run
+    COMPACTION_BATCH_SIZE = int(os.getenv('COMPACTION_BATCH_SIZE', '500'))  # rows per transaction
+    COMPACTION_BATCH_PAUSE = float(os.getenv('COMPACTION_BATCH_PAUSE', '0.2'))  # seconds between batches
+    OUTBOX_RETENTION_DAYS = int(os.getenv('OUTBOX_RETENTION_DAYS', '7'))  # processed events
+    OUTBOX_FAILED_RETENTION_DAYS = int(os.getenv('OUTBOX_FAILED_RETENTION_DAYS', '30'))  # events that gave up
+    SCAN_OUTPUT_ARCHIVE_AFTER_HOURS = int(os.getenv('SCAN_OUTPUT_ARCHIVE_AFTER_HOURS', '24'))  # after being superseded
+    SCAN_OUTPUT_ARCHIVE_LEVEL = int(os.getenv('SCAN_OUTPUT_ARCHIVE_LEVEL', '6'))  # zlib level
 
     # Logging configuration
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = os.getenv('LOG_FILE', 'app.log')
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    LOG_FORMATTER = os.getenv('LOG_FORMATTER', 'json')  # json or text (LOG_FORMAT)
+    LOG_SINKS = [sink.strip() for sink in os.getenv('LOG_SINKS', 'file,console').split(',') if sink.strip()]  # file, console (stderr), stdout, syslog
+    LOG_SYSLOG_ADDRESS = os.getenv('LOG_SYSLOG_ADDRESS', '/dev/log')  # socket path or host:port
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # records waiting for the sinks, more are dropped
+    LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', '20'))  # records per call site and window, 0 disables sampling
+    LOG_SAMPLE_WINDOW = float(os.getenv('LOG_SAMPLE_WINDOW', '60'))  # seconds
+    LOG_SAMPLE_LEVELS = os.getenv('LOG_SAMPLE_LEVELS', 'WARNING')  # comma separated levels that are sampled
     
     @staticmethod
     def configure_logging():
         """Configure logging for the application"""
-        logging.basicConfig(
-            level=getattr(logging, Config.LOG_LEVEL.upper()),
-            format=Config.LOG_FORMAT,
-            handlers=[
-                logging.FileHandler(Config.LOG_FILE),
-                logging.StreamHandler()
-            ]
-        )
+        from .services.logging_service import configure_logging
+
+        configure_logging()
@@ -1,17 +1,37 @@
 from flask_sqlalchemy import SQLAlchemy
-from celery import Celery
+from flask_migrate import Migrate
 
 
 
 # Initialize SQLAlchemy instance
 db = SQLAlchemy()
 
+# Versioned schema migrations (flask db upgrade), scripts in migrations/
+migrate = Migrate()
 
 
-# Initialize Celery instance
-celery = Celery(__name__)
+
+# Celery instance, created on first use: `import app` and the models do not load celery and kombu
+_celery = None
+
+
+def _get_celery():
+    global _celery
+    if _celery is None:
+        from celery import Celery
+        _celery = Celery(__name__)
+    return _celery
+
+
+def __getattr__(name):
+    # `from app.extensions import celery` (tasks, celery_worker) creates the instance
+    if name == 'celery':
+        return _get_celery()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def make_celery(app):
+    celery = _get_celery()
     celery.conf.update(
         app.config["CELERY"]
     )
@@ -5,6 +5,11 @@ from .user import User
 from .scan_resource import ScanResource
 from .scan_status import ScanStatus
 from .outbox_event import OutboxEvent
+from .document_signature import DocumentSignature
+from .document_lsh_band import DocumentLshBand
+from .scan_result_archive import ScanResultArchive
+from .boilerplate_phrase import BoilerplatePhrase
+from .scan_profile import ScanProfile
 
 
-__all__ = ['Result', 'Document', 'ScanResult', 'User', 'ScanResource', 'ScanStatus', 'OutboxEvent']
+__all__ = ['Result', 'Document', 'ScanResult', 'User', 'ScanResource', 'ScanStatus', 'OutboxEvent', 'DocumentSignature', 'DocumentLshBand', 'ScanResultArchive', 'BoilerplatePhrase', 'ScanProfile']
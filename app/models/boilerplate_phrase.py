@@ -0,0 +1,20 @@
+from datetime import datetime
+from app.extensions import db
+
+class BoilerplatePhrase(db.Model):
+    __tablename__ = 'boilerplate_phrases'
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    phrase_hash = db.Column(db.BigInteger, unique=True, nullable=False)
+    phrase = db.Column(db.String(255), nullable=False)
+    document_frequency = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'phrase_hash': self.phrase_hash,
+            'phrase': self.phrase,
+            'document_frequency': self.document_frequency,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
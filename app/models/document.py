@@ -12,7 +12,7 @@ class Document(db.Model):
     file_path = db.Column(db.String(500))
     mimetype = db.Column(db.String(100))
     file_size = db.Column(db.BigInteger)
-    upload_date = db.Column(db.DateTime, default=datetime.utcnow)
+    upload_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     author = db.Column(db.String(100), nullable=True)
     is_enable = db.Column(db.Boolean, default=True)
     is_included_in_solr = db.Column(db.Boolean, default=False)
@@ -20,6 +20,7 @@ class Document(db.Model):
 
     # Relationships
     scan_statuses = db.relationship('ScanStatus', backref='document', lazy=True, cascade='all, delete-orphan')
+    signature = db.relationship('DocumentSignature', backref='document', uselist=False, lazy=True, cascade='all, delete-orphan')
 
     def to_dict(self):
         return {
@@ -0,0 +1,22 @@
+from app.extensions import db
+
+class DocumentLshBand(db.Model):
+    __tablename__ = 'document_lsh_bands'
+    __table_args__ = (
+        db.Index('ix_document_lsh_bands_band', 'band_index', 'band_hash'),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    signature_id = db.Column(db.BigInteger, db.ForeignKey('document_signatures.id'), nullable=False)
+    document_id = db.Column(db.BigInteger, nullable=False)
+    band_index = db.Column(db.SmallInteger, nullable=False)
+    band_hash = db.Column(db.BigInteger, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'signature_id': self.signature_id,
+            'document_id': self.document_id,
+            'band_index': self.band_index,
+            'band_hash': self.band_hash
+        }
@@ -0,0 +1,22 @@
+from datetime import datetime
+from app.extensions import db
+
+class DocumentSignature(db.Model):
+    __tablename__ = 'document_signatures'
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    document_id = db.Column(db.BigInteger, db.ForeignKey('documents.id'), unique=True, nullable=False)
+    signature = db.Column(db.LargeBinary, nullable=False)  # packed uint32 MinHash values
+    num_perm = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relationships
+    lsh_bands = db.relationship('DocumentLshBand', backref='document_signature', lazy=True, cascade='all, delete-orphan')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'document_id': self.document_id,
+            'num_perm': self.num_perm,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
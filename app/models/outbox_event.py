@@ -2,6 +2,10 @@ from app.extensions import db
 
 class OutboxEvent(db.Model):
     __tablename__ = 'outbox_events'
+    __table_args__ = (
+        db.Index('ix_outbox_events_pending', 'processed', 'failed', 'id'),
+        db.Index('ix_outbox_events_retention', 'processed', 'failed', 'timestamp'),
+    )
 
     id = db.Column(db.BigInteger, primary_key=True)
     aggregate_type = db.Column(db.String(255), nullable=False) # e.g., 'FILE'
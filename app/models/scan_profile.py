@@ -0,0 +1,32 @@
+from datetime import datetime
+from app.extensions import db
+
+class ScanProfile(db.Model):
+    __tablename__ = 'scan_profiles'
+    __table_args__ = (
+        db.Index('ix_scan_profiles_scan_id', 'scan_id', 'created_at'),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    scan_id = db.Column(db.String(64), nullable=False)  # scan status id, job id or a generated id
+    source = db.Column(db.String(32), nullable=False)
+    filename = db.Column(db.String(255), nullable=True)
+    total_seconds = db.Column(db.Float, nullable=False)
+    stages = db.Column(db.JSON, nullable=False)
+    samples = db.Column(db.Integer, nullable=False)
+    collapsed_stacks = db.Column(db.LargeBinary(length=2**24 - 1), nullable=False)  # zlib compressed text
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'scan_id': self.scan_id,
+            'source': self.source,
+            'filename': self.filename,
+            'total_seconds': self.total_seconds,
+            'stages': self.stages,
+            'samples': self.samples,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
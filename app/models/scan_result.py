@@ -2,7 +2,11 @@ from app.extensions import db
 
 class ScanResult(db.Model):
     __tablename__ = 'scan_results'
-    
+    __table_args__ = (
+        db.Index('ix_scan_results_status_version', 'status_id', 'version'),
+        db.Index('ix_scan_results_archive_queue', 'is_archived', 'superseded_at'),
+    )
+
     id = db.Column(db.BigInteger, primary_key=True)
     status_id = db.Column(db.BigInteger, db.ForeignKey('scan_status.id'), nullable=False)
 
@@ -28,11 +32,24 @@ class ScanResult(db.Model):
     exp_max = db.Column(db.Integer, default=5)
     multi_source = db.Column(db.Boolean, default=False)
 
+    # Partial results (time or query budget exhausted)
+    is_complete = db.Column(db.Boolean, default=True)
+    incomplete_reason = db.Column(db.String(30), nullable=True)
+
+    # Re-scans add a new version; indexed_until is the index time the scan covered
+    version = db.Column(db.Integer, nullable=False, default=1)
+    indexed_until = db.Column(db.DateTime, nullable=True)
+
+    # Superseded versions have their output moved to scan_result_archives by the compaction task
+    superseded_at = db.Column(db.DateTime, nullable=True)
+    is_archived = db.Column(db.Boolean, nullable=False, default=False)
+
     # Results
     output_data = db.Column(db.JSON)  # Store the formatted output
 
     # Relationships
     scan_resources = db.relationship('ScanResource', backref='scan_result', lazy=True, cascade='all, delete-orphan')
+    archive = db.relationship('ScanResultArchive', backref='scan_result', uselist=False, lazy=True, cascade='all, delete-orphan')
 
     def to_dict(self):
         return {
@@ -59,5 +76,10 @@ class ScanResult(db.Model):
                 'exp_max': self.exp_max,
                 'multi_source': self.multi_source
             },
+            'is_complete': self.is_complete,
+            'incomplete_reason': self.incomplete_reason,
+            'version': self.version,
+            'indexed_until': self.indexed_until.isoformat() if self.indexed_until else None,
+            'is_archived': self.is_archived,
             'output_data': self.output_data
         }
@@ -0,0 +1,21 @@
+from datetime import datetime
+from app.extensions import db
+
+class ScanResultArchive(db.Model):
+    __tablename__ = 'scan_result_archives'
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    scan_result_id = db.Column(db.BigInteger, db.ForeignKey('scan_results.id'), unique=True, nullable=False)
+    output_data = db.Column(db.LargeBinary(length=2**32 - 1), nullable=False)  # zlib compressed JSON
+    original_size = db.Column(db.BigInteger, nullable=False)
+    compressed_size = db.Column(db.BigInteger, nullable=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'scan_result_id': self.scan_result_id,
+            'original_size': self.original_size,
+            'compressed_size': self.compressed_size,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None
+        }
@@ -3,15 +3,20 @@ from app.extensions import db
 
 class ScanStatus(db.Model):
     __tablename__ = 'scan_status'
+    __table_args__ = (
+        db.Index('ix_scan_status_document_created', 'document_id', 'created_scan_date'),
+    )
 
     id = db.Column(db.BigInteger, primary_key=True)
     document_id = db.Column(db.BigInteger, db.ForeignKey('documents.id'), nullable=False)
     created_scan_date = db.Column(db.DateTime, default=datetime.utcnow)
     finished_scan_date = db.Column(db.DateTime, nullable=True)
-    status = db.Column(db.String(20), nullable=False, default='pending')  # e.g., 'pending', 'in_progress', 'completed', 'failed'
+    status = db.Column(db.String(20), nullable=False, default='pending')  # e.g., 'pending', 'processing', 'completed', 'failed', 'cancelled'
+    batch_id = db.Column(db.String(36), nullable=True, index=True)  # groups the scans of one multiple file search
 
     # Relationships
-    scan_result = db.relationship('ScanResult', backref='scan_status', uselist=False, lazy=True, cascade='all, delete-orphan')
+    scan_results = db.relationship('ScanResult', backref='scan_status', lazy=True, cascade='all, delete-orphan',
+                                   order_by='ScanResult.version.desc()')
 
     def to_dict(self):
         return {
@@ -19,5 +24,6 @@ class ScanStatus(db.Model):
             'document_id': self.document_id,
             'created_scan_date': self.created_scan_date.isoformat() if self.created_scan_date else None,
             'finished_scan_date': self.finished_scan_date.isoformat() if self.finished_scan_date else None,
-            'status': self.status
+            'status': self.status,
+            'batch_id': self.batch_id
         }
\ No newline at end of file
@@ -1,9 +1,9 @@
 from ..models import OutboxEvent
 from ..extensions import db
 from ..services import SolrService, FileService
+from ..services.extraction_service import ExtractionService
 import json
 import logging
-import base64
 logger = logging.getLogger(__name__)
 
 """
@@ -14,9 +14,10 @@ Description: Processes outbox events related to file uploads and interacts with
 class OutboxEventUploadFileProcessor:
     def __init__(self):
         self.solr_service = SolrService()
+        self.extraction_service = ExtractionService()
 
     def process_pending_events(self):
-        events = OutboxEvent.query.filter_by(processed=False, failed=False).limit(100).all()
+        events = OutboxEvent.query.filter_by(processed=False, failed=False).order_by(OutboxEvent.id).limit(100).all()
 
         for event in events:
             try:
@@ -51,12 +52,12 @@ class OutboxEventUploadFileProcessor:
         except FileNotFoundError:
             raise Exception(f"File not found: {file_path}")
 
-        # Upload to Solr
-        response = self.solr_service.upload_file(
-            filename=data["filename"],
+        # Extract the text (locally when possible) and index it in Solr
+        text = self.extraction_service.extract(data["filename"], content, data["mimetype"])
+        response = self.solr_service.index_document(
             sha1_file=data["sha1_file"],
-            content=content,
-            mimetype=data["mimetype"],
+            filename=data["filename"],
+            text=text,
             description=data["description"]
         )
 
@@ -0,0 +1,188 @@
+import math
+import time
+import logging
+from typing import Optional, Dict, Any
+
+import redis
+from flask import request
+
+from ..config import Config
+from .redis_service import RedisService
+from .metrics_service import MetricsService
+
+logger = logging.getLogger(__name__)
+
+# Takes cost tokens from a per-user and a global bucket, or from neither. Buckets refill continuously;
+# a request larger than a bucket only needs a full bucket and leaves it in debt.
+# KEYS: user bucket, global bucket, metrics hash
+# ARGV: now (ms), cost, user capacity, user rate (/s), global capacity, global rate (/s)
+_TAKE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local levels = {}
+local wait = 0
+for i = 1, 2 do
+    local capacity = tonumber(ARGV[1 + i * 2])
+    local rate = tonumber(ARGV[2 + i * 2])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+    levels[i] = tokens
+    local needed = math.min(cost, capacity)
+    if tokens < needed then
+        wait = math.max(wait, math.ceil((needed - tokens) * 1000 / rate))
+    end
+end
+if wait > 0 then
+    redis.call('HINCRBY', KEYS[3], 'admission.rejected.rate_limit', 1)
+    return {0, wait}
+end
+for i = 1, 2 do
+    local capacity = tonumber(ARGV[1 + i * 2])
+    local rate = tonumber(ARGV[2 + i * 2])
+    redis.call('HSET', KEYS[i], 'tokens', tostring(levels[i] - cost), 'ts', ARGV[1])
+    redis.call('PEXPIRE', KEYS[i], math.ceil((capacity + cost) * 1000 / rate))
+end
+redis.call('HINCRBY', KEYS[3], 'admission.admitted', 1)
+redis.call('HINCRBY', KEYS[3], 'admission.admitted_samples', cost)
+redis.call('HSET', KEYS[3], 'admission.global_tokens', math.floor(levels[2] - cost))
+return {1, 0}
+"""
+
+
+class Rejection:
+    """Why a request was not admitted and when it may be retried"""
+    def __init__(self, reason: str, retry_after: int):
+        self.reason = reason
+        self.retry_after = max(1, retry_after)
+
+    def response(self):
+        return {
+            "status": 0,
+            "data": {"reason": self.reason, "retry_after": self.retry_after},
+            "message": "Hệ thống đang quá tải, vui lòng thử lại sau"
+        }, 429, {"Retry-After": str(self.retry_after)}
+
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Admission control for scan and upload endpoints. Scans take their estimated number of
+sample queries from a per-user and a global token bucket in Redis; uploads and queued scans are
+refused while the outbox or the Celery queues are backed up. Rejected requests get a 429 with
+Retry-After. Admission fails open: if Redis is unreachable every request is admitted.
+"""
+class AdmissionService:
+    BUCKET_PREFIX = "admission:bucket:"
+    _broker = None
+
+    def __init__(self):
+        self.redis = RedisService().client
+        self.metrics = MetricsService()
+        self._take = self.redis.register_script(_TAKE_SCRIPT)
+
+    @property
+    def broker(self):
+        if AdmissionService._broker is None:
+            AdmissionService._broker = redis.Redis.from_url(
+                Config.CELERY_BROKER_URL,
+                socket_timeout=Config.REDIS_TIMEOUT,
+                socket_connect_timeout=Config.REDIS_TIMEOUT
+            )
+        return AdmissionService._broker
+
+    @staticmethod
+    def client_id(user: str = None) -> str:
+        """
+        The caller a per-user bucket belongs to: an explicit user, else the client address. The user
+        header is only trusted on requests coming from one of ADMISSION_TRUSTED_PROXIES, any client
+        could otherwise pick a fresh bucket for each request.
+        """
+        if user:
+            return user
+        if request.remote_addr in Config.ADMISSION_TRUSTED_PROXIES:
+            forwarded = request.headers.get(Config.ADMISSION_USER_HEADER)
+            if forwarded:
+                return forwarded
+        return request.remote_addr or 'unknown'
+
+    @staticmethod
+    def estimate_samples(files: int = 0, text: str = None) -> int:
+        """Sample queries a request is expected to run"""
+        if text is not None:
+            return max(1, math.ceil(len(text) / Config.ADMISSION_CHARS_PER_SAMPLE))
+        return files * Config.ADMISSION_SAMPLES_PER_FILE
+
+    def admit_scan(self, samples: int, user: str = None, queued: bool = False) -> Optional[Rejection]:
+        """Admit a scan of about samples queries; queued scans also wait for the Celery queues"""
+        if not Config.ADMISSION_ENABLED:
+            return None
+        if queued:
+            rejection = self._check_queue_depth()
+            if rejection:
+                return rejection
+        return self._take_samples(self.client_id(user), samples)
+
+    def admit_upload(self, db_service) -> Optional[Rejection]:
+        """Refuse uploads while the outbox processor is behind"""
+        if not Config.ADMISSION_ENABLED:
+            return None
+        try:
+            backlog = db_service.count_pending_outbox_events()
+        except Exception as e:
+            logger.warning(f"Admission check skipped, outbox backlog unknown: {e}")
+            return None
+
+        self.metrics.set_gauge("admission.outbox_backlog", backlog)
+        if backlog >= Config.ADMISSION_MAX_OUTBOX_BACKLOG:
+            self.metrics.incr("admission.rejected.outbox_backlog")
+            return Rejection("outbox_backlog", Config.ADMISSION_QUEUE_RETRY_AFTER)
+        return None
+
+    def _check_queue_depth(self) -> Optional[Rejection]:
+        try:
+            pipe = self.broker.pipeline(transaction=False)
+            for queue in Config.ADMISSION_QUEUES:
+                # The Redis transport keeps each priority of a queue in its own list, "queue" and "queue:1".."queue:9"
+                pipe.llen(queue)
+                for priority in range(1, 10):
+                    pipe.llen(f"{queue}:{priority}")
+            depth = sum(pipe.execute())
+        except Exception as e:
+            logger.warning(f"Admission check skipped, queue depth unknown: {e}")
+            return None
+
+        self.metrics.set_gauge("admission.queue_depth", depth)
+        if depth >= Config.ADMISSION_MAX_QUEUE_DEPTH:
+            self.metrics.incr("admission.rejected.queue_depth")
+            return Rejection("queue_depth", Config.ADMISSION_QUEUE_RETRY_AFTER)
+        return None
+
+    def _take_samples(self, client: str, samples: int) -> Optional[Rejection]:
+        try:
+            allowed, wait_ms = self._take(
+                keys=[f"{self.BUCKET_PREFIX}user:{client}", f"{self.BUCKET_PREFIX}global", MetricsService.KEY],
+                args=[int(time.time() * 1000), samples,
+                      Config.ADMISSION_USER_SAMPLES_BURST, Config.ADMISSION_USER_SAMPLES_PER_SECOND,
+                      Config.ADMISSION_GLOBAL_SAMPLES_BURST, Config.ADMISSION_GLOBAL_SAMPLES_PER_SECOND]
+            )
+        except Exception as e:
+            logger.warning(f"Admission check skipped, Redis unavailable: {e}")
+            return None
+
+        if allowed:
+            return None
+        logger.info(f"Rate limited {client}: {samples} samples, retry in {wait_ms} ms")
+        return Rejection("rate_limit", math.ceil(wait_ms / 1000))
+
+    @staticmethod
+    def limits() -> Dict[str, Any]:
+        return {
+            "admission.limit.user_samples_burst": Config.ADMISSION_USER_SAMPLES_BURST,
+            "admission.limit.user_samples_per_second": Config.ADMISSION_USER_SAMPLES_PER_SECOND,
+            "admission.limit.global_samples_burst": Config.ADMISSION_GLOBAL_SAMPLES_BURST,
+            "admission.limit.global_samples_per_second": Config.ADMISSION_GLOBAL_SAMPLES_PER_SECOND,
+            "admission.limit.max_queue_depth": Config.ADMISSION_MAX_QUEUE_DEPTH,
+            "admission.limit.max_outbox_backlog": Config.ADMISSION_MAX_OUTBOX_BACKLOG
+        }
@@ -0,0 +1,169 @@
+import json
+import math
+import zlib
+import logging
+from array import array
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+
+from ..config import Config
+from .redis_service import RedisService
+from .boilerplate_service import BoilerplateService
+from .metrics_service import MetricsService
+
+logger = logging.getLogger(__name__)
+
+
+class BatchPeers:
+    """The other files of a batch that share shingles with one file, and the cached text of that file"""
+    def __init__(self, text: Optional[str], peers: List[Dict[str, Any]], shingles: Dict[str, frozenset]):
+        self.text = text
+        self.peers = peers
+        self.shingles = shingles
+        self._union = frozenset().union(*shingles.values())
+
+    def match(self, samples_with_positions, search_results, skip=frozenset()) -> Dict[int, list]:
+        """
+        Add the peers whose shared shingles cover a whole sample to that sample's hits, ahead of the
+        Solr hits. Every sample is checked, including those adaptive sampling did not query.
+        """
+        if not self._union:
+            return search_results
+
+        k = Config.BATCH_PEER_SHINGLE_SIZE
+        results = dict(search_results)
+        matched_samples = 0
+        for item in samples_with_positions:
+            if item['index'] in skip:
+                continue
+            tokens = BoilerplateService.tokenize(item['sample'])
+            if len(tokens) < k:
+                continue
+            hashes = [BoilerplateService.phrase_hash(' '.join(tokens[i:i + k])) for i in range(len(tokens) - k + 1)]
+            if not all(h in self._union for h in hashes):
+                continue
+
+            docs = [
+                {"id": peer["id"], "resource_name": peer["name"], "description": peer["description"], "batch_peer": True}
+                for peer in self.peers if all(h in self.shingles[peer["key"]] for h in hashes)
+            ]
+            if docs:
+                peer_ids = {doc["id"] for doc in docs}
+                results[item['index']] = docs + [doc for doc in results.get(item['index'], []) if doc["id"] not in peer_ids]
+                matched_samples += 1
+
+        logger.info("Batch peers matched %s samples", matched_samples)
+        return results
+
+    def summary(self) -> List[Dict[str, Any]]:
+        return [{name: value for name, value in peer.items() if name != "key"} for peer in self.peers]
+
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Batch peer check of a multiple file search. Before the files are scanned, build() shingles
+all of them once and compares every pair in memory through an inverted index, ignoring shingles
+found in more than BATCH_PEER_MAX_DF of the files (the assignment text). For each file it keeps, in
+Redis, the shingles it shares with each other file and its extracted text; the scan of the file loads
+them with load() and adds the peers to its sources, whatever the order of the files in the batch.
+"""
+class BatchPeerService:
+    PREFIX = "batch_peers:"
+
+    def __init__(self):
+        self.redis = RedisService().client
+
+    def _key(self, batch_id: str, scan_status_id) -> str:
+        return f"{self.PREFIX}{batch_id}:{scan_status_id}"
+
+    @staticmethod
+    def shingle_hashes(document: str) -> set:
+        k = Config.BATCH_PEER_SHINGLE_SIZE
+        hashes = set()
+        for line in document.split('\n'):
+            tokens = BoilerplateService.tokenize(line)
+            for i in range(len(tokens) - k + 1):
+                hashes.add(BoilerplateService.phrase_hash(' '.join(tokens[i:i + k])))
+        return hashes
+
+    def build(self, batch_id: str, files: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Compare the files of a batch with each other and store the result per file. Each file has
+        scan_status_id, id (file hash), name, description, text (as extracted) and document (normalized).
+        """
+        shingles = {str(file["scan_status_id"]): self.shingle_hashes(file["document"]) for file in files}
+
+        postings = defaultdict(list)
+        for key, hashes in shingles.items():
+            for h in hashes:
+                postings[h].append(key)
+
+        # A shingle shared by three files of a small batch is still a copy, not the assignment text
+        max_df = max(3, math.ceil(Config.BATCH_PEER_MAX_DF * len(files)))
+        shared = defaultdict(lambda: defaultdict(list))
+        ignored = 0
+        for h, keys in postings.items():
+            if len(keys) < 2:
+                continue
+            if len(keys) > max_df:
+                ignored += 1
+                continue
+            for key in keys:
+                for peer_key in keys:
+                    if peer_key != key:
+                        shared[key][peer_key].append(h)
+
+        by_key = {str(file["scan_status_id"]): file for file in files}
+        pipe = self.redis.pipeline(transaction=False)
+        pairs = 0
+        for key, file in by_key.items():
+            peers = []
+            mapping = {"text": zlib.compress(file["text"].encode('utf-8'))}
+            for peer_key, hashes in sorted(shared[key].items(), key=lambda item: len(item[1]), reverse=True):
+                peer = by_key[peer_key]
+                peers.append({
+                    "key": peer_key,
+                    "id": peer["id"],
+                    "name": peer["name"],
+                    "description": peer["description"],
+                    "shared_shingles": len(hashes),
+                    # Share of this file's shingles also found in the peer
+                    "containment": round(len(hashes) / len(shingles[key]), 4)
+                })
+                mapping[f"shingles:{peer_key}"] = zlib.compress(array('q', sorted(hashes)).tobytes())
+            mapping["peers"] = json.dumps(peers)
+            pairs += len(peers)
+            pipe.delete(self._key(batch_id, key))
+            pipe.hset(self._key(batch_id, key), mapping=mapping)
+            pipe.expire(self._key(batch_id, key), Config.BATCH_PEER_TTL)
+        pipe.execute()
+
+        summary = {"files": len(files), "pairs": pairs // 2, "ignored_shingles": ignored}
+        MetricsService().incr("batch_peers.pairs", pairs // 2)
+        logger.info(f"Batch {batch_id} compared: {summary}")
+        return summary
+
+    def load(self, batch_id: str, scan_status_id) -> Optional[BatchPeers]:
+        """The batch peers of one file, None when the batch was not compared or Redis is unavailable"""
+        try:
+            stored = self.redis.hgetall(self._key(batch_id, scan_status_id))
+        except Exception as e:
+            logger.warning(f"Failed to load batch peers of scan {scan_status_id}: {e}")
+            return None
+        if not stored:
+            return None
+
+        peers = json.loads(stored[b"peers"])
+        shingles = {}
+        for peer in peers:
+            hashes = array('q')
+            hashes.frombytes(zlib.decompress(stored[f"shingles:{peer['key']}".encode('utf-8')]))
+            shingles[peer["key"]] = frozenset(hashes)
+        return BatchPeers(zlib.decompress(stored[b"text"]).decode('utf-8'), peers, shingles)
+
+    def discard(self, batch_id: str, scan_status_id):
+        try:
+            self.redis.delete(self._key(batch_id, scan_status_id))
+        except Exception as e:
+            logger.warning(f"Failed to discard batch peers of scan {scan_status_id}: {e}")
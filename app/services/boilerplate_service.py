@@ -0,0 +1,141 @@
+import re
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List
+
+from ..config import Config
+from .solr_service import SolrService
+from .database_service import DatabaseService
+from .metrics_service import MetricsService
+
+logger = logging.getLogger(__name__)
+
+# Close to the StandardTokenizer + LowerCaseFilter chain of the shingled Solr field
+_TOKEN_PATTERN = re.compile(r"\w+(?:['’.]\w+)*")
+
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Corpus boilerplate phrases (cover pages, institution names, standard declarations,
+reference formatting). The table holds the word shingles of the Solr shingled field whose document
+frequency is at least BOILERPLATE_MIN_DF; `flask boilerplate-build` reads them from the Solr term
+dictionary and applies only the differences to the boilerplate_phrases table, so rebuilding after
+the corpus grew is cheap. Workers keep the phrase hashes in memory and reload them every
+BOILERPLATE_RELOAD_INTERVAL seconds. A sample whose shingles are all boilerplate is not queried.
+"""
+class BoilerplateService:
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(BoilerplateService, cls).__new__(cls)
+                cls._instance._initialized = False
+            return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.db_service = DatabaseService()
+        self.shingle_size = Config.SOLR_SHINGLE_SIZE
+        self._hashes = frozenset()
+        self._loaded_at = None
+        self._initialized = True
+
+    @staticmethod
+    def phrase_hash(phrase: str) -> int:
+        """Signed 64-bit hash of a phrase, as stored in boilerplate_phrases.phrase_hash"""
+        return int.from_bytes(hashlib.blake2b(phrase.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return _TOKEN_PATTERN.findall(text.lower())
+
+    def phrase_hashes(self) -> frozenset:
+        """The boilerplate phrase hashes, loaded on first use and reloaded when stale"""
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at >= Config.BOILERPLATE_RELOAD_INTERVAL:
+            with self._lock:
+                if self._loaded_at is None or now - self._loaded_at >= Config.BOILERPLATE_RELOAD_INTERVAL:
+                    try:
+                        self._hashes = frozenset(self.db_service.get_boilerplate_phrase_hashes(Config.BOILERPLATE_MAX_PHRASES))
+                        logger.info(f"Loaded {len(self._hashes)} boilerplate phrases")
+                    except Exception as e:
+                        # Keep the previous table; scans only lose the query savings
+                        logger.warning(f"Failed to load boilerplate phrases: {e}")
+                    self._loaded_at = now
+        return self._hashes
+
+    def find(self, samples_with_positions) -> set:
+        """Indexes of the samples made only of boilerplate shingles"""
+        if Config.BOILERPLATE_MODE == 'off':
+            return set()
+        hashes = self.phrase_hashes()
+        if not hashes:
+            return set()
+
+        k = self.shingle_size
+        known = {}
+        boilerplate = set()
+        for item in samples_with_positions:
+            tokens = self.tokenize(item['sample'])
+            if len(tokens) < k:
+                continue
+            for i in range(len(tokens) - k + 1):
+                shingle = ' '.join(tokens[i:i + k])
+                if shingle not in known:
+                    known[shingle] = self.phrase_hash(shingle) in hashes
+                if not known[shingle]:
+                    break
+            else:
+                boilerplate.add(item['index'])
+        return boilerplate
+
+    def build(self, dry_run=False) -> Dict[str, Any]:
+        """Sync the boilerplate table with the document frequencies of the Solr shingled field"""
+        k = self.shingle_size
+        found = {}
+        for term, frequency in SolrService().iter_terms(Config.SOLR_SHINGLE_FIELD, Config.BOILERPLATE_MIN_DF,
+                                                        Config.BOILERPLATE_BATCH_SIZE):
+            # The field also indexes single words
+            if term.count(' ') != k - 1 or len(term) > 255:
+                continue
+            found[self.phrase_hash(term)] = (term, frequency)
+
+        if len(found) > Config.BOILERPLATE_MAX_PHRASES:
+            kept = sorted(found.items(), key=lambda item: item[1][1], reverse=True)[:Config.BOILERPLATE_MAX_PHRASES]
+            found = dict(kept)
+
+        existing = self.db_service.get_boilerplate_phrase_frequencies()
+        inserts = [
+            {"phrase_hash": phrase_hash, "phrase": phrase, "document_frequency": frequency}
+            for phrase_hash, (phrase, frequency) in found.items() if phrase_hash not in existing
+        ]
+        updates = [
+            {"id": existing[phrase_hash][0], "document_frequency": frequency}
+            for phrase_hash, (_, frequency) in found.items()
+            if phrase_hash in existing and existing[phrase_hash][1] != frequency
+        ]
+        deleted_ids = [phrase_id for phrase_hash, (phrase_id, _) in existing.items() if phrase_hash not in found]
+
+        summary = {"phrases": len(found), "inserted": len(inserts), "updated": len(updates), "deleted": len(deleted_ids)}
+        if dry_run:
+            return summary
+
+        size = Config.BOILERPLATE_BATCH_SIZE
+        for start in range(0, max(len(inserts), len(updates), len(deleted_ids)), size):
+            self.db_service.apply_boilerplate_changes(
+                inserts[start:start + size], updates[start:start + size], deleted_ids[start:start + size]
+            )
+
+        MetricsService().set_gauges({
+            "boilerplate.phrases": len(found),
+            "boilerplate.last_run_at": datetime.utcnow().isoformat()
+        })
+        logger.info(f"Boilerplate table rebuilt: {summary}")
+        return summary
@@ -0,0 +1,63 @@
+import time
+import logging
+import threading
+
+from ..config import Config
+from .solr_service import SolrService
+
+logger = logging.getLogger(__name__)
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Coordinates index visibility in Solr. Writes become visible through commitWithin;
+callers that need read-your-writes wait for their document, and a soft commit is only issued
+when commitWithin has not made it visible in time. Concurrent soft commits are coalesced.
+"""
+class CommitCoordinator:
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super(CommitCoordinator, cls).__new__(cls)
+                cls._instance._initialized = False
+            return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.solr_service = SolrService()
+        self._commit_lock = threading.Lock()
+        self._last_commit_started = 0.0
+        self._initialized = True
+
+    def soft_commit(self) -> bool:
+        """
+        Make all acknowledged writes visible. Callers queued behind a commit that started after
+        they asked for one return without issuing another.
+        """
+        requested_at = time.monotonic()
+        with self._commit_lock:
+            if self._last_commit_started >= requested_at:
+                return True
+            self._last_commit_started = time.monotonic()
+            return self.solr_service.soft_commit()
+
+    def wait_for_visibility(self, doc_id: str, present: bool = True, timeout: float = None) -> bool:
+        """
+        Block until a document is (or, with present=False, is no longer) visible to searches.
+        Falls back to a soft commit if commitWithin has not applied the change before the timeout.
+        """
+        timeout = Config.SOLR_VISIBILITY_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while time.monotonic() < deadline:
+            if self.solr_service.document_exists(doc_id) == present:
+                return True
+            time.sleep(Config.SOLR_VISIBILITY_POLL_INTERVAL)
+
+        logger.info("Document %s not visible after %ss, forcing a soft commit", doc_id, timeout)
+        self.soft_commit()
+        return self.solr_service.document_exists(doc_id) == present
@@ -0,0 +1,93 @@
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any
+
+from ..config import Config
+from .database_service import DatabaseService
+from .metrics_service import MetricsService
+
+logger = logging.getLogger(__name__)
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Retention and compaction of cold rows, run by the compact_storage Celery beat task.
+Deletes processed outbox events past their retention window and moves the output of superseded
+scan result versions into the compressed scan_result_archives table. Work is done in small batches,
+one transaction each, with a pause in between and a time limit per run, so it never holds long locks.
+"""
+class CompactionService:
+    def __init__(self):
+        self.db_service = DatabaseService()
+        self.metrics = MetricsService()
+
+    def run(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        deadline = started + Config.COMPACTION_MAX_SECONDS
+
+        summary = {
+            "outbox_deleted": self.compact_outbox(deadline),
+            **self.archive_scan_outputs(deadline)
+        }
+
+        elapsed = time.monotonic() - started
+        self.metrics.set_gauges({
+            "compaction.last_run_at": datetime.utcnow().isoformat(),
+            "compaction.last_run_seconds": round(elapsed, 3),
+            "compaction.last_run_outbox_deleted": summary["outbox_deleted"],
+            "compaction.last_run_scan_outputs_archived": summary["archived"]
+        })
+        logger.info(f"Compaction finished in {elapsed:.1f}s: {summary}")
+        return summary
+
+    def compact_outbox(self, deadline: float) -> int:
+        """Delete processed outbox events; failed ones are kept longer for investigation"""
+        now = datetime.utcnow()
+        windows = (
+            (False, now - timedelta(days=Config.OUTBOX_RETENTION_DAYS)),
+            (True, now - timedelta(days=Config.OUTBOX_FAILED_RETENTION_DAYS))
+        )
+
+        total = 0
+        backlog = False
+        for failed, cutoff in windows:
+            while time.monotonic() < deadline:
+                deleted = self.db_service.delete_processed_outbox_events(cutoff, failed, Config.COMPACTION_BATCH_SIZE)
+                total += deleted
+                self.metrics.incr("compaction.outbox_deleted", deleted)
+                if deleted < Config.COMPACTION_BATCH_SIZE:
+                    break
+                time.sleep(Config.COMPACTION_BATCH_PAUSE)
+            else:
+                backlog = True
+
+        # 1 while runs stop at the time limit before catching up with the retention window
+        self.metrics.set_gauge("compaction.outbox_backlog", int(backlog))
+        return total
+
+    def archive_scan_outputs(self, deadline: float) -> Dict[str, int]:
+        cutoff = datetime.utcnow() - timedelta(hours=Config.SCAN_OUTPUT_ARCHIVE_AFTER_HOURS)
+        totals = {"archived": 0, "original_bytes": 0, "compressed_bytes": 0}
+
+        backlog = False
+        while time.monotonic() < deadline:
+            ids = self.db_service.get_superseded_scan_result_ids(cutoff, Config.COMPACTION_BATCH_SIZE)
+            if not ids:
+                break
+
+            batch = self.db_service.archive_scan_result_outputs(ids, Config.SCAN_OUTPUT_ARCHIVE_LEVEL)
+            for name, value in batch.items():
+                totals[name] += value
+            self.metrics.incr("compaction.scan_outputs_archived", batch["archived"])
+            self.metrics.incr("compaction.scan_outputs_original_bytes", batch["original_bytes"])
+            self.metrics.incr("compaction.scan_outputs_compressed_bytes", batch["compressed_bytes"])
+
+            if len(ids) < Config.COMPACTION_BATCH_SIZE:
+                break
+            time.sleep(Config.COMPACTION_BATCH_PAUSE)
+        else:
+            backlog = True
+
+        self.metrics.set_gauge("compaction.scan_outputs_backlog", int(backlog))
+        return totals
@@ -1,5 +1,8 @@
 from typing import List, Optional, Dict, Any
 from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime
+import json
+import zlib
 import logging
 
 logger = logging.getLogger(__name__)
@@ -70,7 +73,8 @@ class DatabaseService:
             raise Exception(f"Database error: {str(e)}")
 
     def create_scan_status(self, document_id: int,
-                           status: str = 'pending') -> Optional[Any]:
+                           status: str = 'pending',
+                           batch_id: str = None) -> Optional[Any]:
         """Create a new scan status record"""
         try:
             from ..models.scan_status import ScanStatus
@@ -78,6 +82,7 @@ class DatabaseService:
             scan_status = ScanStatus(
                 document_id=document_id,
                 status=status,
+                batch_id=batch_id
             )
             
             self.db.session.add(scan_status)
@@ -108,8 +113,65 @@ class DatabaseService:
             logger.error(f"Error updating scan status: {str(e)}")
             raise Exception(f"Database error: {str(e)}")
 
+    def start_scan_status(self, scan_status_id: int) -> bool:
+        """Move a pending scan to processing; returns False if it was cancelled meanwhile"""
+        try:
+            from ..models.scan_status import ScanStatus
+
+            updated = ScanStatus.query.filter_by(id=scan_status_id, status='pending').update(
+                {"status": "processing"}, synchronize_session=False
+            )
+            self.db.session.commit()
+            return updated > 0
+        except SQLAlchemyError as e:
+            self.db.session.rollback()
+            logger.error(f"Error starting scan status: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def is_scan_cancelled(self, scan_status_id: int) -> bool:
+        """Read the current scan status on a fresh connection so a running scan sees cancellations"""
+        try:
+            from ..models.scan_status import ScanStatus
+            from sqlalchemy import select
+
+            with self.db.engine.connect() as connection:
+                status = connection.execute(
+                    select(ScanStatus.status).where(ScanStatus.id == scan_status_id)
+                ).scalar()
+            return status == 'cancelled'
+        except SQLAlchemyError as e:
+            logger.error(f"Error reading scan status: {str(e)}")
+            return False
+
+    def cancel_scans(self, batch_id: str = None, scan_status_id: int = None) -> List[int]:
+        """Cancel the pending and processing scans of a batch or a single scan"""
+        try:
+            from ..models.scan_status import ScanStatus
+
+            query = ScanStatus.query.filter(ScanStatus.status.in_(['pending', 'processing']))
+            if batch_id:
+                query = query.filter(ScanStatus.batch_id == batch_id)
+            if scan_status_id:
+                query = query.filter(ScanStatus.id == scan_status_id)
+
+            scan_statuses = query.all()
+            for scan_status in scan_statuses:
+                scan_status.status = 'cancelled'
+                scan_status.finished_scan_date = datetime.utcnow()
+
+            self.db.session.commit()
+            cancelled_ids = [scan_status.id for scan_status in scan_statuses]
+            logger.info(f"Cancelled scans: {cancelled_ids}")
+            return cancelled_ids
+        except SQLAlchemyError as e:
+            self.db.session.rollback()
+            logger.error(f"Error cancelling scans: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
     def create_scan_result(self, status_id: int, metrics: Dict[str, Any], 
-                          parameters: Dict[str, Any], output_data: Dict = None) -> Optional[Any]:
+                          parameters: Dict[str, Any], output_data: Dict = None,
+                          is_complete: bool = True, incomplete_reason: str = None,
+                          version: int = 1, indexed_until: datetime = None) -> Optional[Any]:
         """Create a new scan result record"""
         try:
             from ..models.scan_result import ScanResult
@@ -133,10 +195,21 @@ class DatabaseService:
                 exp_min=parameters.get('exp_min', 3),
                 exp_max=parameters.get('exp_max', 5),
                 multi_source=parameters.get('multi_source', False),
+                is_complete=is_complete,
+                incomplete_reason=incomplete_reason,
+                version=version,
+                indexed_until=indexed_until,
                 output_data=output_data
             )
             
             self.db.session.add(scan_result)
+            if version > 1:
+                # Older versions become eligible for archiving by the compaction task
+                ScanResult.query.filter(
+                    ScanResult.status_id == status_id,
+                    ScanResult.version < version,
+                    ScanResult.superseded_at.is_(None)
+                ).update({"superseded_at": datetime.utcnow()}, synchronize_session=False)
             self.db.session.commit()
             logger.info(f"Created scan result with ID: {scan_result.id}")
             return scan_result
@@ -189,61 +262,94 @@ class DatabaseService:
             raise Exception(f"Database error: {str(e)}")
 
     def get_documents_with_scan_status(self, limit: int = 100, offset: int = 0) -> List[Dict]:
-        """Get documents with their latest scan statuses"""
-        """Get documents with their latest scan status details"""
+        """
+        Get a page of documents (newest first), one item per document: scan_status is its latest scan
+        status and scan_statuses all of them, latest first
+        """
         try:
             from ..models.document import Document
             from ..models.scan_status import ScanStatus
-            from sqlalchemy import desc
 
-            # Query documents with their latest scan status
+            # Page over documents first so the sort walks ix_documents_upload_date instead of
+            # sorting the whole documents x scan_status join, then attach the page's scan statuses
+            page = self.db.session.query(
+                Document.id
+            ).order_by(
+                Document.upload_date.desc(),
+                Document.id.desc()
+            ).offset(offset).limit(limit).subquery()
+
             results = self.db.session.query(
                 Document,
                 ScanStatus
+            ).join(
+                page,
+                Document.id == page.c.id
             ).outerjoin(
                 ScanStatus,
                 Document.id == ScanStatus.document_id
             ).order_by(
                 Document.upload_date.desc(),
+                Document.id.desc(),
                 ScanStatus.created_scan_date.desc()
-            ).offset(offset).limit(limit).all()
+            ).all()
 
-            # Format the results
-            documents = []
+            # Format the results; rows come grouped by document, its latest scan status first
+            documents = {}
             for doc, status in results:
-                document_data = {
-                    "id": doc.id,
-                    "research_name": doc.research_name,
-                    "file_name": doc.file_name,
-                    "file_hash": doc.file_hash,
-                    "description": doc.description,
-                    "file_size": doc.file_size,
-                    "author": doc.author,
-                    "upload_date": doc.upload_date.isoformat() if doc.upload_date else None,
-                    "is_enable": doc.is_enable,
-                    "scan_status": {
-                        "id": status.id if status else None,
-                        "status": status.status if status else None,
-                        "created_scan_date": status.created_scan_date.isoformat() if status and status.created_scan_date else None,
-                        "finished_scan_date": status.finished_scan_date.isoformat() if status and status.finished_scan_date else None
-                    } if status else None
-                }
-                documents.append(document_data)
-
-            return documents
+                document_data = documents.get(doc.id)
+                if document_data is None:
+                    document_data = documents[doc.id] = {
+                        "id": doc.id,
+                        "research_name": doc.research_name,
+                        "file_name": doc.file_name,
+                        "file_hash": doc.file_hash,
+                        "description": doc.description,
+                        "file_size": doc.file_size,
+                        "author": doc.author,
+                        "upload_date": doc.upload_date.isoformat() if doc.upload_date else None,
+                        "is_enable": doc.is_enable,
+                        "scan_status": None,
+                        "scan_statuses": []
+                    }
+                if status:
+                    document_data["scan_statuses"].append({
+                        "id": status.id,
+                        "status": status.status,
+                        "created_scan_date": status.created_scan_date.isoformat() if status.created_scan_date else None,
+                        "finished_scan_date": status.finished_scan_date.isoformat() if status.finished_scan_date else None
+                    })
+                    if document_data["scan_status"] is None:
+                        document_data["scan_status"] = document_data["scan_statuses"][0]
+
+            return list(documents.values())
 
         except SQLAlchemyError as e:
             logger.error(f"Error getting documents with scan status: {str(e)}")
             raise Exception(f"Database error: {str(e)}")
 
-    def get_scan_result_by_scan_status_id(self, status_id: int) -> Dict:
-        """Get scan result and resources for a given scan status ID"""
+    def count_documents(self) -> int:
+        """Number of documents, the total of the document list pages"""
+        try:
+            from ..models.document import Document
+
+            return self.db.session.query(Document.id).count()
+
+        except SQLAlchemyError as e:
+            logger.error(f"Error counting documents: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def get_scan_result_by_scan_status_id(self, status_id: int, version: int = None) -> Dict:
+        """Get scan result and resources for a given scan status ID, the latest version unless one is given"""
         try:
             from ..models.scan_result import ScanResult
             from ..models.scan_resource import ScanResource
 
-            # Get the scan result
-            scan_result = ScanResult.query.filter_by(status_id=status_id).first()
+            query = ScanResult.query.filter_by(status_id=status_id)
+            if version is not None:
+                scan_result = query.filter_by(version=version).first()
+            else:
+                scan_result = query.order_by(ScanResult.version.desc()).first()
             if not scan_result:
                 return None
 
@@ -275,6 +381,11 @@ class DatabaseService:
                     "exp_max": scan_result.exp_max,
                     "multi_source": scan_result.multi_source
                 },
+                "is_complete": scan_result.is_complete,
+                "incomplete_reason": scan_result.incomplete_reason,
+                "version": scan_result.version,
+                "indexed_until": scan_result.indexed_until.isoformat() if scan_result.indexed_until else None,
+                "is_archived": scan_result.is_archived,
                 "resources": [
                     {
                         "id": resource.source_id,
@@ -285,11 +396,296 @@ class DatabaseService:
                         "samples": resource.samples
                     } for resource in scan_resources
                 ],
-                "output_data": scan_result.output_data
+                "output_data": self.get_scan_result_output(scan_result)
             }
 
             return result
 
         except SQLAlchemyError as e:
             logger.error(f"Error getting scan result: {str(e)}")
-            raise Exception(f"Database error: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Database error: {str(e)}")
+
+    def get_scan_status(self, scan_status_id: int) -> Optional[Any]:
+        """Get a scan status by ID"""
+        try:
+            from ..models.scan_status import ScanStatus
+            return ScanStatus.query.get(scan_status_id)
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting scan status: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def get_scan_status_states(self, scan_status_ids: List[int]) -> Dict[int, str]:
+        """Status of several scans by ID, without loading the rows"""
+        try:
+            from ..models.scan_status import ScanStatus
+            rows = self.db.session.query(ScanStatus.id, ScanStatus.status).filter(
+                ScanStatus.id.in_(scan_status_ids)
+            ).all()
+            return {scan_status_id: status for scan_status_id, status in rows}
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting scan status states: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def get_latest_scan_result(self, status_id: int) -> Optional[Any]:
+        """Get the latest version of the scan result of a scan status"""
+        try:
+            from ..models.scan_result import ScanResult
+            return ScanResult.query.filter_by(status_id=status_id).order_by(ScanResult.version.desc()).first()
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting latest scan result: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def get_scan_result_output(self, scan_result) -> Optional[Dict]:
+        """Output data of a scan result, read back from the archive table for archived versions"""
+        if not scan_result.is_archived:
+            return scan_result.output_data
+        try:
+            from ..models.scan_result_archive import ScanResultArchive
+
+            archive = ScanResultArchive.query.filter_by(scan_result_id=scan_result.id).first()
+            if archive is None:
+                return None
+            return json.loads(zlib.decompress(archive.output_data).decode('utf-8'))
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting archived scan output: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def get_superseded_scan_result_ids(self, superseded_before: datetime, limit: int) -> List[int]:
+        """Ids of superseded scan results whose output is still in scan_results"""
+        try:
+            from ..models.scan_result import ScanResult
+
+            rows = self.db.session.query(ScanResult.id).filter_by(
+                is_archived=False
+            ).filter(
+                ScanResult.superseded_at < superseded_before
+            ).order_by(ScanResult.superseded_at).limit(limit).all()
+            return [row[0] for row in rows]
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting superseded scan results: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def archive_scan_result_outputs(self, scan_result_ids: List[int], compression_level: int) -> Dict[str, int]:
+        """Move the output of scan results into compressed scan_result_archives rows, in one transaction"""
+        try:
+            from ..models.scan_result import ScanResult
+            from ..models.scan_result_archive import ScanResultArchive
+
+            archived = original_bytes = compressed_bytes = 0
+            scan_results = ScanResult.query.filter(
+                ScanResult.id.in_(scan_result_ids)
+            ).filter_by(is_archived=False).all()
+            for scan_result in scan_results:
+                data = json.dumps(scan_result.output_data, ensure_ascii=False).encode('utf-8')
+                compressed = zlib.compress(data, compression_level)
+                self.db.session.add(ScanResultArchive(
+                    scan_result_id=scan_result.id,
+                    output_data=compressed,
+                    original_size=len(data),
+                    compressed_size=len(compressed)
+                ))
+                scan_result.output_data = None
+                scan_result.is_archived = True
+                archived += 1
+                original_bytes += len(data)
+                compressed_bytes += len(compressed)
+
+            self.db.session.commit()
+            return {"archived": archived, "original_bytes": original_bytes, "compressed_bytes": compressed_bytes}
+        except SQLAlchemyError as e:
+            self.db.session.rollback()
+            logger.error(f"Error archiving scan outputs: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def delete_processed_outbox_events(self, processed_before: datetime, failed: bool, limit: int) -> int:
+        """Delete up to limit processed outbox events older than processed_before, oldest first"""
+        try:
+            from ..models.outbox_event import OutboxEvent
+
+            ids = [row[0] for row in self.db.session.query(OutboxEvent.id).filter_by(
+                processed=True,
+                failed=failed
+            ).filter(
+                OutboxEvent.timestamp < processed_before
+            ).order_by(OutboxEvent.timestamp).limit(limit).all()]
+            if not ids:
+                return 0
+
+            deleted = OutboxEvent.query.filter(OutboxEvent.id.in_(ids)).delete(synchronize_session=False)
+            self.db.session.commit()
+            return deleted
+        except SQLAlchemyError as e:
+            self.db.session.rollback()
+            logger.error(f"Error deleting outbox events: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def count_pending_outbox_events(self) -> int:
+        """Number of outbox events waiting for the processor"""
+        try:
+            from ..models.outbox_event import OutboxEvent
+            return OutboxEvent.query.filter_by(processed=False, failed=False).count()
+        except SQLAlchemyError as e:
+            logger.error(f"Error counting outbox events: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def create_scan_profile(self, scan_id: str, source: str, filename: Optional[str], total_seconds: float,
+                            stages: Dict[str, Any], samples: int, collapsed_stacks: bytes,
+                            error: Optional[str] = None) -> Any:
+        """Store the profile of a profiled scan"""
+        try:
+            from ..models.scan_profile import ScanProfile
+
+            profile = ScanProfile(
+                scan_id=scan_id,
+                source=source,
+                filename=filename,
+                total_seconds=total_seconds,
+                stages=stages,
+                samples=samples,
+                collapsed_stacks=collapsed_stacks,
+                error=error
+            )
+            self.db.session.add(profile)
+            self.db.session.commit()
+            return profile
+        except SQLAlchemyError as e:
+            self.db.session.rollback()
+            logger.error(f"Error creating scan profile: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def get_scan_profiles(self, scan_id: str, limit: int = 10) -> List[Any]:
+        """Profiles stored for a scan id, newest first"""
+        try:
+            from ..models.scan_profile import ScanProfile
+            return ScanProfile.query.filter_by(scan_id=scan_id).order_by(
+                ScanProfile.created_at.desc()
+            ).limit(limit).all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting scan profiles: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def get_boilerplate_phrase_hashes(self, limit: int) -> List[int]:
+        """Hashes of the limit most frequent boilerplate phrases"""
+        try:
+            from ..models.boilerplate_phrase import BoilerplatePhrase
+            rows = self.db.session.query(BoilerplatePhrase.phrase_hash).order_by(
+                BoilerplatePhrase.document_frequency.desc()
+            ).limit(limit).all()
+            return [row[0] for row in rows]
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting boilerplate phrases: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def get_boilerplate_phrase_frequencies(self) -> Dict[int, tuple]:
+        """phrase_hash -> (id, document_frequency) of every stored boilerplate phrase"""
+        try:
+            from ..models.boilerplate_phrase import BoilerplatePhrase
+            rows = self.db.session.query(
+                BoilerplatePhrase.phrase_hash, BoilerplatePhrase.id, BoilerplatePhrase.document_frequency
+            ).all()
+            return {phrase_hash: (phrase_id, frequency) for phrase_hash, phrase_id, frequency in rows}
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting boilerplate phrase frequencies: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def apply_boilerplate_changes(self, inserts: List[Dict[str, Any]], updates: List[Dict[str, Any]],
+                                  deleted_ids: List[int]) -> None:
+        """Insert, update (by id) and delete boilerplate phrases in one transaction"""
+        try:
+            from ..models.boilerplate_phrase import BoilerplatePhrase
+
+            now = datetime.utcnow()
+            if inserts:
+                self.db.session.bulk_insert_mappings(BoilerplatePhrase, [{**row, "updated_at": now} for row in inserts])
+            if updates:
+                self.db.session.bulk_update_mappings(BoilerplatePhrase, [{**row, "updated_at": now} for row in updates])
+            if deleted_ids:
+                BoilerplatePhrase.query.filter(BoilerplatePhrase.id.in_(deleted_ids)).delete(synchronize_session=False)
+            self.db.session.commit()
+        except SQLAlchemyError as e:
+            self.db.session.rollback()
+            logger.error(f"Error saving boilerplate phrases: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def get_document_signature(self, document_id: int) -> Optional[Any]:
+        """Get the MinHash signature stored for a document"""
+        try:
+            from ..models.document_signature import DocumentSignature
+            return DocumentSignature.query.filter_by(document_id=document_id).first()
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting document signature: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def create_document_signature(self, document_id: int, signature: bytes, num_perm: int,
+                                  band_hashes: List[int]) -> Optional[Any]:
+        """Create a MinHash signature record and its LSH band entries"""
+        try:
+            from ..models.document_signature import DocumentSignature
+            from ..models.document_lsh_band import DocumentLshBand
+
+            document_signature = DocumentSignature(
+                document_id=document_id,
+                signature=signature,
+                num_perm=num_perm
+            )
+            self.db.session.add(document_signature)
+            self.db.session.flush()
+
+            for band_index, band_hash in enumerate(band_hashes):
+                self.db.session.add(DocumentLshBand(
+                    signature_id=document_signature.id,
+                    document_id=document_id,
+                    band_index=band_index,
+                    band_hash=band_hash
+                ))
+
+            self.db.session.commit()
+            logger.info(f"Created document signature for document ID: {document_id}")
+            return document_signature
+        except SQLAlchemyError as e:
+            self.db.session.rollback()
+            logger.error(f"Error creating document signature: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+
+    def get_lsh_candidates(self, band_hashes: List[int], num_perm: int) -> List[Dict]:
+        """Get documents sharing at least one LSH band with the given band hashes"""
+        try:
+            from ..models.document import Document
+            from ..models.document_signature import DocumentSignature
+            from ..models.document_lsh_band import DocumentLshBand
+            from sqlalchemy import tuple_
+
+            if not band_hashes:
+                return []
+
+            band_keys = list(enumerate(band_hashes))
+            document_ids = self.db.session.query(
+                DocumentLshBand.document_id
+            ).filter(
+                tuple_(DocumentLshBand.band_index, DocumentLshBand.band_hash).in_(band_keys)
+            ).distinct().all()
+            document_ids = [row[0] for row in document_ids]
+
+            if not document_ids:
+                return []
+
+            results = self.db.session.query(
+                Document,
+                DocumentSignature
+            ).join(
+                DocumentSignature,
+                Document.id == DocumentSignature.document_id
+            ).filter(
+                Document.id.in_(document_ids),
+                DocumentSignature.num_perm == num_perm
+            ).all()
+
+            return [
+                {
+                    "document": doc,
+                    "signature": signature.signature
+                } for doc, signature in results
+            ]
+        except SQLAlchemyError as e:
+            logger.error(f"Error getting LSH candidates: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
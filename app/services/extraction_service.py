@@ -0,0 +1,266 @@
+import io
+import os
+import queue
+import logging
+import zipfile
+import threading
+import importlib.util
+import multiprocessing
+from xml.etree import ElementTree
+
+try:
+    import resource
+except ImportError:  # not available on Windows; workers then run without a memory limit
+    resource = None
+
+from ..config import Config
+from .solr_service import SolrService
+
+logger = logging.getLogger(__name__)
+
+_WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+_EXTENSION_KINDS = {
+    '.pdf': 'pdf',
+    '.docx': 'docx',
+    '.txt': 'text',
+    '.md': 'text',
+    '.markdown': 'text'
+}
+_MIMETYPE_KINDS = {
+    'application/pdf': 'pdf',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
+    'text/plain': 'text',
+    'text/markdown': 'text'
+}
+
+
+class ExtractionError(Exception):
+    """Text could not be extracted; the message is safe to return to the client"""
+
+
+class ExtractionLimitError(ExtractionError):
+    """The file exceeded the extraction time or memory limit; it is not retried with Tika"""
+
+
+def _parse_pdf(content):
+    from pypdf import PdfReader
+    reader = PdfReader(io.BytesIO(content))
+    return '\n'.join(page.extract_text() or '' for page in reader.pages)
+
+
+def _parse_docx(content):
+    paragraphs = []
+    parts = []
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        with archive.open('word/document.xml') as document_xml:
+            for _, element in ElementTree.iterparse(document_xml, events=('end',)):
+                tag = element.tag
+                if tag == _WORD_NAMESPACE + 't':
+                    parts.append(element.text or '')
+                elif tag == _WORD_NAMESPACE + 'tab':
+                    parts.append('\t')
+                elif tag in (_WORD_NAMESPACE + 'br', _WORD_NAMESPACE + 'cr'):
+                    parts.append('\n')
+                elif tag == _WORD_NAMESPACE + 'p':
+                    paragraphs.append(''.join(parts))
+                    parts = []
+                    element.clear()
+    return '\n'.join(paragraphs)
+
+
+def _parse_text(content):
+    try:
+        return content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        from charset_normalizer import from_bytes
+        best = from_bytes(content).best()
+        return str(best) if best is not None else content.decode('latin-1')
+
+
+_PARSERS = {
+    'pdf': _parse_pdf,
+    'docx': _parse_docx,
+    'text': _parse_text
+}
+
+
+def _worker_main(conn, memory_limit_mb):
+    """Extraction worker loop: receives (kind, content) and answers ("ok", text), ("limit", message) or ("error", message)"""
+    if memory_limit_mb and resource is not None:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+
+        kind, content = task
+        try:
+            conn.send(("ok", _PARSERS[kind](content)))
+        except MemoryError:
+            conn.send(("limit", "memory limit exceeded"))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, context, memory_limit_mb):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_limit_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def stop(self, kill=False):
+        try:
+            if kill:
+                self.process.kill()
+            else:
+                self.conn.send(None)
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        except Exception as e:
+            logger.warning(f"Failed to stop extraction worker {self.process.pid}: {e}")
+        finally:
+            self.conn.close()
+
+
+class ExtractionPool:
+    """
+    Fixed number of extraction processes. A worker that exceeds the per-file timeout is killed and
+    replaced; workers are recycled after a number of files so leaked parser memory is returned.
+    """
+    def __init__(self, workers, timeout, memory_limit_mb, max_tasks_per_worker, start_method):
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self._context = multiprocessing.get_context(start_method)
+        self._slots = threading.BoundedSemaphore(workers)
+        self._idle = queue.LifoQueue()
+
+    def run(self, kind, content):
+        with self._slots:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                worker = _Worker(self._context, self.memory_limit_mb)
+
+            try:
+                worker.conn.send((kind, content))
+                if not worker.conn.poll(self.timeout):
+                    worker.stop(kill=True)
+                    raise ExtractionLimitError(f"extraction timed out after {self.timeout} seconds")
+                status, value = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                # The worker died, most likely killed by the memory limit
+                worker.stop(kill=True)
+                raise ExtractionLimitError(f"extraction worker exited: {e}")
+
+            worker.tasks += 1
+            if worker.tasks >= self.max_tasks_per_worker:
+                worker.stop()
+            else:
+                self._idle.put(worker)
+
+            if status == "limit":
+                raise ExtractionLimitError(value)
+            if status != "ok":
+                raise ExtractionError(value)
+            return value
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Extracts text from uploaded files in a local process pool (PDF, DOCX, TXT, MD) and falls
+back to Tika inside Solr for other types or when the local parser fails. A file that exceeds the
+time or memory limit fails instead, so it cannot tie up a Solr thread.
+"""
+class ExtractionService:
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(ExtractionService, cls).__new__(cls)
+                cls._instance._initialized = False
+            return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.solr_service = SolrService()
+        self.pdf_supported = importlib.util.find_spec('pypdf') is not None
+        self._pool = None
+        self._initialized = True
+
+    @property
+    def pool(self) -> ExtractionPool:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ExtractionPool(
+                        workers=Config.EXTRACTION_WORKERS,
+                        timeout=Config.EXTRACTION_TIMEOUT,
+                        memory_limit_mb=Config.EXTRACTION_MEMORY_LIMIT_MB,
+                        max_tasks_per_worker=Config.EXTRACTION_MAX_TASKS_PER_WORKER,
+                        start_method=Config.EXTRACTION_START_METHOD
+                    )
+        return self._pool
+
+    def detect_kind(self, filename, mimetype):
+        """Return the local parser for a file, or None when only Tika can read it"""
+        kind = _EXTENSION_KINDS.get(os.path.splitext(filename or '')[1].lower()) or _MIMETYPE_KINDS.get(mimetype)
+        if kind == 'pdf' and not self.pdf_supported:
+            return None
+        return kind
+
+    def extract(self, filename, content, mimetype) -> str:
+        """Extract the text of a file, locally when possible"""
+        kind = self.detect_kind(filename, mimetype) if Config.EXTRACTION_LOCAL else None
+
+        if kind:
+            try:
+                text = self.pool.run(kind, content)
+                if text.strip():
+                    return text
+                logger.info("Local extraction found no text in %s, falling back to Tika", filename)
+            except ExtractionLimitError as e:
+                logger.warning("Local extraction of %s stopped: %s", filename, e)
+                raise ExtractionLimitError(f"Tệp {filename} vượt quá giới hạn thời gian hoặc bộ nhớ khi trích xuất văn bản")
+            except ExtractionError as e:
+                logger.warning("Local extraction failed for %s, falling back to Tika: %s", filename, e)
+
+        return self.extract_with_tika(filename, content, mimetype)
+
+    def extract_with_tika(self, filename, content, mimetype) -> str:
+        response = self.solr_service.extract_text(filename=filename, content=content, mimetype=mimetype)
+
+        if response.status_code != 200:
+            error_msg = f"Không thể kết nối đến máy chủ Solr cho tệp {filename}. Status code: {response.status_code}"
+            logger.error(error_msg)
+            raise ExtractionError(error_msg)
+
+        result = response.json()
+
+        if result.get("responseHeader", {}).get("status", 0) != 0:
+            error_msg = f"Không thể trích xuất văn bản từ {filename}"
+            logger.error(f"{error_msg}. Solr response status: {result.get('responseHeader', {}).get('status', 'unknown')}")
+            raise ExtractionError(error_msg)
+
+        return result.get('file', "")
@@ -36,6 +36,19 @@ class FileService:
             logger.error(error_msg)
             raise Exception(error_msg)
 
+    @staticmethod
+    def save_scan_job_file(content: bytes, job_id: str, filename: str) -> str:
+        try:
+            os.makedirs(Config.SCAN_JOB_DIR, exist_ok=True)
+            file_path = os.path.join(Config.SCAN_JOB_DIR, f"{job_id}_{os.path.basename(filename)}")
+            with open(file_path, "wb") as f:
+                f.write(content)
+            return file_path
+        except IOError as e:
+            error_msg = f"IO error while saving scan job file: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+
     @staticmethod
     def delete_file(file_path: str):
         try:
@@ -0,0 +1,199 @@
+import os
+import sys
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import contextlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, SysLogHandler
+from typing import Dict, Any
+
+from ..config import Config
+
+# Fields bound to the records logged by the current thread or task (scan_id, stage, ...)
+_log_context: ContextVar[Dict[str, Any]] = ContextVar('log_context', default={})
+
+# Attributes every LogRecord has; anything else on a record was passed through `extra`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+@contextlib.contextmanager
+def log_context(**fields):
+    """Add fields to every record logged inside the block"""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the bound log context onto the record, in the thread that logged it"""
+    def filter(self, record):
+        for name, value in _log_context.get().items():
+            if not hasattr(record, name):
+                setattr(record, name, value)
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through `burst` records per call site and `window` seconds at the sampled levels. The
+    first record let through after some were dropped carries their number in `suppressed`.
+    """
+    def __init__(self, burst: int, window: float, levels):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.levels = frozenset(levels)
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno not in self.levels:
+            return True
+
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                suppressed = site[2] if site is not None else 0
+                self._sites[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if site[1] < self.burst:
+                site[1] += 1
+                return True
+            site[2] += 1
+            return False
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: the standard fields, the bound context and the `extra` fields"""
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pid": record.process
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and not name.startswith('_'):
+                entry[name] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without waiting: a full queue drops the record, and the next
+    record that gets through carries the number dropped in `dropped`.
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message and traceback now, the sinks format the record on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        dropped = self.dropped
+        if dropped:
+            record.dropped = dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            # Records dropped by other threads meanwhile are reported with the next record
+            self.dropped -= dropped
+
+
+def _create_sinks(formatter):
+    sinks = []
+    for sink in Config.LOG_SINKS:
+        if sink == 'file':
+            handler = logging.FileHandler(Config.LOG_FILE)
+        elif sink == 'console':
+            handler = logging.StreamHandler()
+        elif sink == 'stdout':
+            handler = logging.StreamHandler(sys.stdout)
+        elif sink == 'syslog':
+            host, _, port = Config.LOG_SYSLOG_ADDRESS.rpartition(':')
+            handler = SysLogHandler(address=(host, int(port)) if host else Config.LOG_SYSLOG_ADDRESS)
+        else:
+            raise ValueError(f"Unknown log sink: {sink}")
+        handler.setFormatter(formatter)
+        sinks.append(handler)
+    return sinks
+
+
+def _restart_after_fork():
+    # The listener thread does not survive a fork (Celery prefork children); start a new one with a
+    # fresh queue, the old one may have been locked by that thread at fork time
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.Queue(Config.LOG_QUEUE_SIZE)
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, NonBlockingQueueHandler):
+            handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Asynchronous logging pipeline. The root logger only holds a NonBlockingQueueHandler,
+so a request or task never waits on disk or syslog; a QueueListener thread writes the records to the
+LOG_SINKS (file, console, stdout, syslog) as JSON (LOG_FORMATTER=json) or LOG_FORMAT text. Records
+carry the fields bound with log_context() (scan_id, stage) and repetitive warnings are sampled per
+call site (LOG_SAMPLE_BURST records per LOG_SAMPLE_WINDOW seconds).
+"""
+def configure_logging():
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = JsonFormatter() if Config.LOG_FORMATTER == 'json' else logging.Formatter(Config.LOG_FORMAT)
+    log_queue = queue.Queue(Config.LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+    if Config.LOG_SAMPLE_BURST > 0:
+        handler.addFilter(RateLimitFilter(
+            Config.LOG_SAMPLE_BURST,
+            Config.LOG_SAMPLE_WINDOW,
+            [logging.getLevelName(level.strip().upper()) for level in Config.LOG_SAMPLE_LEVELS.split(',') if level.strip()]
+        ))
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, Config.LOG_LEVEL.upper()))
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+
+    _listener = QueueListener(log_queue, *_create_sinks(formatter), respect_handler_level=True)
+    _listener.start()
+    atexit.register(lambda: _listener.stop())
+    os.register_at_fork(after_in_child=_restart_after_fork)
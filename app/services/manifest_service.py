@@ -0,0 +1,151 @@
+import io
+import os
+import csv
+import json
+import logging
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ManifestError(Exception):
+    """Raised when a manifest file cannot be read; the message is shown to the user"""
+
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Parses the batch upload manifest (xlsx, CSV or JSON) in a single streaming pass into a
+file name -> metadata dict and matches it against the uploaded files.
+Columns/keys: file name, research name, description (the first row of xlsx/CSV is a header).
+"""
+class ManifestService:
+    SUPPORTED_EXTENSIONS = ('.xlsx', '.csv', '.json')
+    JSON_KEYS = ('file_name', 'research_name', 'description')
+
+    @staticmethod
+    def parse(filename: str, stream) -> Dict[str, Any]:
+        """
+        Parse a manifest into:
+        - entries: {file_name: {"research_name", "description", "row"}}, first occurrence wins
+        - duplicates: [{"file_name", "rows"}] for names listed more than once
+        - skipped_rows: rows without a file name or research name, and JSON items that are not objects
+        """
+        extension = os.path.splitext(filename or '')[1].lower()
+        if extension not in ManifestService.SUPPORTED_EXTENSIONS:
+            raise ManifestError("Tệp danh sách phải có định dạng .xlsx, .csv hoặc .json")
+
+        try:
+            if extension == '.xlsx':
+                rows = ManifestService._iter_xlsx(stream)
+            elif extension == '.csv':
+                rows = ManifestService._iter_csv(stream)
+            else:
+                rows = ManifestService._iter_json(stream)
+            return ManifestService._collect(rows)
+        except ManifestError:
+            raise
+        except Exception as e:
+            logger.error(f"Error reading manifest {filename}: {str(e)}")
+            raise ManifestError(f"Không thể đọc tệp danh sách: {str(e)}")
+
+    @staticmethod
+    def match(manifest: Dict[str, Any], filenames: Iterable[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """Return the manifest entries of the given files and the file names missing from the manifest"""
+        entries = manifest["entries"]
+        matched = {}
+        unmatched = []
+        for name in filenames:
+            entry = entries.get(name)
+            if entry:
+                matched[name] = entry
+            else:
+                unmatched.append(name)
+        return matched, unmatched
+
+    @staticmethod
+    def _collect(rows: Iterator[Tuple[int, Optional[tuple]]]) -> Dict[str, Any]:
+        entries = {}
+        duplicate_rows = {}
+        skipped_rows = []
+
+        for row_num, row in rows:
+            if row is None:
+                skipped_rows.append(row_num)
+                continue
+            if not any(row):
+                continue
+            file_name = ManifestService._cell(row, 0)
+            research_name = ManifestService._cell(row, 1)
+            if not file_name or not research_name:
+                skipped_rows.append(row_num)
+                continue
+
+            if file_name in entries:
+                duplicate_rows.setdefault(file_name, [entries[file_name]["row"]]).append(row_num)
+                continue
+
+            entries[file_name] = {
+                "research_name": research_name,
+                "description": ManifestService._cell(row, 2),
+                "row": row_num
+            }
+
+        duplicates = [{"file_name": name, "rows": rows} for name, rows in duplicate_rows.items()]
+        if duplicates:
+            logger.warning(f"Manifest lists {len(duplicates)} file names more than once")
+
+        return {
+            "entries": entries,
+            "duplicates": duplicates,
+            "skipped_rows": skipped_rows
+        }
+
+    @staticmethod
+    def _cell(row, index) -> str:
+        if index >= len(row) or row[index] is None:
+            return ''
+        return str(row[index]).strip()
+
+    @staticmethod
+    def _iter_xlsx(stream) -> Iterator[Tuple[int, tuple]]:
+        from openpyxl import load_workbook
+
+        # read_only streams the sheet XML instead of building the whole workbook in memory
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            for row_num, row in enumerate(sheet.iter_rows(min_row=2, max_col=3, values_only=True), 2):
+                yield row_num, row
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _iter_csv(stream) -> Iterator[Tuple[int, tuple]]:
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        try:
+            reader = csv.reader(text)
+            next(reader, None)
+            for row_num, row in enumerate(reader, 2):
+                yield row_num, tuple(row)
+        finally:
+            text.detach()
+
+    @staticmethod
+    def _iter_json(stream) -> Iterator[Tuple[int, Optional[tuple]]]:
+        """Rows of a JSON manifest; an item that is not an object yields None and is reported as skipped"""
+        data = json.load(stream)
+        if isinstance(data, dict):
+            # {"file.pdf": {"research_name": ..., "description": ...}}
+            data = [
+                dict(value, file_name=key) if isinstance(value, dict) else None
+                for key, value in data.items()
+            ]
+        if not isinstance(data, list):
+            raise ManifestError("Tệp JSON phải là một danh sách hoặc một đối tượng theo tên tệp")
+
+        for row_num, item in enumerate(data, 1):
+            if not isinstance(item, dict):
+                yield row_num, None
+                continue
+            yield row_num, tuple(item.get(key) for key in ManifestService.JSON_KEYS)
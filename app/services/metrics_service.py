@@ -0,0 +1,54 @@
+import logging
+from typing import Dict, Any
+
+from .redis_service import RedisService
+
+logger = logging.getLogger(__name__)
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Application counters and gauges kept in a Redis hash, shared by the web and Celery
+processes and exposed by /api/metrics. Recording a metric never raises.
+"""
+class MetricsService:
+    KEY = "metrics"
+
+    def __init__(self):
+        self.redis = RedisService().client
+
+    def incr(self, name: str, amount=1):
+        try:
+            if isinstance(amount, float):
+                self.redis.hincrbyfloat(self.KEY, name, amount)
+            else:
+                self.redis.hincrby(self.KEY, name, amount)
+        except Exception as e:
+            logger.warning(f"Failed to record metric {name}: {e}")
+
+    def set_gauge(self, name: str, value):
+        try:
+            self.redis.hset(self.KEY, name, value)
+        except Exception as e:
+            logger.warning(f"Failed to record metric {name}: {e}")
+
+    def set_gauges(self, values: Dict[str, Any]):
+        try:
+            self.redis.hset(self.KEY, mapping=values)
+        except Exception as e:
+            logger.warning(f"Failed to record metrics {list(values)}: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics by name; numeric values are returned as numbers"""
+        metrics = {}
+        for name, value in self.redis.hgetall(self.KEY).items():
+            value = value.decode('utf-8')
+            try:
+                value = int(value)
+            except ValueError:
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass
+            metrics[name.decode('utf-8')] = value
+        return dict(sorted(metrics.items()))
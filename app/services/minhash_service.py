@@ -0,0 +1,161 @@
+import re
+import zlib
+import hashlib
+import logging
+from array import array
+from typing import List, Optional, Dict, Any
+
+import numpy as np
+
+from ..config import Config
+from .database_service import DatabaseService
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_PATTERN = re.compile(r'\w+')
+_LOW_32 = np.uint64((1 << 32) - 1)
+_LOW_29 = np.uint64((1 << 29) - 1)
+# Shingles hashed per block; bounds the num_perm x block intermediate arrays to a few MB
+_SIGNATURE_BLOCK = 8192
+
+
+def _mod_mersenne(x):
+    """x mod 2^61 - 1 for uint64 arrays: fold the bits above 61 back in once, then subtract p at most once"""
+    p = np.uint64(_MERSENNE_PRIME)
+    x = (x & p) + (x >> np.uint64(61))
+    return np.where(x >= p, x - p, x)
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Computes MinHash signatures from extracted text and looks up near-duplicate documents
+through an LSH band index stored in the database.
+"""
+class MinHashService:
+    def __init__(self):
+        self.db_service = DatabaseService()
+        self.num_perm = Config.MINHASH_NUM_PERM
+        self.bands = Config.MINHASH_BANDS
+        self.rows_per_band = self.num_perm // self.bands
+        self.shingle_size = Config.MINHASH_SHINGLE_SIZE
+
+        if self.rows_per_band * self.bands != self.num_perm:
+            raise ValueError("MINHASH_BANDS must divide MINHASH_NUM_PERM")
+
+        # Derive the permutation coefficients from a hash so signatures stay
+        # comparable across processes and Python versions.
+        self._permutations = []
+        for i in range(self.num_perm):
+            digest = hashlib.sha1(f"{Config.MINHASH_SEED}:{i}".encode('utf-8')).digest()
+            a = int.from_bytes(digest[:8], 'little') % (_MERSENNE_PRIME - 1) + 1
+            b = int.from_bytes(digest[8:16], 'little') % _MERSENNE_PRIME
+            self._permutations.append((a, b))
+
+        # a split in 32-bit halves so every product fits in 64 bits (a < 2^61, shingle hashes < 2^32)
+        a = np.array([a for a, _ in self._permutations], dtype=np.uint64)[:, None]
+        self._a_low = a & _LOW_32
+        self._a_high = a >> np.uint64(32)
+        self._b = np.array([b for _, b in self._permutations], dtype=np.uint64)[:, None]
+
+    def shingle_hashes(self, text) -> set:
+        """Hash the word shingles of a text into 32-bit integers"""
+        words = _WORD_PATTERN.findall(text.lower()) if text else []
+        if not words:
+            return set()
+
+        k = self.shingle_size
+        if len(words) < k:
+            return {zlib.crc32(' '.join(words).encode('utf-8'))}
+
+        return {
+            zlib.crc32(' '.join(words[i:i + k]).encode('utf-8'))
+            for i in range(len(words) - k + 1)
+        }
+
+    def compute_signature(self, text) -> Optional[List[int]]:
+        """
+        Compute the MinHash signature of a text, or None if it has no words. Same values as
+        min((a * h + b) % P) & 0xFFFFFFFF per permutation, computed for all permutations at once.
+        """
+        hashes = self.shingle_hashes(text)
+        if not hashes:
+            return None
+
+        shingles = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        minimum = np.full(self.num_perm, _MERSENNE_PRIME, dtype=np.uint64)
+        for start in range(0, len(shingles), _SIGNATURE_BLOCK):
+            h = shingles[None, start:start + _SIGNATURE_BLOCK]
+            high = self._a_high * h  # < 2^61, times 2^32 mod P is a 61-bit rotation
+            high = _mod_mersenne(((high & _LOW_29) << np.uint64(32)) + (high >> np.uint64(29)))
+            values = _mod_mersenne(_mod_mersenne(self._a_low * h) + high + self._b)
+            np.minimum(minimum, values.min(axis=1), out=minimum)
+
+        return (minimum & _LOW_32).tolist()
+
+    def band_hashes(self, signature: List[int]) -> List[int]:
+        r = self.rows_per_band
+        return [
+            zlib.crc32(array('I', signature[i * r:(i + 1) * r]).tobytes())
+            for i in range(self.bands)
+        ]
+
+    @staticmethod
+    def estimate_similarity(signature_a: List[int], signature_b: List[int]) -> float:
+        """Estimate the Jaccard similarity of two documents from their signatures"""
+        if not signature_a or len(signature_a) != len(signature_b):
+            return 0.0
+        matches = sum(1 for x, y in zip(signature_a, signature_b) if x == y)
+        return matches / len(signature_a)
+
+    @staticmethod
+    def pack_signature(signature: List[int]) -> bytes:
+        return array('I', signature).tobytes()
+
+    @staticmethod
+    def unpack_signature(data: bytes) -> List[int]:
+        signature = array('I')
+        signature.frombytes(data)
+        return signature.tolist()
+
+    def find_near_duplicates(self, signature: List[int], threshold: float = None) -> List[Dict[str, Any]]:
+        """Return indexed documents whose estimated similarity reaches the threshold"""
+        if not signature:
+            return []
+
+        threshold = Config.NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+        candidates = self.db_service.get_lsh_candidates(self.band_hashes(signature), self.num_perm)
+
+        duplicates = []
+        for candidate in candidates:
+            similarity = self.estimate_similarity(signature, self.unpack_signature(candidate["signature"]))
+            if similarity >= threshold:
+                document = candidate["document"]
+                duplicates.append({
+                    "id": document.id,
+                    "fileName": document.file_name,
+                    "researchName": document.research_name,
+                    "fileHash": document.file_hash,
+                    "similarity": round(similarity, 4)
+                })
+
+        duplicates.sort(key=lambda x: x["similarity"], reverse=True)
+        logger.info(f"LSH lookup found {len(candidates)} candidates, {len(duplicates)} near-duplicates")
+        return duplicates
+
+    def index_document(self, document_id: int, signature: List[int]) -> bool:
+        """Store the signature of a document in the LSH band index if it is not there yet"""
+        if not signature:
+            return False
+
+        if self.db_service.get_document_signature(document_id):
+            return False
+
+        self.db_service.create_document_signature(
+            document_id=document_id,
+            signature=self.pack_signature(signature),
+            num_perm=self.num_perm,
+            band_hashes=self.band_hashes(signature)
+        )
+        return True
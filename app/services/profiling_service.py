@@ -0,0 +1,205 @@
+import os
+import sys
+import hmac
+import time
+import zlib
+import uuid
+import _thread
+import logging
+import threading
+import contextlib
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional, Dict, Any
+
+from flask import request
+
+from ..config import Config
+from .logging_service import log_context
+
+logger = logging.getLogger(__name__)
+
+# The profile of the scan running in the current thread or task, None when not profiling
+_current_profile: ContextVar[Optional['ScanProfiler']] = ContextVar('scan_profile', default=None)
+
+
+@contextlib.contextmanager
+def profile_stage(name: str):
+    """Name the stage in the log records of the current scan, and time it when the scan is profiled"""
+    with log_context(stage=name):
+        profiler = _current_profile.get()
+        if profiler is None:
+            yield
+        else:
+            with profiler.stage(name):
+                yield
+
+
+def _gevent_patched() -> bool:
+    """Whether threading is monkey-patched by gevent, threads then being greenlets of one OS thread"""
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('threading')
+
+
+class _StackSampler:
+    """
+    Samples the stack of the calling thread at a fixed interval into collapsed stack counts. Under
+    gevent the caller is a greenlet sharing its OS thread with the other requests: the sampler then
+    runs in a real OS thread and reads the frame of that greenlet, the OS thread's own frame when
+    the greenlet is running, gr_frame while it waits on the hub.
+    """
+    def __init__(self, interval: float, max_seconds: float):
+        self.interval = interval
+        self.deadline = time.monotonic() + max_seconds
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopped = False
+
+        if _gevent_patched():
+            import gevent
+            from gevent.monkey import get_original
+            greenlet = gevent.getcurrent()
+            thread_id = get_original('_thread', 'get_ident')()
+            self._frame = lambda: self._greenlet_frame(greenlet, thread_id)
+            start_new_thread, allocate_lock = get_original('_thread', ['start_new_thread', 'allocate_lock'])
+            self._sleep = get_original('time', 'sleep')
+        else:
+            thread_id = threading.get_ident()
+            self._frame = lambda: sys._current_frames().get(thread_id)
+            start_new_thread, allocate_lock = _thread.start_new_thread, _thread.allocate_lock
+            self._sleep = time.sleep
+
+        self._done = allocate_lock()
+        self._done.acquire()
+        start_new_thread(self._run, ())
+
+    @staticmethod
+    def _greenlet_frame(greenlet, thread_id: int):
+        if greenlet.dead:
+            return None
+        return greenlet.gr_frame or sys._current_frames().get(thread_id)
+
+    def _run(self):
+        try:
+            while True:
+                self._sleep(self.interval)
+                if self._stopped or time.monotonic() >= self.deadline:
+                    return
+                frame = self._frame()
+                if frame is None:
+                    return
+                stack = []
+                while frame is not None and len(stack) < Config.PROFILING_MAX_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{os.path.splitext(os.path.basename(code.co_filename))[0]}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+        finally:
+            self._done.release()
+
+    def stop(self):
+        # Waits at most one interval for the last sample; the lock is not patched by gevent, so this
+        # briefly blocks the other greenlets of the worker as well
+        self._stopped = True
+        self._done.acquire()
+
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: On-demand profiling of a single scan for admins. While a ScanProfiler is active, a
+sampling thread records the stacks of the scanning thread (or greenlet, under gevent) (collapsed, as flamegraph tools read
+them) and profile_stage() accumulates the wall time of each pipeline stage. The profile is stored
+in scan_profiles under the scan id. Scans that are not profiled only bind the stage name to their
+log records.
+"""
+class ScanProfiler:
+    HEADER = 'X-Scan-Profile'
+    PARAM = 'profile'
+    ID_HEADER = 'X-Scan-Profile-Id'
+
+    def __init__(self, scan_id: str, source: str, filename: str = None):
+        self.scan_id = str(scan_id)
+        self.source = source
+        self.filename = filename
+        self.stages = {}
+        self._sampler = None
+        self._token = None
+        self._started = None
+        self.total_seconds = 0.0
+
+    @staticmethod
+    def is_admin_request() -> bool:
+        """Whether the current request carries the profiling admin token (header or parameter)"""
+        if not Config.PROFILING_ADMIN_TOKEN:
+            return False
+        token = request.headers.get(ScanProfiler.HEADER) or request.args.get(ScanProfiler.PARAM) \
+            or request.form.get(ScanProfiler.PARAM)
+        return bool(token) and hmac.compare_digest(token.encode('utf-8'), Config.PROFILING_ADMIN_TOKEN.encode('utf-8'))
+
+    @staticmethod
+    def new_scan_id() -> str:
+        """Id of a profiled scan that has no scan status or job of its own"""
+        return str(uuid.uuid4())
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+            stage["seconds"] += time.perf_counter() - started
+            stage["calls"] += 1
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        self._sampler = _StackSampler(Config.PROFILING_INTERVAL, Config.PROFILING_MAX_SECONDS)
+        self._token = _current_profile.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_profile.reset(self._token)
+        self._sampler.stop()
+        self.total_seconds = time.perf_counter() - self._started
+        try:
+            self.save(error=repr(exc) if exc is not None else None)
+        except Exception as e:
+            logger.error(f"Failed to store scan profile {self.scan_id}: {e}")
+        return False
+
+    def collapsed_stacks(self) -> str:
+        return '\n'.join(f"{stack} {count}" for stack, count in self._sampler.stacks.most_common())
+
+    def save(self, error: str = None):
+        from .database_service import DatabaseService
+
+        stages = {
+            name: {"seconds": round(stage["seconds"], 4), "calls": stage["calls"]}
+            for name, stage in sorted(self.stages.items(), key=lambda item: item[1]["seconds"], reverse=True)
+        }
+        DatabaseService().create_scan_profile(
+            scan_id=self.scan_id,
+            source=self.source,
+            filename=self.filename,
+            total_seconds=round(self.total_seconds, 4),
+            stages=stages,
+            samples=self._sampler.samples,
+            collapsed_stacks=zlib.compress(self.collapsed_stacks().encode('utf-8')),
+            error=error
+        )
+        logger.info(f"Stored profile of scan {self.scan_id} ({self.source}): "
+                    f"{self.total_seconds:.2f}s, {self._sampler.samples} stack samples")
+
+    @staticmethod
+    def describe(profile, top: int = 50) -> Dict[str, Any]:
+        """A stored profile with its most frequent stacks"""
+        stacks = zlib.decompress(profile.collapsed_stacks).decode('utf-8').splitlines()
+        return {
+            **profile.to_dict(),
+            "top_stacks": [
+                {"stack": stack.rsplit(' ', 1)[0], "samples": int(stack.rsplit(' ', 1)[1])}
+                for stack in stacks[:top]
+            ]
+        }
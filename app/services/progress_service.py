@@ -0,0 +1,123 @@
+import time
+import logging
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+from ..config import Config
+from .redis_service import RedisService
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STAGES = ('completed', 'failed', 'cancelled')
+
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Live progress of running scans (stage, samples done/total, ETA) kept in Redis hashes.
+The scan budget reports every query made during a stage, but Redis is only written when the stage changes or
+SCAN_PROGRESS_INTERVAL seconds have passed, so progress costs nothing noticeable on the query path.
+Progress is best effort: after a Redis error a reporter stops writing for the rest of the scan.
+"""
+class ProgressReporter:
+    KEY_PREFIX = "scan_progress:"
+
+    def __init__(self, key: str, ttl: int):
+        self.redis = RedisService().client
+        self.key = key
+        self.ttl = ttl
+        self.total = 0
+        self.done = 0
+        self._stage_started = time.monotonic()
+        self._stage_done = 0
+        self._last_write = 0.0
+        self._disabled = False
+
+    @classmethod
+    def for_scan(cls, scan_status_id: int) -> 'ProgressReporter':
+        return cls(f"{cls.KEY_PREFIX}{scan_status_id}", Config.SCAN_PROGRESS_TTL)
+
+    @classmethod
+    def for_job(cls, job_id: str) -> 'ProgressReporter':
+        """Progress of an asynchronous single file scan, written into its job state"""
+        from .scan_job_service import ScanJobService
+        return cls(f"{ScanJobService.KEY_PREFIX}{job_id}", Config.SCAN_JOB_TTL)
+
+    def stage(self, name: str, total: int = None):
+        """Enter a stage; a total starts counting samples from zero"""
+        if total is not None:
+            self.total = total
+            self.done = 0
+        self._stage_started = time.monotonic()
+        self._stage_done = self.done
+        self._write(stage=name)
+
+    def advance(self, count: int = 1):
+        """Count queries of the current stage; cheap unless a write is due"""
+        self.done = min(self.done + count, self.total) if self.total else self.done + count
+        if time.monotonic() - self._last_write >= Config.SCAN_PROGRESS_INTERVAL:
+            self._write()
+
+    def finish(self, stage: str = 'completed'):
+        if stage == 'completed':
+            self.done = self.total
+        self._write(stage=stage)
+
+    def _eta(self, now: float) -> Optional[float]:
+        """Seconds left at the sample rate of the current stage"""
+        elapsed = now - self._stage_started
+        done = self.done - self._stage_done
+        if not self.total or done <= 0 or elapsed <= 0:
+            return None
+        return round((self.total - self.done) * elapsed / done, 1)
+
+    def _write(self, stage: str = None):
+        if self._disabled:
+            return
+        now = time.monotonic()
+        self._last_write = now
+
+        eta = 0 if stage in TERMINAL_STAGES else self._eta(now)
+        fields = {
+            "samples_total": self.total,
+            "samples_done": self.done,
+            "eta_seconds": "" if eta is None else eta,
+            "updated_at": datetime.utcnow().isoformat()
+        }
+        if stage is not None:
+            fields["stage"] = stage
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(self.key, mapping=fields)
+            pipe.expire(self.key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            self._disabled = True
+            logger.warning(f"Progress reporting disabled for {self.key}: {e}")
+
+    @classmethod
+    def get_scan_progress(cls, scan_status_ids: List[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """Progress of several scans in one round trip; None for scans without progress in Redis"""
+        pipe = RedisService().client.pipeline(transaction=False)
+        for scan_status_id in scan_status_ids:
+            pipe.hgetall(f"{cls.KEY_PREFIX}{scan_status_id}")
+
+        progress = {}
+        for scan_status_id, fields in zip(scan_status_ids, pipe.execute()):
+            progress[scan_status_id] = cls.parse(fields) if fields else None
+        return progress
+
+    @staticmethod
+    def parse(fields: Dict[bytes, bytes]) -> Dict[str, Any]:
+        fields = {k.decode('utf-8'): v.decode('utf-8') for k, v in fields.items()}
+        total = int(fields.get("samples_total") or 0)
+        done = int(fields.get("samples_done") or 0)
+        return {
+            "stage": fields.get("stage"),
+            "samples_total": total,
+            "samples_done": done,
+            "percent": round(done * 100 / total, 1) if total else None,
+            "eta_seconds": float(fields["eta_seconds"]) if fields.get("eta_seconds") else None,
+            "updated_at": fields.get("updated_at")
+        }
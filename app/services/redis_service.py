@@ -0,0 +1,26 @@
+import logging
+import redis
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Provides a shared Redis client for job state, caches and counters.
+"""
+class RedisService:
+    _instance = None
+
+    """
+    Singleton class so every request reuses the same connection pool.
+    """
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(RedisService, cls).__new__(cls)
+            cls._instance.client = redis.Redis.from_url(
+                Config.REDIS_URL,
+                socket_timeout=Config.REDIS_TIMEOUT,
+                socket_connect_timeout=Config.REDIS_TIMEOUT
+            )
+        return cls._instance
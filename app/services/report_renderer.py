@@ -0,0 +1,192 @@
+import html
+import logging
+from typing import Dict, Any, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+INCOMPLETE_NOTE = "Lưu ý: văn bản quá dài, kết quả chỉ bao gồm phần đã quét được trong giới hạn cho phép."
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Renders scan output (text/highlight/marker/br items) into Markdown, HTML or plain-text
+reports in a single streaming pass. Adjacent highlights of the same source are merged into one span.
+"""
+class ReportRenderer:
+    FORMATS = ('markdown', 'html', 'text')
+    MIMETYPES = {
+        'markdown': 'text/markdown; charset=utf-8',
+        'html': 'text/html; charset=utf-8',
+        'text': 'text/plain; charset=utf-8'
+    }
+    TITLE = "Báo cáo đánh giá trùng lặp"
+
+    def __init__(self, output: List[Dict[str, Any]], sources: List[Dict[str, Any]], metrics: Dict[str, Any],
+                 incomplete: bool = False):
+        self.output = output or []
+        self.sources = sources or []
+        self.metrics = metrics
+        self.incomplete = incomplete
+
+    def render(self, fmt: str = 'markdown') -> Iterator[str]:
+        """Yield the report in chunks, suitable for a streamed response"""
+        if fmt == 'markdown':
+            return self._render_markdown()
+        if fmt == 'html':
+            return self._render_html()
+        if fmt == 'text':
+            return self._render_text()
+        raise ValueError(f"Unsupported report format: {fmt}")
+
+    def render_to_string(self, fmt: str = 'markdown') -> str:
+        return ''.join(self.render(fmt))
+
+    def segments(self) -> Iterator[tuple]:
+        """
+        Walk the output once and yield ('text', content, None), ('highlight', content, color),
+        ('source', name, color) and ('br', None, None) segments. Consecutive highlights that
+        belong to the same marker group, separated only by whitespace, come out as one segment.
+        """
+        color = None
+        parts = []
+        gap = []
+
+        for item in self.output:
+            item_type = item["type"]
+
+            if item_type == "highlight":
+                if parts:
+                    parts.extend(gap)
+                gap = []
+                parts.append(item["content"])
+                continue
+
+            if item_type == "text":
+                content = item["content"]
+                if not content:
+                    continue
+                if parts and not content.strip():
+                    gap.append(content)
+                    continue
+
+            if parts:
+                yield "highlight", ''.join(parts), color
+                parts = []
+            if gap:
+                yield "text", ''.join(gap), None
+                gap = []
+
+            if item_type == "text":
+                yield "text", item["content"], None
+            elif item_type == "marker":
+                # Markers precede the highlights of a new set of sources
+                color = item.get("color")
+                yield "source", item.get("name", ""), color
+            elif item_type == "br":
+                yield "br", None, None
+
+        if parts:
+            yield "highlight", ''.join(parts), color
+        if gap:
+            yield "text", ''.join(gap), None
+
+    def _summary_lines(self) -> List[str]:
+        metrics = self.metrics
+        return [
+            f"Tổng số từ đã quét: {metrics['words_scanned']}",
+            f"Số từ không sao chép: {metrics['words_original']} ({metrics['words_original_ratio']:.1%})",
+            f"Số từ sao chép: {metrics['words_copied']} ({(1 - metrics['words_original_ratio']):.1%})",
+            f"Tổng số mẫu đã quét: {metrics['samples_scanned']}",
+            f"Số mẫu không sao chép: {metrics['samples_original']} ({metrics['samples_original_ratio']:.1%})",
+            f"Số mẫu sao chép: {metrics['samples_copied']}"
+        ]
+
+    def _render_markdown(self) -> Iterator[str]:
+        yield f"# {self.TITLE}\n\n## Tổng quan\n\n"
+        for line in self._summary_lines():
+            label, value = line.split(': ', 1)
+            yield f"- **{label}**: {value}\n"
+
+        yield "\n## Nguồn sao chép\n\n"
+        for i, source in enumerate(self.sources, 1):
+            yield f"{i}. **{source['name']}** (ID: {source['id']})\n"
+
+        yield "\n## Phân tích nội dung\n\n"
+        seen_sources = set()
+        for kind, content, color in self.segments():
+            if kind == "text":
+                yield content
+            elif kind == "highlight":
+                if color:
+                    yield (f'<span style="background-color: #{color}; padding: 2px 4px; border-radius: 3px;">'
+                           f'**{content}**</span>')
+                else:
+                    yield f"**{content}**"
+            elif kind == "source":
+                if content not in seen_sources:
+                    seen_sources.add(content)
+                    yield f"\n\n> [Source: {content}]\n\n"
+            elif kind == "br":
+                yield "\n"
+
+        if self.incomplete:
+            yield f"\n> {INCOMPLETE_NOTE}\n"
+
+    def _render_html(self) -> Iterator[str]:
+        escape = html.escape
+        yield (f'<!DOCTYPE html>\n<html lang="vi">\n<head>\n<meta charset="utf-8">\n'
+               f'<title>{self.TITLE}</title>\n</head>\n<body>\n<h1>{self.TITLE}</h1>\n')
+
+        yield "<h2>Tổng quan</h2>\n<ul>\n"
+        for line in self._summary_lines():
+            yield f"<li>{escape(line)}</li>\n"
+        yield "</ul>\n"
+
+        yield "<h2>Nguồn sao chép</h2>\n<ol>\n"
+        for source in self.sources:
+            yield (f'<li><span style="background-color: #{escape(source["color"])};">&nbsp;&nbsp;</span> '
+                   f'<strong>{escape(source["name"])}</strong> (ID: {escape(source["id"])})</li>\n')
+        yield "</ol>\n"
+
+        if self.incomplete:
+            yield f"<p><em>{escape(INCOMPLETE_NOTE)}</em></p>\n"
+
+        yield "<h2>Phân tích nội dung</h2>\n<p>"
+        seen_sources = set()
+        for kind, content, color in self.segments():
+            if kind == "text":
+                yield escape(content)
+            elif kind == "highlight":
+                style = f' style="background-color: #{escape(color)};"' if color else ''
+                yield f"<mark{style}>{escape(content)}</mark>"
+            elif kind == "source":
+                if content not in seen_sources:
+                    seen_sources.add(content)
+                    yield f"</p>\n<blockquote>[Source: {escape(content)}]</blockquote>\n<p>"
+            elif kind == "br":
+                yield "<br>\n"
+        yield "</p>\n</body>\n</html>\n"
+
+    def _render_text(self) -> Iterator[str]:
+        yield f"{self.TITLE}\n\n"
+        for line in self._summary_lines():
+            yield f"{line}\n"
+
+        if self.sources:
+            yield "\nNguồn sao chép:\n"
+            for i, source in enumerate(self.sources, 1):
+                yield f"{i}. {source['name']} (ID: {source['id']}) - {source['words']} từ, {source['samples']} mẫu\n"
+
+        if self.incomplete:
+            yield f"\n{INCOMPLETE_NOTE}\n"
+
+    @classmethod
+    def from_scan_result(cls, scan_result: Dict[str, Any]) -> 'ReportRenderer':
+        """Build a renderer from the dict returned by DatabaseService.get_scan_result_by_scan_status_id"""
+        output_data = scan_result.get("output_data") or {}
+        return cls(
+            output=output_data.get("output", []),
+            sources=scan_result.get("resources", []),
+            metrics=scan_result["metrics"],
+            incomplete=not scan_result.get("is_complete", True)
+        )
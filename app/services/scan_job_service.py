@@ -0,0 +1,85 @@
+import json
+import uuid
+import zlib
+import logging
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from ..config import Config
+from .redis_service import RedisService
+
+logger = logging.getLogger(__name__)
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Stores the state and results of asynchronous scan jobs in Redis.
+"""
+class ScanJobService:
+    KEY_PREFIX = "scan_job:"
+
+    def __init__(self):
+        self.redis = RedisService().client
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.KEY_PREFIX}{job_id}"
+
+    def _result_key(self, job_id: str) -> str:
+        return f"{self.KEY_PREFIX}{job_id}:result"
+
+    def create_job(self, filename: str, parameters: Dict[str, Any]) -> str:
+        job_id = str(uuid.uuid4())
+        now = datetime.utcnow().isoformat()
+        key = self._key(job_id)
+
+        pipe = self.redis.pipeline()
+        pipe.hset(key, mapping={
+            "status": "queued",
+            "stage": "queued",
+            "filename": filename,
+            "parameters": json.dumps(parameters),
+            "created_at": now,
+            "updated_at": now
+        })
+        pipe.expire(key, Config.SCAN_JOB_TTL)
+        pipe.execute()
+
+        logger.info(f"Created scan job {job_id} for {filename}")
+        return job_id
+
+    def update_job(self, job_id: str, **fields):
+        fields["updated_at"] = datetime.utcnow().isoformat()
+        self.redis.hset(self._key(job_id), mapping={k: str(v) for k, v in fields.items()})
+
+    def complete_job(self, job_id: str, result: Dict[str, Any]):
+        data = zlib.compress(json.dumps(result).encode('utf-8'))
+
+        pipe = self.redis.pipeline()
+        pipe.set(self._result_key(job_id), data, ex=Config.SCAN_JOB_TTL)
+        pipe.hset(self._key(job_id), mapping={
+            "status": "completed",
+            "stage": "completed",
+            "incomplete": str(bool(result.get("incomplete"))).lower(),
+            "updated_at": datetime.utcnow().isoformat()
+        })
+        pipe.expire(self._key(job_id), Config.SCAN_JOB_TTL)
+        pipe.execute()
+
+    def fail_job(self, job_id: str, message: str):
+        self.update_job(job_id, status="failed", stage="failed", error=message)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.redis.hgetall(self._key(job_id))
+        if not job:
+            return None
+
+        job = {k.decode('utf-8'): v.decode('utf-8') for k, v in job.items()}
+        job["id"] = job_id
+        job["parameters"] = json.loads(job.get("parameters", "{}"))
+        return job
+
+    def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        data = self.redis.get(self._result_key(job_id))
+        if data is None:
+            return None
+        return json.loads(zlib.decompress(data).decode('utf-8'))
@@ -0,0 +1,152 @@
+import gzip
+import time
+import logging
+from typing import Optional, Tuple
+
+from ..config import Config
+from .redis_service import RedisService
+from .metrics_service import MetricsService
+
+logger = logging.getLogger(__name__)
+
+# Stores a body, records its size and evicts least recently used bodies until the total fits. The etag
+# of the request is only recorded when the scan generation is still the one read before the database
+# (empty ARGV[7]: a fixed version, always recorded); otherwise a re-scan stored a newer result meanwhile.
+# KEYS: body, lru zset, sizes hash, total bytes, etag hash of the scan, generation of the scan
+# ARGV: body, ttl, now, max total bytes, etag field, etag, generation
+_STORE_SCRIPT = """
+local previous = redis.call('HGET', KEYS[3], KEYS[1])
+if previous then redis.call('DECRBY', KEYS[4], previous) end
+local size = string.len(ARGV[1])
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('HSET', KEYS[3], KEYS[1], size)
+redis.call('ZADD', KEYS[2], ARGV[3], KEYS[1])
+if ARGV[7] == '' or (redis.call('GET', KEYS[6]) or '0') == ARGV[7] then
+    redis.call('HSET', KEYS[5], ARGV[5], ARGV[6])
+    redis.call('EXPIRE', KEYS[5], ARGV[2])
+end
+local total = redis.call('INCRBY', KEYS[4], size)
+local evicted = 0
+while total > tonumber(ARGV[4]) do
+    local oldest = redis.call('ZPOPMIN', KEYS[2])
+    if #oldest == 0 then break end
+    local evicted_size = tonumber(redis.call('HGET', KEYS[3], oldest[1]) or '0')
+    redis.call('HDEL', KEYS[3], oldest[1])
+    redis.call('DEL', oldest[1])
+    total = redis.call('DECRBY', KEYS[4], evicted_size)
+    evicted = evicted + 1
+end
+return evicted
+"""
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Read-through Redis cache of FileScanResult responses. A stored result version never
+changes, so its gzipped JSON body is cached under the result id and version; the ETag of a request
+(scan status, version or latest, format) is kept next to it so If-None-Match is answered from Redis
+alone. Bodies are evicted least recently used first once their total size exceeds the budget.
+Redis errors only cost the cache: every method falls back to "not cached".
+"""
+class ScanResultCache:
+    PREFIX = "scan_result_cache:"
+    LRU_KEY = PREFIX + "lru"
+    SIZES_KEY = PREFIX + "sizes"
+    TOTAL_KEY = PREFIX + "total_bytes"
+
+    def __init__(self):
+        self.redis = RedisService().client
+        self.metrics = MetricsService()
+        self._store = self.redis.register_script(_STORE_SCRIPT)
+
+    def _etag_key(self, scan_status_id: int) -> str:
+        return f"{self.PREFIX}etag:{scan_status_id}"
+
+    def _generation_key(self, scan_status_id: int) -> str:
+        return f"{self.PREFIX}generation:{scan_status_id}"
+
+    def _body_key(self, etag: str) -> str:
+        return f"{self.PREFIX}body:{etag}"
+
+    @staticmethod
+    def _etag_field(version: Optional[int], fmt: str) -> str:
+        return f"{version or 'latest'}:{fmt}"
+
+    @staticmethod
+    def make_etag(scan_result_id: int, version: int, fmt: str) -> str:
+        return f"sr-{scan_result_id}-v{version}-{fmt}"
+
+    def get_etag(self, scan_status_id: int, version: Optional[int], fmt: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        ETag of the result a request resolves to, if it was served before, and the generation of the
+        scan to hand to put() once the result is read from the database
+        """
+        if not Config.SCAN_RESULT_CACHE_ENABLED:
+            return None, None
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hget(self._etag_key(scan_status_id), self._etag_field(version, fmt))
+            pipe.get(self._generation_key(scan_status_id))
+            etag, generation = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Scan result cache unavailable: {e}")
+            return None, None
+        return etag.decode('utf-8') if etag else None, generation.decode('utf-8') if generation else '0'
+
+    def get(self, etag: str) -> Optional[bytes]:
+        """Gzipped JSON body cached under an ETag"""
+        try:
+            pipe = self.redis.pipeline()
+            pipe.get(self._body_key(etag))
+            pipe.zadd(self.LRU_KEY, {self._body_key(etag): time.time()}, xx=True)
+            body, _ = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Scan result cache unavailable: {e}")
+            return None
+
+        self.metrics.incr("scan_result_cache.hits" if body is not None else "scan_result_cache.misses")
+        return body
+
+    def put(self, scan_status_id: int, version: Optional[int], fmt: str, etag: str, body: bytes,
+            generation: Optional[str]) -> Optional[bytes]:
+        """
+        Cache a serialized response body; returns it gzipped, or None if it was not cached. generation
+        is the one get_etag() returned before the result was read; the latest result is not recorded
+        as such when a re-scan invalidated the scan since.
+        """
+        if not Config.SCAN_RESULT_CACHE_ENABLED or (version is None and generation is None):
+            return None
+
+        gzipped = gzip.compress(body, compresslevel=Config.RESPONSE_GZIP_LEVEL, mtime=0)
+        if len(gzipped) > Config.SCAN_RESULT_CACHE_MAX_ENTRY_BYTES:
+            self.metrics.incr("scan_result_cache.skipped_too_large")
+            return None
+
+        try:
+            evicted = self._store(
+                keys=[self._body_key(etag), self.LRU_KEY, self.SIZES_KEY, self.TOTAL_KEY,
+                      self._etag_key(scan_status_id), self._generation_key(scan_status_id)],
+                args=[gzipped, Config.SCAN_RESULT_CACHE_TTL, time.time(), Config.SCAN_RESULT_CACHE_MAX_BYTES,
+                      self._etag_field(version, fmt), etag, '' if version is not None else generation]
+            )
+        except Exception as e:
+            logger.warning(f"Failed to cache scan result {etag}: {e}")
+            return None
+
+        if evicted:
+            self.metrics.incr("scan_result_cache.evictions", evicted)
+        return gzipped
+
+    def invalidate(self, scan_status_id: int):
+        """
+        Forget which version is the latest of a scan; cached bodies stay valid under their own ETag. The
+        generation bump keeps a request that read the previous version from recording it as the latest.
+        """
+        try:
+            pipe = self.redis.pipeline()
+            pipe.delete(self._etag_key(scan_status_id))
+            pipe.incr(self._generation_key(scan_status_id))
+            pipe.expire(self._generation_key(scan_status_id), Config.SCAN_RESULT_CACHE_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to invalidate cached scan result {scan_status_id}: {e}")
@@ -0,0 +1,639 @@
+import re
+import math
+import time
+import logging
+import threading
+from collections import Counter
+from functools import lru_cache
+
+from ..config import Config
+from .solr_service import SolrService
+from .text_normalizer import TextNormalizer
+from .extraction_service import ExtractionService, ExtractionError
+from .boilerplate_service import BoilerplateService
+from .profiling_service import profile_stage
+
+logger = logging.getLogger(__name__)
+
+_TERM_PATTERN = re.compile(r'[^\W\d_]{4,}')
+
+# Function words long enough to pass _TERM_PATTERN; IDF weighting drops the rest of the common words
+_STOPWORDS = frozenset((
+    "những được trong không nhưng cũng nhiều theo việc hoặc nhằm cùng đang trên dưới giữa rằng thành "
+    "chúng trước khác nhau vẫn đều luôn thêm nếu khiến thông qua ngoài chưa mình"
+).split() + (
+    "that this with from have were which their there they been will would also into than then these "
+    "those such about other more when where what only some each between because while"
+).split())
+
+
+@lru_cache(maxsize=32)
+def _sample_pattern(expmin, expmax):
+    return re.compile(r'(\S*\w\S*([\s.,-]+|$)+){' + str(expmin) + ',' + str(expmax) + '}')
+
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Shared plagiarism scan pipeline used by the single file, multiple file and AI scan endpoints.
+"""
+class ScanService:
+    def __init__(self):
+        self.solr_service = SolrService()
+        self.extraction_service = ExtractionService()
+        self.boilerplate_service = BoilerplateService()
+
+    def process_document(self, document, sha1_file, expmin, expmax, multisource,
+                         exclude_id=None, filename="processed_document", sampling_mode=None, budget=None,
+                         concurrency=1, batch_peers=None):
+        """
+        Split the document into samples, search them in Solr and build the scan output.
+        When the budget runs out the remaining samples are not queried and the result is marked incomplete.
+        batch_peers (BatchPeers) adds the other files of a multiple file search that share the samples.
+        """
+        sampling_mode = sampling_mode or Config.SCAN_SAMPLING_MODE
+        budget = budget or ScanBudget(Config.SCAN_TIME_BUDGET, Config.SCAN_QUERY_BUDGET)
+        with profile_stage('sampling'):
+            samples_with_positions = self.extract_samples(document, expmin, expmax)
+        with profile_stage('boilerplate'):
+            boilerplate = self.boilerplate_service.find(samples_with_positions)
+        logger.info("Found %s samples to process, %s boilerplate", len(samples_with_positions), len(boilerplate))
+
+        rows = 10 if multisource else 1
+        with profile_stage('candidates'):
+            searcher = self.create_searcher(document, len(samples_with_positions), rows, exclude_id, budget)
+        searcher.concurrency = concurrency
+
+        # Adaptive sampling usually stops early, so its ETA is an upper bound
+        if budget.progress is not None:
+            budget.progress.stage('querying', total=len(samples_with_positions) - len(boilerplate))
+        with profile_stage('solr_queries'):
+            if sampling_mode == 'adaptive':
+                search_results = self.adaptive_search(samples_with_positions, searcher, skip=boilerplate)
+            else:
+                search_results = searcher.search([
+                    (item['index'], item['sample']) for item in samples_with_positions
+                    if item['index'] not in boilerplate
+                ])
+
+        logger.info("Completed individual searches, found matches for %s samples", len(search_results))
+        if batch_peers is not None:
+            with profile_stage('batch_peers'):
+                search_results = batch_peers.match(samples_with_positions, search_results, skip=boilerplate)
+
+        if budget.progress is not None:
+            budget.progress.stage('building_output')
+        with profile_stage('output'):
+            result = self.build_output(document, samples_with_positions, search_results, sha1_file, multisource,
+                                       boilerplate=boilerplate)
+            result["hits"] = self.collect_hits(search_results, multisource)
+        result["filename"] = filename
+        result["sampling"] = {
+            "mode": sampling_mode,
+            "samples_total": len(samples_with_positions),
+            "boilerplate": len(boilerplate),
+            "queries": searcher.queries,
+            "samples_queried": len(searcher.queried),
+            "queries_saved": len(samples_with_positions) - len(searcher.queried)
+        }
+        if batch_peers is not None:
+            result["batch_peers"] = batch_peers.summary()
+        result["incomplete"] = budget.exhausted_reason is not None
+        result["incomplete_reason"] = budget.exhausted_reason
+        return result
+
+    def scan_file(self, filename, content, mimetype, expmin, expmax, multisource, sha1_file,
+                  sampling_mode=None, budget=None):
+        """
+        Extract the text of an uploaded file with Solr and scan it
+        """
+        document = self.extract_document(filename, content, mimetype)
+
+        return self.process_document(document, sha1_file, expmin, expmax, multisource,
+                                     filename=filename, sampling_mode=sampling_mode, budget=budget)
+
+    def extract_document(self, filename, content, mimetype):
+        """Extract and normalize the text of a file"""
+        try:
+            with profile_stage('extraction'):
+                text = self.extraction_service.extract(filename, content, mimetype)
+        except ExtractionError as e:
+            raise ScanError(str(e))
+
+        with profile_stage('normalize'):
+            return self.normalize_document(text, filename, mimetype)
+
+    def rescan_document(self, document, sha1_file, expmin, expmax, multisource, previous_hits,
+                        previous_sources, indexed_since=None, samples_total=None, filename="processed_document",
+                        budget=None):
+        """
+        Incremental re-scan of a stored result: the stored sample hits are kept and the samples are
+        only queried against documents indexed since indexed_since. Without usable stored hits
+        (older results, or the text no longer splits into the same samples) every sample is queried
+        against the whole corpus.
+        """
+        budget = budget or ScanBudget(Config.SCAN_TIME_BUDGET, Config.SCAN_QUERY_BUDGET)
+        samples_with_positions = self.extract_samples(document, expmin, expmax)
+        boilerplate = self.boilerplate_service.find(samples_with_positions)
+        rows = 10 if multisource else 1
+
+        if previous_hits is None or indexed_since is None or samples_total != len(samples_with_positions):
+            logger.info("No usable stored hits for %s, re-scanning against the whole corpus", filename)
+            previous_hits = []
+            indexed_since = None
+
+        known_sources = {
+            source["id"]: {
+                "id": source["id"],
+                "resource_name": source.get("name", "Unknown"),
+                "description": source.get("description", "")
+            } for source in previous_sources
+        }
+        # Samples that became boilerplate since the previous scan lose their stored hits
+        search_results = {
+            idx: [known_sources[source_id] for source_id in source_ids if source_id in known_sources]
+            for idx, source_ids in previous_hits if idx not in boilerplate
+        }
+
+        filters = [f'-id:"{sha1_file}"']
+        if indexed_since is not None:
+            filters.append(self.solr_service.build_indexed_since_filter(indexed_since))
+        searcher = SampleSearcher(self.solr_service, rows, filters, budget)
+
+        # With a single source per sample, samples that already have one keep it
+        pending = [
+            (item['index'], item['sample']) for item in samples_with_positions
+            if item['index'] not in boilerplate and (multisource or item['index'] not in search_results)
+        ]
+        if budget.progress is not None:
+            budget.progress.stage('querying', total=len(pending))
+        new_hits = searcher.search(pending)
+        if budget.progress is not None:
+            budget.progress.stage('building_output')
+
+        new_source_ids = set()
+        for idx, docs in new_hits.items():
+            merged = search_results.get(idx, [])
+            merged_ids = {doc["id"] for doc in merged}
+            for doc in docs:
+                if doc["id"] not in merged_ids:
+                    merged.append(doc)
+                    merged_ids.add(doc["id"])
+                    if doc["id"] not in known_sources:
+                        new_source_ids.add(doc["id"])
+            search_results[idx] = merged[:rows]
+
+        logger.info("Re-scan of %s queried %s samples, %s new hits from %s new sources",
+                    filename, searcher.queries, len(new_hits), len(new_source_ids))
+
+        result = self.build_output(document, samples_with_positions, search_results, sha1_file, multisource,
+                                   boilerplate=boilerplate)
+        result["filename"] = filename
+        result["hits"] = self.collect_hits(search_results, multisource)
+        result["sampling"] = {
+            "mode": "incremental" if indexed_since is not None else "full",
+            "samples_total": len(samples_with_positions),
+            "boilerplate": len(boilerplate),
+            "queries": searcher.queries,
+            "samples_queried": len(searcher.queried),
+            "queries_saved": len(samples_with_positions) - len(searcher.queried)
+        }
+        result["new_sources"] = sorted(new_source_ids)
+        result["incomplete"] = budget.exhausted_reason is not None
+        result["incomplete_reason"] = budget.exhausted_reason
+        return result
+
+    @staticmethod
+    def collect_hits(search_results, multisource):
+        """Sample index -> source ids as shown in the output, stored so a later re-scan can reuse them"""
+        rows = 10 if multisource else 1
+        return [[idx, [doc["id"] for doc in search_results[idx][:rows]]] for idx in sorted(search_results)]
+
+    def extract_samples(self, document, expmin, expmax):
+        samples_with_positions = []
+        lines = [line.strip() for line in document.split('\n') if line.strip()]
+        pattern = _sample_pattern(expmin, expmax)
+
+        # Extract all samples with proper positioning
+        for line_num, text in enumerate(lines, 1):
+            # Samples are cut from the query view, which has the same offsets as the line
+            view = TextNormalizer.query_view(text)
+            line_start = 0
+            while True:
+                match = pattern.search(text, line_start)
+                if not match:
+                    break
+
+                sample = TextNormalizer.clean_sample(view[match.start():match.end()])
+
+                if sample:
+                    samples_with_positions.append({
+                        'index': len(samples_with_positions),
+                        'sample': sample,
+                        'line_num': line_num,
+                        'start_pos': match.start(),
+                        'end_pos': match.end(),
+                        'text_context': text
+                    })
+
+                line_start = match.end()
+
+        return samples_with_positions
+
+    def create_searcher(self, document, sample_count, rows, exclude_id=None, budget=None):
+        """
+        Prepare the sample searcher. When preselection applies, a few significant-term queries pick
+        the candidate documents and the sample phrase queries are restricted to them.
+        """
+        budget = budget or ScanBudget()
+        base_filters = [f'-id:"{exclude_id}"'] if exclude_id else []
+
+        if not Config.CANDIDATE_PRESELECTION or sample_count < Config.CANDIDATE_MIN_SAMPLES:
+            return SampleSearcher(self.solr_service, rows, base_filters, budget)
+
+        candidate_ids = self.select_candidates(document, base_filters)
+        if not candidate_ids:
+            logger.info("No candidate documents found, searching the whole corpus")
+            return SampleSearcher(self.solr_service, rows, base_filters, budget)
+
+        return SampleSearcher(
+            self.solr_service, rows, base_filters, budget,
+            candidate_filters=base_filters + [self.solr_service.build_ids_filter(candidate_ids)]
+        )
+
+    def adaptive_search(self, samples_with_positions, searcher, skip=frozenset()):
+        """
+        Coarse-to-fine sampling: probe every Nth sample first, then query the neighbourhood of each
+        hit and every sample on a line with a hit, repeating until no new hits appear.
+        Samples in skip are never queried.
+        """
+        stride = max(1, Config.ADAPTIVE_SAMPLING_STRIDE)
+        total = len(samples_with_positions)
+
+        line_samples = {}
+        for item in samples_with_positions:
+            line_samples.setdefault(item['line_num'], []).append(item['index'])
+
+        results = {}
+        queried = set(skip)
+        # The first pass strides over the samples that may be queried
+        pending = set([idx for idx in range(total) if idx not in skip][::stride])
+        dense_lines = set()
+
+        while pending and not searcher.budget.exhausted:
+            batch = sorted(pending - queried)
+            if not batch:
+                break
+            queried.update(batch)
+
+            hits = searcher.search([(idx, samples_with_positions[idx]['sample']) for idx in batch])
+            results.update(hits)
+
+            pending = set()
+            for idx in hits:
+                pending.update(range(max(0, idx - stride + 1), min(total, idx + stride)))
+                line_num = samples_with_positions[idx]['line_num']
+                if line_num not in dense_lines:
+                    dense_lines.add(line_num)
+                    pending.update(line_samples[line_num])
+
+        logger.info("Adaptive sampling queried %s/%s samples", len(queried) - len(skip), total)
+        return results
+
+    @staticmethod
+    def compare_highlights(reference_output, output):
+        """
+        Measure how closely the highlighted spans of an output match a reference output
+        (e.g. adaptive against full sampling of the same document)
+        """
+        def highlighted_ranges(items):
+            ranges = set()
+            position = 0
+            for item in items:
+                content = item.get("content", "")
+                if item["type"] == "highlight":
+                    ranges.update(range(position, position + len(content)))
+                if item["type"] in ("text", "highlight"):
+                    position += len(content)
+                elif item["type"] == "br":
+                    position += 1
+            return ranges
+
+        reference = highlighted_ranges(reference_output)
+        candidate = highlighted_ranges(output)
+        common = len(reference & candidate)
+        return {
+            "recall": common / len(reference) if reference else 1.0,
+            "precision": common / len(candidate) if candidate else 1.0
+        }
+
+    def select_candidates(self, document, filter_queries=None):
+        """
+        Pick the top-K candidate source documents from the most significant terms of each part of the
+        document: term frequency in the part times inverse document frequency in the corpus
+        """
+        words = [word for word in (word.lower() for word in _TERM_PATTERN.findall(document)) if word not in _STOPWORDS]
+        if not words:
+            return []
+
+        chunks = max(1, Config.CANDIDATE_QUERY_CHUNKS)
+        chunk_size = -(-len(words) // chunks)
+        # Only the most frequent terms of each part are looked up, a rare term scores low on tf anyway
+        counts = [
+            dict(Counter(words[i:i + chunk_size]).most_common(Config.CANDIDATE_TERM_POOL))
+            for i in range(0, len(words), chunk_size)
+        ]
+        idf = self._inverse_document_frequencies(set().union(*counts))
+        term_groups = [
+            sorted(
+                (term for term in chunk if idf is None or term in idf),
+                key=lambda term: chunk[term] * (idf[term] if idf is not None else 1.0),
+                reverse=True
+            )[:Config.CANDIDATE_TERMS]
+            for chunk in counts
+        ]
+
+        candidates = self.solr_service.find_candidate_documents(
+            term_groups,
+            top_k=Config.CANDIDATE_TOP_K,
+            filter_queries=filter_queries
+        )
+        ranked = sorted(candidates.items(), key=lambda x: x[1], reverse=True)
+        candidate_ids = [doc_id for doc_id, _ in ranked[:Config.CANDIDATE_TOP_K]]
+
+        logger.info("Selected %s candidate documents from %s term queries", len(candidate_ids), len(term_groups))
+        return candidate_ids
+
+    def _inverse_document_frequencies(self, terms):
+        """
+        IDF of the terms found in the corpus, without the terms in more than CANDIDATE_MAX_DF of its
+        documents. None when Solr cannot tell (no /terms handler before solr-provision).
+        """
+        try:
+            num_docs, frequencies = self.solr_service.document_frequencies(Config.SOLR_CONTENT_FIELD, sorted(terms))
+        except Exception as e:
+            logger.warning("Term document frequencies unavailable, ranking candidate terms by frequency: %s", e)
+            return None
+
+        max_df = Config.CANDIDATE_MAX_DF * num_docs
+        return {term: math.log(num_docs / df) for term, df in frequencies.items() if df <= max_df}
+
+    def build_output(self, document, samples_with_positions, search_results, sha1_file, multisource,
+                     boilerplate=frozenset()):
+        sources = {}
+        words_doctotal = len(document.split())
+        words_scanned = 0
+        words_copied = 0
+        chars_doctotal = len(document)
+        chars_scanned = 0
+        chars_copied = 0
+        samples_scanned = 0
+        samples_copied = 0
+        current_sources = None
+        output = []
+
+        samples_by_line = {}
+        for sample_info in samples_with_positions:
+            samples_by_line.setdefault(sample_info['line_num'], []).append(sample_info)
+
+        lines = [line.strip() for line in document.split('\n') if line.strip()]
+
+        for line_num, text in enumerate(lines, 1):
+            line_samples = samples_by_line.get(line_num, [])
+            line_samples.sort(key=lambda x: x['start_pos'])
+
+            current_pos = 0
+
+            for sample_info in line_samples:
+                sample = sample_info['sample']
+                start_pos = sample_info['start_pos']
+                end_pos = sample_info['end_pos']
+                sample_idx = sample_info['index']
+
+                # Add text before sample
+                presample = text[current_pos:start_pos]
+                output.append({"type": "text", "content": presample})
+
+                # Boilerplate is left out of the metrics; in mark mode the client can grey it out
+                if sample_idx in boilerplate:
+                    segment = {"type": "text", "content": sample}
+                    if Config.BOILERPLATE_MODE == 'mark':
+                        segment["boilerplate"] = True
+                    output.append(segment)
+                    current_pos = end_pos
+                    continue
+
+                # Update metrics
+                samples_scanned += 1
+                words_in_sample = len(sample.split())
+                words_scanned += words_in_sample
+                chars_scanned += len(sample)
+
+                # Check if sample has matches
+                if sample_idx in search_results:
+                    samples_copied += 1
+                    words_copied += words_in_sample
+                    chars_copied += len(sample)
+                    new_sources = {}
+
+                    docs = search_results[sample_idx][:10 if multisource else 1]
+
+                    for doc in docs:
+                        source_id = doc["id"]
+                        sources[source_id] = sources.get(source_id, {
+                            "color": source_id[:6],
+                            "name": doc.get("resource_name", "Unknown"),
+                            "description": doc.get("description", ""),
+                            "words": 0,
+                            "samples": 0
+                        })
+                        sources[source_id]["words"] += words_in_sample
+                        sources[source_id]["samples"] += 1
+                        if doc.get("batch_peer"):
+                            sources[source_id]["batch_peer"] = True
+                        new_sources[source_id] = True
+
+                    if current_sources != new_sources:
+                        current_sources = new_sources
+                        for source_id in new_sources:
+                            output.append({
+                                "type": "marker",
+                                "id": f"{sha1_file}_{source_id}",
+                                "color": sources[source_id]["color"],
+                                "name": sources[source_id]["name"]
+                            })
+
+                    output.append({"type": "highlight", "content": sample})
+                else:
+                    output.append({"type": "text", "content": sample})
+
+                current_pos = end_pos
+
+            # Add remaining text in line
+            remaining_text = text[current_pos:]
+            output.append({"type": "text", "content": remaining_text})
+            output.append({"type": "br"})
+
+        # Calculate ratios
+        chars_original = chars_scanned - chars_copied
+        chars_original_ratio = chars_original / chars_scanned if chars_scanned else 0
+        words_original = words_scanned - words_copied
+        words_original_ratio = words_original / words_scanned if words_scanned else 0
+        samples_original = samples_scanned - samples_copied
+        samples_original_ratio = samples_original / samples_scanned if samples_scanned else 0
+
+        # Sort sources by words
+        sorted_sources = sorted(sources.items(), key=lambda x: x[1]["words"], reverse=True)
+
+        return {
+            "filename": "processed_document",
+            "metrics": {
+                "chars_doctotal": chars_doctotal,
+                "chars_scanned": chars_scanned,
+                "chars_original": chars_original,
+                "chars_copied": chars_copied,
+                "chars_original_ratio": chars_original_ratio,
+                "words_doctotal": words_doctotal,
+                "words_scanned": words_scanned,
+                "words_original": words_original,
+                "words_copied": words_copied,
+                "words_original_ratio": words_original_ratio,
+                "samples_scanned": samples_scanned,
+                "samples_original": samples_original,
+                "samples_copied": samples_copied,
+                "samples_original_ratio": samples_original_ratio
+            },
+            "sources": [
+                {
+                    "id": source_id,
+                    "color": info["color"],
+                    "name": info["name"],
+                    "description": info["description"],
+                    "words": info["words"],
+                    "samples": info["samples"],
+                    **({"batch_peer": True} if info.get("batch_peer") else {})
+                } for source_id, info in sorted_sources
+            ],
+            "output": output
+        }
+
+    @staticmethod
+    def normalize_document(document, filename="", mimetype=None):
+        """Clean extracted text once before scanning; PDF text is folded into a single line"""
+        is_pdf = mimetype == 'application/pdf' or (filename or "").lower().endswith('.pdf')
+        return TextNormalizer.clean_document(document, join_lines=is_pdf)
+
+
+class ScanError(Exception):
+    """A scan could not run; the message is safe to return to the client"""
+
+
+class SampleSearcher:
+    """
+    Runs sample phrase queries, optionally restricted to preselected candidate documents.
+    The first restricted search probes unmatched samples against the whole corpus and drops
+    the restriction when the candidates miss too many sources.
+    """
+    def __init__(self, solr_service, rows, base_filters, budget, candidate_filters=None):
+        self.solr_service = solr_service
+        self.rows = rows
+        self.base_filters = base_filters
+        self.budget = budget
+        self.candidate_filters = candidate_filters
+        self.concurrency = 1
+        # Distinct sample indexes sent to Solr; a probed sample is queried twice but counted once
+        self.queried = set()
+        self._probed = False
+
+    @property
+    def queries(self):
+        return self.budget.queries
+
+    def search(self, samples):
+        if self.candidate_filters is None:
+            return self._query(samples, self.base_filters)
+
+        results = self._query(samples, self.candidate_filters)
+        if self._probed or self.budget.exhausted:
+            return results
+        self._probed = True
+
+        # Probe an evenly spread subset of the unmatched samples against the whole corpus
+        unmatched = [item for item in samples if item[0] not in results]
+        probe_count = min(Config.CANDIDATE_PROBE_SAMPLES, len(unmatched))
+        if not probe_count:
+            return results
+
+        step = len(unmatched) / probe_count
+        probe = [unmatched[int(i * step)] for i in range(probe_count)]
+        probe_results = self._query(probe, self.base_filters)
+        results.update(probe_results)
+
+        if len(probe_results) / probe_count > Config.CANDIDATE_FALLBACK_RATIO:
+            logger.info("Candidate coverage too low (%s/%s probe hits), falling back to full corpus search",
+                        len(probe_results), probe_count)
+            self.candidate_filters = None
+            probed = {idx for idx, _ in probe}
+            remaining = [item for item in unmatched if item[0] not in probed]
+            results.update(self._query(remaining, self.base_filters))
+
+        return results
+
+    def _query(self, samples, filter_queries):
+        if self.concurrency > 1:
+            return self.solr_service.search_samples_concurrent(samples, self.concurrency, rows=self.rows,
+                                                               filter_queries=filter_queries, budget=self.budget,
+                                                               queried=self.queried)
+        return self.solr_service.search_samples(samples, rows=self.rows, filter_queries=filter_queries,
+                                                budget=self.budget, queried=self.queried)
+
+
+class ScanBudget:
+    """
+    Time and query budget of one scan, with optional cooperative cancellation.
+    cancel_check is called at most every SCAN_CANCEL_CHECK_INTERVAL seconds.
+    progress (a ProgressReporter) is told about every query and throttles its own writes; it only counts
+    the queries of its current stage, so the candidate queries made before sampling are not counted.
+    """
+    def __init__(self, time_budget=0, query_budget=0, cancel_check=None, progress=None):
+        self.deadline = time.monotonic() + time_budget if time_budget else None
+        self.query_budget = query_budget or None
+        self.cancel_check = cancel_check
+        self.progress = progress
+        self.queries = 0
+        self.exhausted_reason = None
+        self._last_cancel_check = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self):
+        return self.exhausted_reason is not None
+
+    def remaining_ms(self):
+        if self.deadline is None:
+            return None
+        return max(1, int((self.deadline - time.monotonic()) * 1000))
+
+    def allow_query(self) -> bool:
+        """Check the budget before a query and count it if it may run"""
+        with self._lock:
+            return self._allow_query()
+
+    def _allow_query(self) -> bool:
+        if self.exhausted_reason is None:
+            now = time.monotonic()
+            if self.deadline is not None and now >= self.deadline:
+                self.exhausted_reason = 'deadline'
+            elif self.query_budget is not None and self.queries >= self.query_budget:
+                self.exhausted_reason = 'query_budget'
+            elif self.cancel_check and now - self._last_cancel_check >= Config.SCAN_CANCEL_CHECK_INTERVAL:
+                self._last_cancel_check = now
+                if self.cancel_check():
+                    self.exhausted_reason = 'cancelled'
+
+        if self.exhausted_reason is not None:
+            return False
+        self.queries += 1
+        if self.progress is not None:
+            self.progress.advance()
+        return True
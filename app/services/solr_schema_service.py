@@ -0,0 +1,197 @@
+import logging
+from typing import Dict, Any, List
+
+import requests
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Provisions the Solr core through the Schema and Config APIs: a shingled phrase field,
+single-valued metadata fields, a /terms handler and cache settings. Every step compares against the current core
+first, so running it again only applies what differs.
+"""
+class SolrSchemaService:
+    def __init__(self):
+        self.session = requests.Session()
+        self.schema_url = f"{Config.SOLR_URL}/schema"
+        self.config_url = f"{Config.SOLR_URL}/config"
+
+    @staticmethod
+    def field_types() -> List[Dict[str, Any]]:
+        shingle = str(Config.SOLR_SHINGLE_SIZE)
+        return [{
+            "name": "text_shingle",
+            "class": "solr.TextField",
+            "positionIncrementGap": "100",
+            # Index word n-grams next to the words; a sample phrase is then looked up as a
+            # phrase of n-gram terms, which are far more selective than single words
+            "indexAnalyzer": {
+                "tokenizer": {"class": "solr.StandardTokenizerFactory"},
+                "filters": [
+                    {"class": "solr.LowerCaseFilterFactory"},
+                    {"class": "solr.ShingleFilterFactory", "minShingleSize": shingle,
+                     "maxShingleSize": shingle, "outputUnigrams": "true"}
+                ]
+            },
+            "queryAnalyzer": {
+                "tokenizer": {"class": "solr.StandardTokenizerFactory"},
+                "filters": [
+                    {"class": "solr.LowerCaseFilterFactory"},
+                    {"class": "solr.ShingleFilterFactory", "minShingleSize": shingle,
+                     "maxShingleSize": shingle, "outputUnigrams": "false",
+                     "outputUnigramsIfNoShingles": "true"}
+                ]
+            }
+        }]
+
+    @staticmethod
+    def fields() -> List[Dict[str, Any]]:
+        return [
+            {"name": "resource_name", "type": "string", "indexed": True, "stored": True,
+             "docValues": True, "multiValued": False},
+            {"name": "description", "type": "text_general", "indexed": True, "stored": True,
+             "multiValued": False},
+            {"name": Config.SOLR_INDEXED_AT_FIELD, "type": "pdate", "indexed": True, "stored": True,
+             "docValues": True, "multiValued": False},
+            {"name": Config.SOLR_SHINGLE_FIELD, "type": "text_shingle", "indexed": True, "stored": False,
+             "multiValued": False}
+        ]
+
+    @staticmethod
+    def copy_fields() -> List[Dict[str, str]]:
+        return [{"source": Config.SOLR_CONTENT_FIELD, "dest": Config.SOLR_SHINGLE_FIELD}]
+
+    @staticmethod
+    def search_components() -> List[Dict[str, Any]]:
+        return [{"name": "terms", "class": "solr.TermsComponent"}]
+
+    @staticmethod
+    def request_handlers() -> List[Dict[str, Any]]:
+        # Term document frequencies of the shingled field feed the boilerplate phrase table
+        return [{"name": "/terms", "class": "solr.SearchHandler", "startup": "lazy",
+                 "defaults": {"terms": True, "distrib": False}, "components": ["terms"]}]
+
+    @staticmethod
+    def config_properties() -> Dict[str, Any]:
+        return {
+            "query.filterCache.size": Config.SOLR_FILTER_CACHE_SIZE,
+            "query.filterCache.autowarmCount": Config.SOLR_FILTER_CACHE_AUTOWARM,
+            "query.queryResultCache.size": Config.SOLR_QUERY_RESULT_CACHE_SIZE,
+            "query.queryResultCache.autowarmCount": Config.SOLR_QUERY_RESULT_CACHE_AUTOWARM,
+            "query.queryResultWindowSize": 20,
+            "query.documentCache.size": Config.SOLR_DOCUMENT_CACHE_SIZE,
+            # Durability without opening searchers; visibility comes from commitWithin
+            "updateHandler.autoCommit.maxTime": 15000,
+            "updateHandler.autoCommit.openSearcher": False
+        }
+
+    def provision(self, dry_run=False) -> List[str]:
+        """Bring the core in line with the definitions above and return the applied actions"""
+        actions = []
+
+        for field_type in self.field_types():
+            current = self._get(f"fieldtypes/{field_type['name']}", "fieldType")
+            if current is None:
+                actions.append(("add-field-type", field_type))
+            elif not self._matches(field_type, current):
+                actions.append(("replace-field-type", field_type))
+
+        for field in self.fields():
+            current = self._get(f"fields/{field['name']}", "field")
+            if current is None:
+                actions.append(("add-field", field))
+            elif not self._matches(field, current):
+                actions.append(("replace-field", field))
+
+        existing_copy_fields = {
+            (item["source"], item["dest"]) for item in self._get("copyfields", "copyFields") or []
+        }
+        for copy_field in self.copy_fields():
+            if (copy_field["source"], copy_field["dest"]) not in existing_copy_fields:
+                actions.append(("add-copy-field", copy_field))
+
+        applied = [f"{command} {definition.get('name') or definition['source'] + '->' + definition['dest']}"
+                   for command, definition in actions]
+
+        if not dry_run:
+            for command, definition in actions:
+                self._post(self.schema_url, {command: definition})
+
+        config = self._get_config()
+        components = [("add-searchcomponent", component) for component in self.search_components()
+                      if component["name"] not in config.get("searchComponent", {})]
+        components += [("add-requesthandler", handler) for handler in self.request_handlers()
+                       if handler["name"] not in config.get("requestHandler", {})]
+        applied += [f"{command} {definition['name']}" for command, definition in components]
+        if not dry_run:
+            for command, definition in components:
+                self._post(self.config_url, {command: definition})
+
+        overlay = self._get_overlay()
+        properties = {name: value for name, value in self.config_properties().items()
+                      if self._overlay_value(overlay, name) != value}
+        if properties:
+            applied.append("set-property " + ", ".join(f"{name}={value}" for name, value in properties.items()))
+            if not dry_run:
+                self._post(self.config_url, {"set-property": properties})
+
+        # Explicit fields only: guessed fields would come back multi-valued
+        if overlay.get("userProps", {}).get("update.autoCreateFields") != "false":
+            applied.append("set-user-property update.autoCreateFields=false")
+            if not dry_run:
+                self._post(self.config_url, {"set-user-property": {"update.autoCreateFields": "false"}})
+
+        logger.info(f"Solr provisioning {'planned' if dry_run else 'applied'} {len(applied)} changes")
+        return applied
+
+    @staticmethod
+    def _matches(expected: Dict[str, Any], current: Dict[str, Any]) -> bool:
+        return all(SolrSchemaService._normalize(current.get(key)) == SolrSchemaService._normalize(value)
+                   for key, value in expected.items())
+
+    @staticmethod
+    def _normalize(value):
+        # The Schema API echoes booleans and numbers back as JSON values or strings depending on the version
+        if isinstance(value, dict):
+            return {key: SolrSchemaService._normalize(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [SolrSchemaService._normalize(item) for item in value]
+        return str(value).lower()
+
+    def _get(self, path, key):
+        response = self.session.get(f"{self.schema_url}/{path}", timeout=Config.SOLR_TIMEOUT)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json().get(key)
+
+    def _get_config(self) -> Dict[str, Any]:
+        response = self.session.get(self.config_url, timeout=Config.SOLR_TIMEOUT)
+        response.raise_for_status()
+        return response.json().get("config", {})
+
+    def _get_overlay(self) -> Dict[str, Any]:
+        response = self.session.get(f"{self.config_url}/overlay", timeout=Config.SOLR_TIMEOUT)
+        response.raise_for_status()
+        return response.json().get("overlay", {})
+
+    @staticmethod
+    def _overlay_value(overlay, name):
+        node = overlay.get("props", {})
+        for part in name.split('.'):
+            if not isinstance(node, dict):
+                return None
+            node = node.get(part)
+        return node
+
+    def _post(self, url, payload):
+        response = self.session.post(url, json=payload, timeout=Config.SOLR_TIMEOUT)
+        if response.status_code != 200:
+            raise Exception(f"Solr rejected {list(payload)[0]}: {response.text}")
+        errors = response.json().get("errors")
+        if errors:
+            raise Exception(f"Solr rejected {list(payload)[0]}: {errors}")
@@ -1,16 +1,13 @@
 import re
-from asyncio import timeout
 
-import pysolr
 import requests
 import logging
-import asyncio
-import aiohttp
+from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 
 from requests.adapters import HTTPAdapter
 from urllib3 import Retry
-from ..utils import Utils
+from .text_normalizer import TextNormalizer
 from ..config import Config
 
 logger = logging.getLogger(__name__)
@@ -38,8 +35,10 @@ class SolrService:
     def __init__(self):
         self.session = requests.Session()
 
+        # Read timeouts are not retried so a slow query cannot stack SOLR_TIMEOUT several times
         retry_strategy = Retry(
             total=3,
+            read=Config.SOLR_READ_RETRIES,
             backoff_factor=0.1,
             status_forcelist=[429, 500, 502, 503, 504]
         )
@@ -59,12 +58,22 @@ class SolrService:
             'Keep-Alive': f'timeout={Config.CONNECTION_KEEP_ALIVE_TIMEOUT}, max=1000'
         })
 
+        # Imported here so processes that never talk to Solr do not load pysolr at startup
+        import pysolr
+
         self.solr_client = pysolr.Solr(
             Config.SOLR_URL,
             session=self.session,
             timeout=Config.SOLR_TIMEOUT
         )
 
+        # Sample phrase queries are short; a tighter timeout keeps a stuck query from holding a scan
+        self.query_client = pysolr.Solr(
+            Config.SOLR_URL,
+            session=self.session,
+            timeout=Config.SOLR_QUERY_TIMEOUT
+        )
+
     """
     Escape special characters in Solr query text.
     """
@@ -82,19 +91,32 @@ class SolrService:
     """
     Search for samples in Solr and return matching documents.
     """
-    def search_samples(self, samples) -> dict:
+    def search_samples(self, samples, rows: int = 1, filter_queries=None, budget=None, queried=None) -> dict:
         results = {}
 
         for idx, sample in samples:
+            if budget is not None and not budget.allow_query():
+                logger.info("Scan budget exhausted (%s), skipping remaining samples", budget.exhausted_reason)
+                break
+            if queried is not None:
+                queried.add(idx)
+
             try:
-                escaped_sample = Utils.escape_solr_text(sample)
+                # Samples come from ScanService.extract_samples and are already cleaned
+                escaped_sample = TextNormalizer.escape_query(sample)
                 query = f'"{escaped_sample}"'
 
-                search_results = self.solr_client.search(
-                    query,
-                    fl="id,resource_name,description",
-                    rows=1
-                )
+                params = {
+                    "fl": "id,resource_name,description",
+                    "df": Config.SOLR_PHRASE_FIELD,
+                    "rows": rows,
+                    "fq": filter_queries or []
+                }
+                time_allowed = budget.remaining_ms() if budget is not None else None
+                if time_allowed is not None:
+                    params["timeAllowed"] = time_allowed
+
+                search_results = self.query_client.search(query, **params)
 
                 if search_results:
                     results[idx] = [{
@@ -104,11 +126,74 @@ class SolrService:
                     } for doc in search_results]
 
             except Exception as e:
-                logger.warning(f"Search failed for sample {idx}: {e}")
+                logger.warning("Search failed for sample %s: %s", idx, e)
                 continue
 
         return results
 
+    """
+    Search samples on several connections at once. Under a gevent worker the pool threads are greenlets,
+    so waiting on Solr does not block the worker.
+    """
+    def search_samples_concurrent(self, samples, concurrency: int, rows: int = 1, filter_queries=None,
+                                  budget=None, queried=None) -> dict:
+        samples = list(samples)
+        if concurrency <= 1 or len(samples) <= 1:
+            return self.search_samples(samples, rows=rows, filter_queries=filter_queries, budget=budget,
+                                       queried=queried)
+
+        concurrency = min(concurrency, Config.POOL_MAXSIZE, len(samples))
+        chunks = [samples[i::concurrency] for i in range(concurrency)]
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(self.search_samples, chunk, rows, filter_queries, budget, queried)
+                for chunk in chunks
+            ]
+            for future in futures:
+                results.update(future.result())
+
+        return results
+
+    """
+    Run one OR query per group of significant terms and return the best scoring document ids.
+    """
+    def find_candidate_documents(self, term_groups, top_k: int, filter_queries=None) -> dict:
+        candidates = {}
+
+        for terms in term_groups:
+            if not terms:
+                continue
+            try:
+                search_results = self.solr_client.search(
+                    " ".join(terms),
+                    **{
+                        "q.op": "OR",
+                        "fl": "id,score",
+                        "rows": top_k,
+                        "fq": filter_queries or []
+                    }
+                )
+                for doc in search_results:
+                    doc_id = self.extract_field_value(doc.get("id"))
+                    candidates[doc_id] = max(candidates.get(doc_id, 0.0), doc.get("score", 0.0))
+            except Exception as e:
+                logger.warning("Candidate query failed: %s", e)
+                continue
+
+        return candidates
+
+    @staticmethod
+    def build_ids_filter(doc_ids) -> str:
+        # Sorted so the same candidate set always maps to the same filter cache entry
+        return "{!terms f=id}" + ",".join(sorted(doc_ids))
+
+    @staticmethod
+    def build_indexed_since_filter(since) -> str:
+        # Rounded down to the minute so re-scans started close together share a filter cache entry
+        return f"{Config.SOLR_INDEXED_AT_FIELD}:[{since.strftime('%Y-%m-%dT%H:%M:00Z')} TO *]"
+
     def extract_text(self, filename, content, mimetype) -> requests.Response:
         try:
             data = {
@@ -125,7 +210,7 @@ class SolrService:
 
         except requests.Timeout as e:
             logger.error(f"Extract timeout for file {filename}: {str(e)}")
-            raise Exception(f"Text extraction timed out after {timeout} seconds - file may be too complex for Tika to process")
+            raise Exception(f"Text extraction timed out after {Config.SOLR_TIMEOUT} seconds - file may be too complex for Tika to process")
 
         except requests.RequestException as e:
             logger.error(f"Failed to extract text from file: {str(e)}")
@@ -142,9 +227,10 @@ class SolrService:
         try:
             data = {
                 "literal.id": sha1_file,
-                "commitWithin": 5000,
+                "commitWithin": Config.SOLR_COMMIT_WITHIN_MS,
                 "literal.description": description,
                 "literal.resource_name": filename,
+                f"literal.{Config.SOLR_INDEXED_AT_FIELD}": datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
                 "overwrite": overwrite,
                 "extractOnly": "false"
             }
@@ -160,7 +246,7 @@ class SolrService:
 
         except requests.Timeout as e:
             logger.error(f"Upload timeout for file {filename}: {str(e)}")
-            raise Exception(f"File upload timed out - file may be too large or complex")
+            raise Exception(f"Upload of {filename} timed out - file may be too large or complex")
 
         except requests.RequestException as e:
             logger.error(f"Failed to upload file to Solr: {str(e)}")
@@ -168,7 +254,39 @@ class SolrService:
 
 
 
+    def index_document(self,
+                       sha1_file,
+                       filename,
+                       text,
+                       description,
+                       overwrite="false") -> requests.Response:
+        """
+        Index text that was already extracted, so Tika does not parse the file again inside Solr
+        """
+        try:
+            document = {
+                "id": sha1_file,
+                "resource_name": filename,
+                "description": description,
+                Config.SOLR_INDEXED_AT_FIELD: datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+                Config.SOLR_CONTENT_FIELD: text
+            }
+
+            return self.session.post(f"{Config.SOLR_URL}/update",
+                                     params={"commitWithin": Config.SOLR_COMMIT_WITHIN_MS, "overwrite": overwrite},
+                                     json=[document],
+                                     timeout=Config.SOLR_TIMEOUT)
+
+        except requests.Timeout as e:
+            logger.error(f"Index timeout for file {filename}: {str(e)}")
+            raise Exception(f"Indexing of {filename} timed out")
+
+        except requests.RequestException as e:
+            logger.error(f"Failed to index document in Solr: {str(e)}")
+            raise Exception(f"Network error during indexing: {str(e)}")
+
     def commit_changes(self, commit_status: str = "true") -> bool:
+        """Hard commit; prefer commitWithin and CommitCoordinator, a hard commit invalidates every cache"""
         try:
             self.solr_client.commit()
             return True
@@ -176,13 +294,75 @@ class SolrService:
             logger.error(f"Failed to commit changes to Solr: {str(e)}")
             raise Exception(e)
 
+    def soft_commit(self) -> bool:
+        try:
+            self.solr_client.commit(softCommit=True)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to soft commit changes to Solr: {str(e)}")
+            raise Exception(e)
 
+    def document_exists(self, doc_id: str) -> bool:
+        """Whether a document is visible to searches (not just written to the transaction log)"""
+        results = self.query_client.search(f'id:"{self.escape_solr_text(doc_id)}"', rows=0)
+        return results.hits > 0
+
+
+
+    def iter_terms(self, field: str, min_count: int, page_size: int = 10000):
+        """
+        Yield (term, document frequency) for every indexed term of a field that occurs in at least
+        min_count documents, in index order. Uses the /terms handler added by solr-provision.
+        """
+        lower = None
+        while True:
+            params = {
+                "terms.fl": field,
+                "terms.mincount": min_count,
+                "terms.limit": page_size,
+                "terms.sort": "index",
+                "json.nl": "flat",
+                "wt": "json"
+            }
+            if lower is not None:
+                params["terms.lower"] = lower
+                params["terms.lower.incl"] = "false"
+
+            response = self.session.get(f"{Config.SOLR_URL}/terms", params=params, timeout=Config.SOLR_TIMEOUT)
+            response.raise_for_status()
+            flat = response.json().get("terms", {}).get(field, [])
+            for i in range(0, len(flat), 2):
+                yield flat[i], flat[i + 1]
+
+            if len(flat) < page_size * 2:
+                return
+            lower = flat[-2]
+
+    def document_frequencies(self, field: str, terms) -> tuple:
+        """
+        The number of indexed documents and the document frequency of each of terms in a field, from the
+        /terms handler added by solr-provision. Terms that are not indexed are left out.
+        """
+        num_docs = self.query_client.search("*:*", rows=0).hits
+        # POST, a few hundred terms do not fit in a query string
+        response = self.session.post(f"{Config.SOLR_URL}/terms", data={
+            "terms.fl": field,
+            "terms.list": ",".join(terms),
+            "json.nl": "flat",
+            "wt": "json"
+        }, timeout=Config.SOLR_TIMEOUT)
+        response.raise_for_status()
+        flat = response.json().get("terms", {}).get(field, [])
+        return num_docs, {flat[i]: flat[i + 1] for i in range(0, len(flat), 2) if flat[i + 1]}
 
     def delete_file(self, sha1_file: str) -> bool:
         try:
-            # Format the delete request properly
-            self.solr_client.delete(id=sha1_file)
-            self.solr_client.commit()
+            # The delete becomes visible with the next commitWithin instead of a hard commit per file
+            response = self.session.post(f"{Config.SOLR_URL}/update",
+                                         params={"commitWithin": Config.SOLR_COMMIT_WITHIN_MS},
+                                         json={"delete": {"id": sha1_file}},
+                                         timeout=Config.SOLR_TIMEOUT)
+            response.raise_for_status()
             return True
         except Exception as e:
             logger.error(f"Failed to delete file from Solr: {str(e)}")
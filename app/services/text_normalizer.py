@@ -0,0 +1,64 @@
+import re
+
+# Characters stripped from extracted text (null bytes, control characters, BOM)
+# and invisible separators turned into plain spaces
+_DOCUMENT_TABLE = str.maketrans(
+    {**{c: None for c in [*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F, 0xFEFF]},
+     **{c: ' ' for c in [*range(0x200B, 0x2010), *range(0x2028, 0x2030), *range(0x205F, 0x2070)]}}
+)
+
+# Anything a sample query may not contain; each match is replaced by a single space so
+# the query view of a line keeps the same offsets as the line itself
+_UNSAFE_PATTERN = re.compile(r'[^\w\s\.,;:!?\-\'\"()]')
+
+_QUERY_ESCAPE_TABLE = str.maketrans({c: '\\' + c for c in '+-&|!(){}[]^"\'~*?:/\\'})
+
+SAMPLE_MIN_LENGTH = 3
+SAMPLE_MAX_LENGTH = 1000
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Text normalization shared by extraction, sample selection and Solr query escaping.
+Documents are cleaned once with str.translate; samples are cut from a precomputed query view
+of each line, so they only need whitespace folding and escaping.
+"""
+class TextNormalizer:
+    @staticmethod
+    def clean_document(text, join_lines=False):
+        """
+        Remove extraction artifacts and fold whitespace. Lines are kept (without empty ones)
+        unless join_lines is set, which folds the whole text into one line as PDF text needs.
+        """
+        if not text:
+            return text
+
+        text = text.translate(_DOCUMENT_TABLE)
+        if join_lines:
+            return ' '.join(text.split())
+        return '\n'.join(' '.join(words) for words in (line.split() for line in text.split('\n')) if words)
+
+    @staticmethod
+    def query_view(line):
+        """Same length as line, with characters unsafe for Solr queries replaced by spaces"""
+        return _UNSAFE_PATTERN.sub(' ', line)
+
+    @staticmethod
+    def clean_sample(text):
+        """Fold the whitespace of a slice of a query view; too short or too long samples become empty"""
+        sample = ' '.join(text.split())
+        if len(sample) < SAMPLE_MIN_LENGTH or len(sample) > SAMPLE_MAX_LENGTH:
+            return ""
+        return sample
+
+    @staticmethod
+    def escape_query(sample):
+        """Escape Solr special characters of an already cleaned sample"""
+        return sample.translate(_QUERY_ESCAPE_TABLE)
+
+    @staticmethod
+    def query_text(text):
+        """Clean and escape arbitrary text for use inside a Solr phrase query"""
+        if not text:
+            return text
+        return ' '.join(_UNSAFE_PATTERN.sub(' ', text).split()).translate(_QUERY_ESCAPE_TABLE)
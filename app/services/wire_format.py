@@ -0,0 +1,144 @@
+import gzip
+import json
+import logging
+from typing import Dict, Any, List
+
+from flask import request, Response
+from ..config import Config
+
+try:
+    import brotli
+except ImportError:  # br is only offered when the Brotli package is installed
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_TYPES = ('text', 'highlight', 'marker', 'br')
+COMPACT_ENCODING = 'compact-v1'
+
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Compact columnar encoding of scan output and compressed JSON responses
+negotiated through the Accept-Encoding header.
+"""
+class WireFormat:
+    FORMATS = ('default', 'compact')
+
+    @staticmethod
+    def encode_output(output: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Encode the output items as columns over a single text blob:
+        - types[i]: index into SEGMENT_TYPES
+        - offsets[i]: end offset of segment i in text (code points); a text or highlight
+          segment spans text[offsets[i - 1]:offsets[i]], markers and br have no length
+        - sources: marker table index of each marker segment, in order
+        - markers: unique {id, color, name} entries
+        Empty text items are dropped.
+        """
+        type_codes = {name: code for code, name in enumerate(SEGMENT_TYPES)}
+        parts = []
+        types = []
+        offsets = []
+        sources = []
+        markers = []
+        marker_index = {}
+        offset = 0
+
+        for item in output:
+            item_type = item["type"]
+            if item_type in ("text", "highlight"):
+                content = item["content"]
+                if not content and item_type == "text":
+                    continue
+                parts.append(content)
+                offset += len(content)
+            elif item_type == "marker":
+                key = item["id"]
+                if key not in marker_index:
+                    marker_index[key] = len(markers)
+                    markers.append({"id": item["id"], "color": item.get("color"), "name": item.get("name")})
+                sources.append(marker_index[key])
+
+            types.append(type_codes[item_type])
+            offsets.append(offset)
+
+        return {
+            "encoding": COMPACT_ENCODING,
+            "text": ''.join(parts),
+            "types": types,
+            "offsets": offsets,
+            "sources": sources,
+            "markers": markers
+        }
+
+    @staticmethod
+    def decode_output(compact: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Rebuild the verbose output list from its compact encoding"""
+        text = compact["text"]
+        markers = compact["markers"]
+        sources = iter(compact["sources"])
+        output = []
+        start = 0
+
+        for code, end in zip(compact["types"], compact["offsets"]):
+            item_type = SEGMENT_TYPES[code]
+            if item_type in ("text", "highlight"):
+                output.append({"type": item_type, "content": text[start:end]})
+            elif item_type == "marker":
+                output.append({"type": "marker", **markers[next(sources)]})
+            else:
+                output.append({"type": "br"})
+            start = end
+
+        return output
+
+    @staticmethod
+    def apply_format(data: Dict[str, Any], fmt: str) -> Dict[str, Any]:
+        """Return a copy of a result dict whose output list uses the requested format"""
+        if fmt != 'compact' or not data or not isinstance(data.get("output"), list):
+            return data
+        encoded = dict(data)
+        encoded["output"] = WireFormat.encode_output(data["output"])
+        return encoded
+
+    @staticmethod
+    def serialize(payload: Dict[str, Any]) -> bytes:
+        return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    @staticmethod
+    def json_response(payload: Dict[str, Any], status: int = 200) -> Response:
+        """Serialize a payload and compress it with br or gzip if the client accepts it"""
+        return WireFormat.body_response(WireFormat.serialize(payload), status)
+
+    @staticmethod
+    def gzip_body_response(gzipped_body: bytes, status: int = 200) -> Response:
+        """Send an already gzipped JSON body as is, or inflated for clients that do not accept gzip"""
+        if request.accept_encodings.best_match(['gzip']) != 'gzip':
+            return WireFormat.body_response(gzip.decompress(gzipped_body), status)
+        response = Response(status=status, mimetype='application/json')
+        response.vary.add('Accept-Encoding')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_data(gzipped_body)
+        return response
+
+    @staticmethod
+    def body_response(body: bytes, status: int = 200) -> Response:
+        """Compress a serialized JSON body with br or gzip if the client accepts it"""
+        response = Response(status=status, mimetype='application/json')
+        response.vary.add('Accept-Encoding')
+
+        encoding = None
+        if len(body) >= Config.RESPONSE_COMPRESSION_MIN_SIZE:
+            offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+            encoding = request.accept_encodings.best_match(offered)
+
+        if encoding == 'br':
+            body = brotli.compress(body, quality=Config.RESPONSE_BROTLI_QUALITY)
+        elif encoding == 'gzip':
+            body = gzip.compress(body, compresslevel=Config.RESPONSE_GZIP_LEVEL, mtime=0)
+
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.set_data(body)
+        return response
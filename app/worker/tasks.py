@@ -1,18 +1,375 @@
+import time
 import logging
-
+import contextlib
+from datetime import datetime, timedelta
 
 from app.extensions import celery
 from app.processor.processor import OutboxEventUploadFileProcessor
+from app.services.file_service import FileService
+from app.services.scan_service import ScanService, ScanBudget, ScanError
+from app.services.database_service import DatabaseService
+from app.config import Config
+from app.services.scan_job_service import ScanJobService
+from app.services.compaction_service import CompactionService
+from app.services.scan_result_cache import ScanResultCache
+from app.services.solr_service import SolrService
+from app.services.minhash_service import MinHashService
+from app.services.extraction_service import ExtractionService, ExtractionError
+from app.services.commit_coordinator import CommitCoordinator
+from app.services.progress_service import ProgressReporter
+from app.services.boilerplate_service import BoilerplateService
+from app.services.profiling_service import ScanProfiler, profile_stage
+from app.services.logging_service import log_context
+from app.services.batch_peer_service import BatchPeerService
 
 logger = logging.getLogger(__name__)
 
 
-@celery.task
+@celery.task(bind=True, max_retries=3)
 def process_outbox_events(self) -> str:
     try:
         processor = OutboxEventUploadFileProcessor()
         processor.process_pending_events()
         return "Events processed"
     except Exception as e:
-        logger.error(f"Failed to process outbox events: {e}")
-        raise self.retry(countdown=60, exc=e)
\ No newline at end of file
+        logger.error("Failed to process outbox events: %s", e)
+        raise self.retry(countdown=60, exc=e)
+
+
+@celery.task
+def run_single_file_scan(job_id, file_path, filename, mimetype, expmin, expmax, multisource,
+                         sampling_mode=None, profile=False) -> str:
+    with log_context(scan_id=job_id):
+        job_service = ScanJobService()
+        started = time.monotonic()
+        try:
+            with open(file_path, 'rb') as f:
+                content = f.read()
+
+            job_service.update_job(job_id, status="running", stage="scanning")
+            # A profiled job stores its profile under the job id
+            with ScanProfiler(job_id, 'single_file_search', filename) if profile else contextlib.nullcontext():
+                result = ScanService().scan_file(
+                    filename, content, mimetype, expmin, expmax, multisource,
+                    sha1_file=FileService.calculate_sha1(content),
+                    sampling_mode=sampling_mode,
+                    budget=ScanBudget(Config.SCAN_TIME_BUDGET, Config.SCAN_QUERY_BUDGET,
+                                      progress=ProgressReporter.for_job(job_id))
+                )
+            job_service.complete_job(job_id, result)
+            logger.info("Scan job %s for %s completed", job_id, filename,
+                        extra={"duration": round(time.monotonic() - started, 3)})
+            return "Scan completed"
+        except ScanError as e:
+            job_service.fail_job(job_id, str(e))
+            return "Scan failed"
+        except Exception as e:
+            logger.error("Scan job %s for %s failed: %s", job_id, filename, e)
+            job_service.fail_job(job_id, "Lỗi hệ thống: " + str(e))
+            return "Scan failed"
+        finally:
+            try:
+                FileService.delete_file(file_path)
+            except Exception as e:
+                logger.warning("Failed to delete scan job file %s: %s", file_path, e)
+
+
+@celery.task
+def index_batch_peers(batch_id, files) -> str:
+    """
+    Compare the files of a multiple file search with each other before they are scanned, so copies
+    between files of the batch are found whatever their order. Runs first in the batch chain and never
+    raises: the scans run after it either way, without peers if it failed.
+    """
+    with log_context(batch_id=batch_id):
+        try:
+            extraction_service = ExtractionService()
+            documents = []
+            for file in files:
+                try:
+                    with open(file['file_path'], 'rb') as f:
+                        content = f.read()
+                    text = extraction_service.extract(file['filename'], content, file['mimetype'])
+                except Exception as e:
+                    logger.warning("Batch peer check skips %s: %s", file['filename'], e)
+                    continue
+                documents.append({
+                    "scan_status_id": file['scan_status_id'],
+                    "id": FileService.calculate_sha1(content),
+                    "name": file['filename'],
+                    "description": file['description'],
+                    "text": text,
+                    "document": ScanService.normalize_document(text, file['filename'], file['mimetype'])
+                })
+
+            BatchPeerService().build(batch_id, documents)
+            return "Batch compared"
+        except Exception as e:
+            logger.error("Batch peer check of batch %s failed: %s", batch_id, e)
+            return "Batch peer check failed"
+
+
+@celery.task
+def scan_batch_file(scan_status_id, document_id, file_path, filename, mimetype, description,
+                    expmin, expmax, multisource, sampling_mode=None, delete_file=False, profile=False,
+                    batch_id=None) -> str:
+    """
+    Index and scan one file of a multiple file search. The files of a batch run as a chain, so every
+    file is indexed (and visible) before the next one is scanned and later files find earlier ones.
+    With batch_id the peers found by index_batch_peers are added to the sources.
+    With profile the scan is profiled and the profile stored under the scan status id.
+    """
+    args = (scan_status_id, document_id, file_path, filename, mimetype, description,
+            expmin, expmax, multisource, sampling_mode, delete_file, batch_id)
+    with log_context(scan_id=scan_status_id):
+        if profile:
+            with ScanProfiler(scan_status_id, 'multiple_file_search', filename):
+                return _scan_batch_file(*args)
+        return _scan_batch_file(*args)
+
+
+def _scan_batch_file(scan_status_id, document_id, file_path, filename, mimetype, description,
+                     expmin, expmax, multisource, sampling_mode, delete_file, batch_id) -> str:
+    db_service = DatabaseService()
+    progress = ProgressReporter.for_scan(scan_status_id)
+    started = time.monotonic()
+    try:
+        # Skip scans cancelled while they were queued
+        if not db_service.start_scan_status(scan_status_id):
+            logger.info("Scan %s for %s was cancelled before it started", scan_status_id, filename)
+            progress.finish('cancelled')
+            return "Scan cancelled"
+
+        progress.stage('extracting')
+        scan_started_at = datetime.utcnow()
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        sha1_file = FileService.calculate_sha1(content)
+
+        # Extract the text once; it is both indexed and scanned. The batch peer check already extracted it
+        batch_peers = BatchPeerService().load(batch_id, scan_status_id) if batch_id else None
+        try:
+            with profile_stage('extraction'):
+                text = batch_peers.text if batch_peers is not None \
+                    else ExtractionService().extract(filename, content, mimetype)
+        except ExtractionError as e:
+            logger.error("Failed to extract text from %s: %s", filename, e)
+            db_service.update_scan_status(scan_status_id=scan_status_id, status='failed')
+            progress.finish('failed')
+            return "Scan failed"
+
+        solr_service = SolrService()
+        with profile_stage('solr_indexing'):
+            is_in_solr = solr_service.document_exists(sha1_file)
+            if not is_in_solr:
+                progress.stage('indexing')
+                logger.info("Uploading file %s to Solr", filename)
+                upload_response = solr_service.index_document(
+                    sha1_file=sha1_file,
+                    filename=filename,
+                    text=text,
+                    description=description,
+                    overwrite="false"
+                )
+                upload_status = upload_response.json().get("responseHeader", {}).get("status", 0) \
+                    if upload_response.status_code == 200 else upload_response.status_code
+                if upload_status != 0:
+                    logger.error("Failed to upload file to Solr: %s. Status: %s", filename, upload_status)
+                    db_service.update_scan_status(scan_status_id=scan_status_id, status='failed')
+                    progress.finish('failed')
+                    return "Scan failed"
+                # No commit here: commitWithin makes the document visible to the next files of the batch
+
+        scan_service = ScanService()
+        with profile_stage('normalize'):
+            document = scan_service.normalize_document(text, filename, mimetype)
+
+        # Register the document in the near-duplicate index
+        if Config.NEAR_DUPLICATE_CHECK and not db_service.get_document_signature(document_id):
+            try:
+                with profile_stage('minhash'):
+                    minhash_service = MinHashService()
+                    minhash_service.index_document(document_id, minhash_service.compute_signature(document))
+            except Exception as e:
+                logger.warning("Failed to index signature for %s: %s", filename, e)
+
+        # Search the document samples against the rest of the corpus
+        result = scan_service.process_document(
+            document, sha1_file, expmin, expmax, multisource,
+            exclude_id=sha1_file,
+            filename=filename,
+            sampling_mode=sampling_mode,
+            budget=ScanBudget(
+                Config.SCAN_TIME_BUDGET,
+                Config.SCAN_QUERY_BUDGET,
+                cancel_check=lambda: db_service.is_scan_cancelled(scan_status_id),
+                progress=progress
+            ),
+            batch_peers=batch_peers
+        )
+
+        if result["incomplete_reason"] == 'cancelled':
+            logger.info("Scan %s for %s was cancelled, discarding partial results", scan_status_id, filename)
+            progress.finish('cancelled')
+            return "Scan cancelled"
+
+        progress.stage('saving')
+
+        with profile_stage('database'):
+            scan_result = db_service.create_scan_result(
+                status_id=scan_status_id,
+                metrics=result["metrics"],
+                parameters={
+                    "exp_min": expmin,
+                    "exp_max": expmax,
+                    "multi_source": multisource
+                },
+                output_data={
+                    "filename": filename,
+                    "output": result["output"],
+                    "sampling": result["sampling"],
+                    "hits": result["hits"],
+                    "batch_peers": result.get("batch_peers", [])
+                },
+                is_complete=not result["incomplete"],
+                incomplete_reason=result["incomplete_reason"],
+                # Incomplete scans did not cover the whole corpus, so they cannot be re-scanned incrementally
+                indexed_until=None if result["incomplete"] else scan_started_at
+            )
+            db_service.create_scan_resources(scan_result.id, result["sources"])
+
+        # The next files of the batch must find this one; by now commitWithin has usually applied
+        if not is_in_solr:
+            with profile_stage('visibility_wait'):
+                CommitCoordinator().wait_for_visibility(sha1_file)
+
+        db_service.update_scan_status(scan_status_id=scan_status_id, status='completed', finished_date=datetime.utcnow())
+        progress.finish()
+        logger.info("Successfully processed file: %s", filename,
+                    extra={"duration": round(time.monotonic() - started, 3)})
+        return "Scan completed"
+    except Exception as e:
+        logger.error("Error processing file %s: %s", filename, e)
+        db_service.update_scan_status(scan_status_id=scan_status_id, status='failed')
+        progress.finish('failed')
+        return "Scan failed"
+    finally:
+        if batch_id:
+            BatchPeerService().discard(batch_id, scan_status_id)
+        if delete_file:
+            try:
+                FileService.delete_file(file_path)
+            except Exception as e:
+                logger.warning("Failed to delete scan file %s: %s", file_path, e)
+
+
+@celery.task
+def rescan_scan_result(scan_status_id) -> str:
+    """Re-scan a stored result against the documents indexed since it was produced"""
+    with log_context(scan_id=scan_status_id):
+        db_service = DatabaseService()
+        progress = ProgressReporter.for_scan(scan_status_id)
+        started = time.monotonic()
+        try:
+            if not db_service.start_scan_status(scan_status_id):
+                logger.info("Re-scan %s was cancelled before it started", scan_status_id)
+                progress.finish('cancelled')
+                return "Re-scan cancelled"
+
+            progress.stage('extracting')
+            started_at = datetime.utcnow()
+            previous = db_service.get_latest_scan_result(scan_status_id)
+            document = db_service.get_scan_status(scan_status_id).document
+            output_data = previous.output_data or {}
+
+            with open(document.file_path, 'rb') as f:
+                content = f.read()
+
+            scan_service = ScanService()
+            text = scan_service.extract_document(document.file_name, content, document.mimetype)
+            indexed_since = previous.indexed_until - timedelta(seconds=Config.RESCAN_INDEX_LAG) \
+                if previous.indexed_until else None
+
+            result = scan_service.rescan_document(
+                text, document.file_hash, previous.exp_min, previous.exp_max, previous.multi_source,
+                previous_hits=output_data.get("hits"),
+                previous_sources=[
+                    {"id": resource.source_id, "name": resource.name, "description": resource.description}
+                    for resource in previous.scan_resources
+                ],
+                indexed_since=indexed_since,
+                samples_total=output_data.get("sampling", {}).get("samples_total"),
+                filename=document.file_name,
+                budget=ScanBudget(
+                    Config.SCAN_TIME_BUDGET,
+                    Config.SCAN_QUERY_BUDGET,
+                    cancel_check=lambda: db_service.is_scan_cancelled(scan_status_id),
+                    progress=progress
+                )
+            )
+
+            if result["incomplete_reason"] == 'cancelled':
+                logger.info("Re-scan %s was cancelled, keeping the previous result", scan_status_id)
+                progress.finish('cancelled')
+                return "Re-scan cancelled"
+
+            progress.stage('saving')
+
+            scan_result = db_service.create_scan_result(
+                status_id=scan_status_id,
+                metrics=result["metrics"],
+                parameters={
+                    "exp_min": previous.exp_min,
+                    "exp_max": previous.exp_max,
+                    "multi_source": previous.multi_source
+                },
+                output_data={
+                    "filename": document.file_name,
+                    "output": result["output"],
+                    "sampling": result["sampling"],
+                    "hits": result["hits"],
+                    "new_sources": result["new_sources"]
+                },
+                is_complete=not result["incomplete"],
+                incomplete_reason=result["incomplete_reason"],
+                version=previous.version + 1,
+                # A partial re-scan has to cover the same documents again next time
+                indexed_until=previous.indexed_until if result["incomplete"] else started_at
+            )
+            db_service.create_scan_resources(scan_result.id, result["sources"])
+            db_service.update_scan_status(scan_status_id=scan_status_id, status='completed', finished_date=datetime.utcnow())
+            # The cached "latest" result of this scan is now the previous version
+            ScanResultCache().invalidate(scan_status_id)
+            progress.finish()
+
+            logger.info("Re-scan %s stored as version %s with %s new sources",
+                        scan_status_id, scan_result.version, len(result['new_sources']),
+                        extra={"duration": round(time.monotonic() - started, 3)})
+            return "Re-scan completed"
+        except Exception as e:
+            logger.error("Re-scan %s failed: %s", scan_status_id, e)
+            db_service.update_scan_status(scan_status_id=scan_status_id, status='failed')
+            progress.finish('failed')
+            return "Re-scan failed"
+
+
+@celery.task
+def compact_storage() -> str:
+    """Scheduled retention: old outbox events and superseded scan outputs"""
+    try:
+        summary = CompactionService().run()
+        return f"Compaction done: {summary}"
+    except Exception as e:
+        logger.error("Compaction failed: %s", e)
+        return "Compaction failed"
+
+
+@celery.task
+def rebuild_boilerplate() -> str:
+    """Scheduled incremental rebuild of the boilerplate phrase table"""
+    try:
+        summary = BoilerplateService().build()
+        return f"Boilerplate table rebuilt: {summary}"
+    except Exception as e:
+        logger.error("Boilerplate rebuild failed: %s", e)
+        return "Boilerplate rebuild failed"
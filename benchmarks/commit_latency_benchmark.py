@@ -0,0 +1,117 @@
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Measures sample query latency while documents are being ingested, once with a hard commit
+after every document (the previous behaviour) and once with commitWithin only (CommitCoordinator).
+Runs against the Solr core in SOLR_URL; the benchmark documents are deleted afterwards.
+
+Usage: python benchmarks/commit_latency_benchmark.py [--docs 200] [--ingest-threads 4] [--query-threads 4]
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+import threading
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+
+WORDS = ("kinh tế quốc dân nghiên cứu phân tích dữ liệu thị trường doanh nghiệp chính sách tài chính "
+         "ngân hàng tăng trưởng đầu tư lao động việc làm giáo dục đào tạo").split()
+
+
+def random_text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(mode, args, prefix):
+    session = requests.Session()
+    stop = threading.Event()
+    latencies = []
+    latencies_lock = threading.Lock()
+    rng = random.Random(args.seed)
+
+    def query_loop(seed):
+        local_rng = random.Random(seed)
+        while not stop.is_set():
+            phrase = random_text(local_rng, 4)
+            start = time.perf_counter()
+            session.get(f"{Config.SOLR_URL}/select", params={"q": f'"{phrase}"', "rows": 1, "fl": "id"},
+                        timeout=Config.SOLR_TIMEOUT)
+            with latencies_lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    def ingest(doc_numbers):
+        for n in doc_numbers:
+            document = {
+                "id": f"{prefix}-{mode}-{n}",
+                "resource_name": f"benchmark {n}",
+                Config.SOLR_CONTENT_FIELD: random_text(rng, args.words)
+            }
+            params = {} if mode == 'hard' else {"commitWithin": Config.SOLR_COMMIT_WITHIN_MS}
+            session.post(f"{Config.SOLR_URL}/update", params=params, json=[document], timeout=Config.SOLR_TIMEOUT)
+            if mode == 'hard':
+                session.get(f"{Config.SOLR_URL}/update", params={"commit": "true"}, timeout=Config.SOLR_TIMEOUT)
+
+    queriers = [threading.Thread(target=query_loop, args=(i,), daemon=True) for i in range(args.query_threads)]
+    for thread in queriers:
+        thread.start()
+
+    # Baseline latency before the ingest burst starts
+    time.sleep(args.warmup)
+    with latencies_lock:
+        baseline = list(latencies)
+        latencies.clear()
+
+    start = time.perf_counter()
+    numbers = list(range(args.docs))
+    ingesters = [threading.Thread(target=ingest, args=(numbers[i::args.ingest_threads],))
+                 for i in range(args.ingest_threads)]
+    for thread in ingesters:
+        thread.start()
+    for thread in ingesters:
+        thread.join()
+    ingest_seconds = time.perf_counter() - start
+
+    stop.set()
+    for thread in queriers:
+        thread.join()
+
+    print(f"{mode:<6} ingest {args.docs} docs in {ingest_seconds:6.2f}s | "
+          f"baseline p50 {percentile(baseline, 50):6.1f} ms | during ingest "
+          f"p50 {percentile(latencies, 50):6.1f} p95 {percentile(latencies, 95):6.1f} "
+          f"p99 {percentile(latencies, 99):6.1f} ms ({len(latencies)} queries)")
+
+    session.post(f"{Config.SOLR_URL}/update", params={"commit": "true"},
+                 json={"delete": {"query": f'id:{prefix}-{mode}-*'}}, timeout=Config.SOLR_TIMEOUT)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--docs', type=int, default=200)
+    parser.add_argument('--words', type=int, default=3000)
+    parser.add_argument('--ingest-threads', type=int, default=4)
+    parser.add_argument('--query-threads', type=int, default=4)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    prefix = f"commitbench-{uuid.uuid4().hex[:8]}"
+    for mode in ('hard', 'soft'):
+        run(mode, args, prefix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Runs EXPLAIN on the hot-path queries of DatabaseService and the outbox processor and fails
+when one of them reads a whole table. With --seed, a scratch database is first filled with --rows rows
+per table (documents, scan_status, scan_results, scan_resources, outbox_events) so MySQL plans against
+realistic cardinalities. Run `flask db upgrade` on the database first.
+
+Usage: python benchmarks/query_plan_benchmark.py [--uri mysql+pymysql://...] [--seed] [--rows 1000000]
+       python benchmarks/query_plan_benchmark.py --create-database  (then `flask db upgrade`)
+Never point --seed at a production database. The compose `query-plan-check` service (profile `checks`)
+runs the whole sequence against a scratch database and exits non-zero on a full table scan.
+"""
+import os
+import sys
+import time
+import random
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select, insert, text, func, tuple_
+from sqlalchemy.engine import make_url
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+from app.models import Document, ScanStatus, ScanResult, ScanResource, OutboxEvent, DocumentSignature, DocumentLshBand
+
+BATCH_SIZE = 5000
+STATUSES = ('completed', 'completed', 'completed', 'failed', 'pending', 'processing', 'cancelled')
+
+
+def batches(total):
+    for start in range(0, total, BATCH_SIZE):
+        yield range(start + 1, min(start + BATCH_SIZE, total) + 1)
+
+
+def seed(engine, rows, rng):
+    documents = Document.__table__
+    scan_status = ScanStatus.__table__
+    scan_results = ScanResult.__table__
+    scan_resources = ScanResource.__table__
+    outbox_events = OutboxEvent.__table__
+    start_date = datetime(2024, 1, 1)
+
+    with engine.begin() as connection:
+        offset = connection.execute(select(func.coalesce(func.max(documents.c.id), 0))).scalar()
+
+    started = time.perf_counter()
+    for ids in batches(rows):
+        with engine.begin() as connection:
+            connection.execute(insert(documents), [{
+                "id": offset + i,
+                "research_name": f"research {offset + i}",
+                "file_name": f"file_{offset + i}.pdf",
+                "file_hash": hashlib.sha1(f"plan-{offset + i}".encode()).hexdigest(),
+                "file_path": f"original_files/file_{offset + i}.pdf",
+                "mimetype": "application/pdf",
+                "file_size": rng.randint(10_000, 5_000_000),
+                "upload_date": start_date + timedelta(seconds=rng.randint(0, 60_000_000)),
+                "is_enable": True,
+                "is_included_in_solr": True
+            } for i in ids])
+            connection.execute(insert(scan_status), [{
+                "id": offset + i,
+                "document_id": offset + i,
+                "created_scan_date": start_date + timedelta(seconds=rng.randint(0, 60_000_000)),
+                "status": rng.choice(STATUSES),
+                "batch_id": f"batch-{(offset + i) // 50:030d}"
+            } for i in ids])
+            connection.execute(insert(scan_results), [{
+                "id": offset + i,
+                "status_id": offset + i,
+                "version": 1,
+                "output_data": []
+            } for i in ids])
+            connection.execute(insert(scan_resources), [{
+                "scan_result_id": offset + i,
+                "source_id": hashlib.sha1(f"source-{i % 997}".encode()).hexdigest(),
+                "color": "#ff0000",
+                "name": f"source {i % 997}",
+                "words": 10,
+                "samples": 1
+            } for i in ids])
+            connection.execute(insert(outbox_events), [{
+                "aggregate_type": "FILE",
+                "aggregate_id": offset + i,
+                "event_type": "UPLOADED",
+                "payload": "{}",
+                "timestamp": start_date + timedelta(seconds=i),
+                # Almost every event has been handled, as in a long running deployment
+                "processed": rng.random() > 0.001,
+                "failed": False,
+                "retry_count": 0,
+                "max_retries": 3
+            } for i in ids])
+        print(f"\rseeded {ids[-1]:>9}/{rows} rows per table ({time.perf_counter() - started:6.1f}s)", end='', flush=True)
+    print()
+
+    with engine.begin() as connection:
+        for table in (documents, scan_status, scan_results, scan_resources, outbox_events):
+            connection.execute(text(f"ANALYZE TABLE {table.name}"))
+
+
+def hot_path_queries(engine):
+    documents = Document.__table__
+    scan_status = ScanStatus.__table__
+    scan_results = ScanResult.__table__
+    scan_resources = ScanResource.__table__
+    outbox_events = OutboxEvent.__table__
+    signatures = DocumentSignature.__table__
+    lsh_bands = DocumentLshBand.__table__
+
+    with engine.connect() as connection:
+        max_id = connection.execute(select(func.coalesce(func.max(documents.c.id), 1))).scalar()
+    some_id = max(1, max_id // 2)
+
+    page = select(documents.c.id).order_by(
+        documents.c.upload_date.desc(), documents.c.id.desc()
+    ).offset(1000).limit(10).subquery()
+
+    return {
+        "outbox pending events": select(outbox_events).where(
+            outbox_events.c.processed == False, outbox_events.c.failed == False  # noqa: E712, as filter_by emits it
+        ).order_by(outbox_events.c.id).limit(100),
+        "document by hash": select(documents).where(
+            documents.c.file_hash == hashlib.sha1(f"plan-{some_id}".encode()).hexdigest()
+        ),
+        "documents with scan status page": select(documents, scan_status).join(
+            page, documents.c.id == page.c.id
+        ).outerjoin(
+            scan_status, documents.c.id == scan_status.c.document_id
+        ).order_by(
+            documents.c.upload_date.desc(), documents.c.id.desc(), scan_status.c.created_scan_date.desc()
+        ),
+        "document count": select(func.count(documents.c.id)),
+        "latest scan result": select(scan_results).where(
+            scan_results.c.status_id == some_id
+        ).order_by(scan_results.c.version.desc()).limit(1),
+        "scan resources of a result": select(scan_resources).where(scan_resources.c.scan_result_id == some_id),
+        "scan status by id": select(scan_status.c.status).where(scan_status.c.id == some_id),
+        "cancel scans of a batch": select(scan_status).where(
+            scan_status.c.status.in_(['pending', 'processing']),
+            scan_status.c.batch_id == f"batch-{some_id // 50:030d}"
+        ),
+        "document signature": select(signatures).where(signatures.c.document_id == some_id),
+        "lsh band candidates": select(lsh_bands.c.document_id).where(
+            tuple_(lsh_bands.c.band_index, lsh_bands.c.band_hash).in_([(0, 1), (1, 2), (2, 3)])
+        ).distinct()
+    }
+
+
+def explain(engine, queries):
+    full_scans = []
+    with engine.connect() as connection:
+        for name, query in queries.items():
+            sql = str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+            plan = connection.execute(text(f"EXPLAIN {sql}")).mappings().all()
+
+            started = time.perf_counter()
+            connection.execute(text(sql)).fetchall()
+            elapsed = (time.perf_counter() - started) * 1000
+
+            steps = []
+            for row in plan:
+                table, access = row["table"], row["type"]
+                # Extra shows the filesorts and temporary tables an index did not avoid
+                extra = f", {row['Extra']}" if row.get("Extra") else ""
+                steps.append(f"{table}:{access}({row['key'] or '-'}, rows={row['rows']}{extra})")
+                # <derivedN> is the already limited documents page
+                if access == "ALL" and table and not table.startswith('<'):
+                    full_scans.append(f"{name} -> {table}")
+            print(f"{name:<34} {elapsed:8.2f} ms  " + "  ".join(steps))
+    return full_scans
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--uri', default=Config.SQLALCHEMY_DATABASE_URI)
+    parser.add_argument('--seed', action='store_true', help='insert --rows rows per table before explaining')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--random-seed', type=int, default=1)
+    parser.add_argument('--create-database', action='store_true', help='create the database of --uri and exit')
+    args = parser.parse_args()
+
+    if args.create_database:
+        url = make_url(args.uri)
+        server = create_engine(url.set(database=None))
+        with server.begin() as connection:
+            connection.execute(text(f"CREATE DATABASE IF NOT EXISTS `{url.database}` CHARACTER SET utf8mb4"))
+        print(f"Database {url.database} ready, run `flask db upgrade` next")
+        return
+
+    engine = create_engine(args.uri)
+    if args.seed:
+        seed(engine, args.rows, random.Random(args.random_seed))
+
+    full_scans = explain(engine, hot_path_queries(engine))
+    if full_scans:
+        print("Full table scans:\n  " + "\n  ".join(full_scans))
+        sys.exit(1)
+    print("No full table scans")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Scans the same files with full and with adaptive sampling against the Solr core in
+SOLR_URL and reports, per file, the queries each mode sent and how closely the adaptive highlights
+match the full ones (recall: share of the full highlighted characters that adaptive also highlights,
+precision: share of the adaptive highlighted characters that full also highlights). Pick files that
+are known to be partly copied from the indexed corpus, a file with no hits measures nothing.
+
+Usage: python benchmarks/sampling_benchmark.py FILE [FILE ...] [--expmin 3] [--expmax 5] [--multisource]
+"""
+import os
+import sys
+import time
+import hashlib
+import argparse
+import mimetypes
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_worker_app
+from app.services.scan_service import ScanService, ScanBudget
+
+
+def scan(scan_service, document, sha1_file, args, mode):
+    start = time.perf_counter()
+    result = scan_service.process_document(document, sha1_file, args.expmin, args.expmax, args.multisource,
+                                           exclude_id=sha1_file, sampling_mode=mode, budget=ScanBudget())
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--expmin', type=int, default=3)
+    parser.add_argument('--expmax', type=int, default=5)
+    parser.add_argument('--multisource', action='store_true')
+    args = parser.parse_args()
+
+    app = create_worker_app()
+    with app.app_context():
+        scan_service = ScanService()
+        recalls, precisions = [], []
+        for path in args.files:
+            with open(path, 'rb') as f:
+                content = f.read()
+            filename = os.path.basename(path)
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            sha1_file = hashlib.sha1(content).hexdigest()
+            document = scan_service.extract_document(filename, content, mimetype)
+
+            full, full_seconds = scan(scan_service, document, sha1_file, args, 'full')
+            adaptive, adaptive_seconds = scan(scan_service, document, sha1_file, args, 'adaptive')
+            quality = ScanService.compare_highlights(full["output"], adaptive["output"])
+            recalls.append(quality["recall"])
+            precisions.append(quality["precision"])
+
+            print(f"{filename[:40]:<40} {full['sampling']['samples_total']:6d} samples | "
+                  f"full {full['sampling']['queries']:6d} queries {full_seconds:7.2f}s | "
+                  f"adaptive {adaptive['sampling']['queries']:6d} queries {adaptive_seconds:7.2f}s "
+                  f"({adaptive['sampling']['samples_queried']} samples) | "
+                  f"recall {quality['recall']:.3f} precision {quality['precision']:.3f}")
+
+        print(f"mean recall {sum(recalls) / len(recalls):.3f} mean precision {sum(precisions) / len(precisions):.3f} "
+              f"over {len(recalls)} files")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Measures process startup: importing the app package and building the web app (create_app)
+and the worker app (create_worker_app), each in fresh interpreters. Fails when the median exceeds the
+budget or when a module that should be imported lazily is already loaded after startup. Needs no
+database, Solr or Redis: nothing connects at startup.
+
+Usage: python benchmarks/startup_benchmark.py [--runs 5] [--web-budget 1.5] [--worker-budget 1.0] [--importtime 15]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "import": "import app",
+    "web": "from app import create_app; create_app()",
+    "worker": "from app import create_worker_app; create_worker_app()",
+}
+
+# Modules only some requests need; none of them may be loaded by startup alone
+LAZY_MODULES = {
+    "import": ["openpyxl", "pysolr", "flask_restful", "flask_cors", "celery", "kombu"],
+    "web": ["openpyxl", "pysolr"],
+    "worker": ["openpyxl", "pysolr", "flask_restful", "flask_cors", "app.api.routes"],
+}
+
+PROBE = """
+import sys, json, time
+started = time.perf_counter()
+{code}
+seconds = time.perf_counter() - started
+print(json.dumps({{"seconds": seconds, "modules": len(sys.modules),
+                   "loaded": [name for name in {lazy!r} if name in sys.modules]}}))
+"""
+
+
+def environment():
+    env = dict(os.environ)
+    # Keep the benchmark from writing app.log
+    env.setdefault("LOG_SINKS", "console")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def measure(target, runs):
+    probe = PROBE.format(code=TARGETS[target], lazy=LAZY_MODULES[target])
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, env=environment(),
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def top_imports(target, count):
+    """Slowest imports by cumulative time, from python -X importtime"""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", TARGETS[target]], cwd=ROOT,
+                            env=environment(), capture_output=True, text=True, check=True).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=1.0, help="seconds, median of `import app`")
+    parser.add_argument("--web-budget", type=float, default=1.5, help="seconds, median of create_app()")
+    parser.add_argument("--worker-budget", type=float, default=1.0, help="seconds, median of create_worker_app()")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="also print the N slowest imports")
+    args = parser.parse_args()
+
+    budgets = {"import": args.import_budget, "web": args.web_budget, "worker": args.worker_budget}
+    failed = False
+    for target in TARGETS:
+        results = measure(target, args.runs)
+        median = statistics.median(result["seconds"] for result in results)
+        loaded = sorted({name for result in results for name in result["loaded"]})
+        over_budget = median > budgets[target]
+        failed = failed or over_budget or bool(loaded)
+
+        print(f"{target:>7}: median {median * 1000:7.1f} ms (budget {budgets[target] * 1000:.0f} ms), "
+              f"min {min(r['seconds'] for r in results) * 1000:.1f} ms, {results[0]['modules']} modules"
+              f"{'  OVER BUDGET' if over_budget else ''}")
+        if loaded:
+            print(f"         loaded at startup but should be lazy: {', '.join(loaded)}")
+
+        if args.importtime:
+            for cumulative_us, self_us, name in top_imports(target, args.importtime):
+                print(f"         {cumulative_us / 1000:8.1f} ms cumulative {self_us / 1000:7.1f} ms self  {name}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
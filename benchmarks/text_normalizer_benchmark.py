@@ -0,0 +1,140 @@
+"""
+Author: Khanh Trong Do
+Created: 19-10-2026
+Description: Checks that TextNormalizer produces the same documents, samples and Solr queries as the
+previous regex based cleanup (kept below as legacy_*), and compares their speed.
+
+Usage: python benchmarks/text_normalizer_benchmark.py [--words 200000] [--seed 1]
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.text_normalizer import TextNormalizer
+from app.services.scan_service import ScanService, _sample_pattern
+
+
+def legacy_clean_pdf_text(text):
+    if not text:
+        return text
+    text = re.sub(r'\x00', '', text)
+    text = re.sub(r'[\x01-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
+    text = re.sub(r'\ufeff', '', text)
+    text = re.sub(r'[\u200b-\u200f\u2028-\u202f\u205f-\u206f]', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def legacy_clean_search_sample(sample):
+    if not sample:
+        return sample
+    sample = re.sub(r'[^\w\s\.,;:!?\-\'\"()]', ' ', sample)
+    sample = re.sub(r'\s+', ' ', sample)
+    sample = sample.strip()
+    if len(sample) < 3 or len(sample) > 1000:
+        return ""
+    return sample
+
+
+def legacy_escape_solr_text(text):
+    if not text:
+        return text
+    text = re.sub(r'[^\w\s\.,;:!?\-\'\"()]', ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return re.sub(r'([+\-&|!(){}\[\]^"\'~*?:/\\])', r'\\\1', text)
+
+
+def legacy_extract_samples(document, expmin, expmax):
+    samples = []
+    lines = [line.strip() for line in document.split('\n') if line.strip()]
+    pattern = _sample_pattern(expmin, expmax)
+    for line_num, text in enumerate(lines, 1):
+        line_start = 0
+        while True:
+            match = pattern.search(text[line_start:])
+            if not match:
+                break
+            sample = legacy_clean_search_sample(match.group(0).strip())
+            if sample and len(sample.strip()) >= 3:
+                samples.append((sample, line_num, line_start + match.start(), line_start + match.end()))
+            line_start += match.end()
+    return samples
+
+
+def legacy_pipeline(text, expmin, expmax):
+    document = legacy_clean_pdf_text(text)
+    return [legacy_escape_solr_text(item[0]) for item in legacy_extract_samples(document, expmin, expmax)]
+
+
+def new_pipeline(scan_service, text, expmin, expmax):
+    document = TextNormalizer.clean_document(text, join_lines=True)
+    return [TextNormalizer.escape_query(item['sample'])
+            for item in scan_service.extract_samples(document, expmin, expmax)]
+
+
+WORDS = ['đạo', 'văn', 'nghiên', 'cứu', 'kinh', 'tế', 'quốc', 'dân', 'data', 'model', 'analysis',
+         'Việt', 'Nam', '2024', 'x1', 'A.I', 'e-mail', "don't", 'C++', 'a/b', '(note)', '"quote"',
+         '50%', '[1]', '{x}', '~', '*', 'a:b', 'q?', 'yes!', '—', '…', 'ﬁ', '①']
+NOISE = ['\x00', '\x07', '\x0b', '\x0c', '\x1c', '\x7f', '\ufeff', '\u200b', '\u200e', '\u2028',
+         '\u202f', '\u2060', '\t', '\r', '\n', '\n\n', '  ', '\x85', '\u3000', '\xa0', ', ', '. ', ' - ']
+
+
+def generate_text(word_count, rng):
+    parts = []
+    for _ in range(word_count):
+        parts.append(rng.choice(WORDS))
+        parts.append(rng.choice(NOISE) if rng.random() < 0.15 else ' ')
+    return ''.join(parts)
+
+
+def check_equivalence(scan_service, rng, cases=300):
+    for case in range(cases):
+        text = generate_text(rng.randint(0, 400), rng)
+        expected_document = legacy_clean_pdf_text(text)
+        assert TextNormalizer.clean_document(text, join_lines=True) == expected_document, case
+        assert ' '.join(TextNormalizer.clean_document(text).split()) == expected_document, case
+        assert TextNormalizer.query_text(text) == legacy_escape_solr_text(text), case
+
+        expmin = rng.randint(1, 6)
+        expmax = expmin + rng.randint(0, 4)
+        assert new_pipeline(scan_service, text, expmin, expmax) == legacy_pipeline(text, expmin, expmax), case
+
+        # Line preserving cleanup keeps the samples of the legacy cleanup applied line by line
+        document = TextNormalizer.clean_document(text)
+        legacy_samples = [item[0] for item in legacy_extract_samples(document, expmin, expmax)]
+        assert [item['sample'] for item in scan_service.extract_samples(document, expmin, expmax)] == legacy_samples
+    print(f"equivalence: {cases} random documents OK")
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<10} {time.perf_counter() - start:8.3f} s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--words', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    scan_service = ScanService.__new__(ScanService)  # extract_samples does not need Solr
+    check_equivalence(scan_service, rng)
+
+    text = generate_text(args.words, rng)
+    print(f"document: {args.words} words, {len(text)} characters")
+    legacy = timed("legacy", legacy_pipeline, text, 3, 5)
+    new = timed("new", new_pipeline, scan_service, text, 3, 5)
+    assert legacy == new
+    print(f"samples: {len(new)}")
+
+
+if __name__ == '__main__':
+    main()
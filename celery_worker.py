@@ -1,7 +1,33 @@
-from app import create_app
+import argparse
+
+from app import create_worker_app
+from app.config import Config
 from app.extensions import celery
 
-app = create_app()
+app = create_worker_app()
 
 if __name__ == "__main__":
-    celery.worker_main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run a Celery worker for one or more queues")
+    parser.add_argument('--queues', default=','.join(Config.CELERY_QUEUE_CONCURRENCY),
+                        help='comma separated: interactive, bulk, indexing, maintenance')
+    parser.add_argument('--concurrency', type=int, help='defaults to the sum of CELERY_*_CONCURRENCY of the queues')
+    parser.add_argument('--prefetch-multiplier', type=int, help='defaults to the lowest CELERY_*_PREFETCH of the queues')
+    parser.add_argument('--name', help='worker node name, defaults to the first queue')
+    args = parser.parse_args()
+
+    queues = [queue for queue in args.queues.split(',') if queue]
+    unknown = [queue for queue in queues if queue not in Config.CELERY_QUEUE_CONCURRENCY]
+    if not queues or unknown:
+        parser.error(f"unknown queues: {', '.join(unknown)}" if unknown else "no queue given")
+
+    concurrency = args.concurrency or sum(Config.CELERY_QUEUE_CONCURRENCY[queue] for queue in queues)
+    prefetch = args.prefetch_multiplier or min(Config.CELERY_QUEUE_PREFETCH[queue] for queue in queues)
+    # -O fair hands a task to a process only when it is free, so a long scan never blocks a reserved one
+    celery.worker_main([
+        'worker', '--loglevel=info',
+        '-Q', ','.join(queues),
+        '--concurrency', str(concurrency),
+        '--prefetch-multiplier', str(prefetch),
+        '-O', 'fair',
+        '-n', f"{args.name or queues[0]}@%h"
+    ])
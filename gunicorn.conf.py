@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import Config
+
+# Gunicorn settings, overridable through the environment.
+# The AI scan service runs with GUNICORN_WORKER_CLASS=gevent: each worker then serves many
+# /api/file-search/ai/ask requests concurrently while they wait on Solr.
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '1'))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '200'))
+
+# A synchronous scan may use its whole time budget before it answers, so the worker timeout is derived
+# from the budgets; the margin covers extraction and building the output, which they do not bound.
+# An unlimited budget (0) disables the timeout.
+_scan_budgets = (Config.SCAN_TIME_BUDGET, Config.AI_SCAN_TIME_BUDGET)
+_scan_timeout = 0 if 0 in _scan_budgets else max(_scan_budgets) + int(os.getenv('GUNICORN_TIMEOUT_MARGIN', '60'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', str(_scan_timeout)))
+
+
+def on_starting(server):
+    if timeout and (not _scan_timeout or timeout < _scan_timeout):
+        server.log.warning("GUNICORN_TIMEOUT=%s is shorter than the scan time budgets %s: workers may be "
+                           "killed before a synchronous scan returns its partial result", timeout, _scan_budgets)
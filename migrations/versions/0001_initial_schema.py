@@ -0,0 +1,169 @@
+"""initial schema
+
+Tables as db.create_all() used to create them. Tables that already exist are left alone, so a
+database created before migrations were introduced can simply be upgraded.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _missing(table_name):
+    return not sa.inspect(op.get_bind()).has_table(table_name)
+
+
+def upgrade():
+    if _missing('users'):
+        op.create_table(
+            'users',
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('username', sa.String(length=50), nullable=False),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('password', sa.String(length=128), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('birth_date', sa.Date(), nullable=True),
+            sa.Column('address', sa.String(length=255), nullable=True),
+            sa.Column('phone', sa.String(length=20), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('username'),
+            sa.UniqueConstraint('email')
+        )
+
+    if _missing('documents'):
+        op.create_table(
+            'documents',
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('research_name', sa.String(length=255), nullable=False),
+            sa.Column('file_name', sa.String(length=255), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('file_hash', sa.String(length=70), nullable=False),
+            sa.Column('file_path', sa.String(length=500), nullable=True),
+            sa.Column('mimetype', sa.String(length=100), nullable=True),
+            sa.Column('file_size', sa.BigInteger(), nullable=True),
+            sa.Column('upload_date', sa.DateTime(), nullable=True),
+            sa.Column('author', sa.String(length=100), nullable=True),
+            sa.Column('is_enable', sa.Boolean(), nullable=True),
+            sa.Column('is_included_in_solr', sa.Boolean(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('file_hash')
+        )
+
+    if _missing('outbox_events'):
+        op.create_table(
+            'outbox_events',
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('aggregate_type', sa.String(length=255), nullable=False),
+            sa.Column('aggregate_id', sa.BigInteger(), nullable=False),
+            sa.Column('event_type', sa.String(length=255), nullable=False),
+            sa.Column('payload', sa.Text(), nullable=False),
+            sa.Column('timestamp', sa.DateTime(), nullable=False),
+            sa.Column('processed', sa.Boolean(), nullable=True),
+            sa.Column('failed', sa.Boolean(), nullable=False),
+            sa.Column('error_message', sa.Text(), nullable=True),
+            sa.Column('retry_count', sa.Integer(), nullable=True),
+            sa.Column('max_retries', sa.Integer(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if _missing('scan_status'):
+        op.create_table(
+            'scan_status',
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('document_id', sa.BigInteger(), nullable=False),
+            sa.Column('created_scan_date', sa.DateTime(), nullable=True),
+            sa.Column('finished_scan_date', sa.DateTime(), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.ForeignKeyConstraint(['document_id'], ['documents.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if _missing('scan_results'):
+        op.create_table(
+            'scan_results',
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('status_id', sa.BigInteger(), nullable=False),
+            sa.Column('chars_doctotal', sa.Integer(), nullable=True),
+            sa.Column('chars_scanned', sa.Integer(), nullable=True),
+            sa.Column('chars_copied', sa.Integer(), nullable=True),
+            sa.Column('chars_original', sa.Integer(), nullable=True),
+            sa.Column('chars_original_ratio', sa.Float(), nullable=True),
+            sa.Column('words_doctotal', sa.Integer(), nullable=True),
+            sa.Column('words_scanned', sa.Integer(), nullable=True),
+            sa.Column('words_copied', sa.Integer(), nullable=True),
+            sa.Column('words_original', sa.Integer(), nullable=True),
+            sa.Column('words_original_ratio', sa.Float(), nullable=True),
+            sa.Column('samples_scanned', sa.Integer(), nullable=True),
+            sa.Column('samples_copied', sa.Integer(), nullable=True),
+            sa.Column('samples_original', sa.Integer(), nullable=True),
+            sa.Column('samples_original_ratio', sa.Float(), nullable=True),
+            sa.Column('exp_min', sa.Integer(), nullable=True),
+            sa.Column('exp_max', sa.Integer(), nullable=True),
+            sa.Column('multi_source', sa.Boolean(), nullable=True),
+            sa.Column('output_data', sa.JSON(), nullable=True),
+            sa.ForeignKeyConstraint(['status_id'], ['scan_status.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if _missing('scan_resources'):
+        op.create_table(
+            'scan_resources',
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('scan_result_id', sa.BigInteger(), nullable=False),
+            sa.Column('source_id', sa.String(length=255), nullable=False),
+            sa.Column('color', sa.String(length=20), nullable=False),
+            sa.Column('name', sa.String(length=255), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('words', sa.Integer(), nullable=True),
+            sa.Column('samples', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['scan_result_id'], ['scan_results.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if _missing('document_signatures'):
+        op.create_table(
+            'document_signatures',
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('document_id', sa.BigInteger(), nullable=False),
+            sa.Column('signature', sa.LargeBinary(), nullable=False),
+            sa.Column('num_perm', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['document_id'], ['documents.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('document_id')
+        )
+
+    if _missing('document_lsh_bands'):
+        op.create_table(
+            'document_lsh_bands',
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('signature_id', sa.BigInteger(), nullable=False),
+            sa.Column('document_id', sa.BigInteger(), nullable=False),
+            sa.Column('band_index', sa.SmallInteger(), nullable=False),
+            sa.Column('band_hash', sa.BigInteger(), nullable=False),
+            sa.ForeignKeyConstraint(['signature_id'], ['document_signatures.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_document_lsh_bands_band', 'document_lsh_bands', ['band_index', 'band_hash'])
+
+
+def downgrade():
+    op.drop_table('document_lsh_bands')
+    op.drop_table('document_signatures')
+    op.drop_table('scan_resources')
+    op.drop_table('scan_results')
+    op.drop_table('scan_status')
+    op.drop_table('outbox_events')
+    op.drop_table('documents')
+    op.drop_table('users')
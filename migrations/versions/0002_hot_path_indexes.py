@@ -0,0 +1,62 @@
+"""hot path indexes
+
+Columns added to the models after their tables were first created (db.create_all() never altered
+existing tables), and composite indexes for the queries of DatabaseService and the outbox processor:
+
+- outbox_events (processed, failed, id): pending event poll, oldest first
+- documents (upload_date): document list page, newest first
+- scan_status (document_id, created_scan_date): scan statuses of a document, latest first
+- scan_status (batch_id): scans of a multiple file search
+- scan_results (status_id, version): latest result version of a scan
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    ('scan_status', sa.Column('batch_id', sa.String(length=36), nullable=True)),
+    ('scan_results', sa.Column('is_complete', sa.Boolean(), nullable=True)),
+    ('scan_results', sa.Column('incomplete_reason', sa.String(length=30), nullable=True)),
+    ('scan_results', sa.Column('version', sa.Integer(), nullable=False, server_default='1')),
+    ('scan_results', sa.Column('indexed_until', sa.DateTime(), nullable=True)),
+]
+
+INDEXES = [
+    ('ix_outbox_events_pending', 'outbox_events', ['processed', 'failed', 'id']),
+    ('ix_documents_upload_date', 'documents', ['upload_date']),
+    ('ix_scan_status_document_created', 'scan_status', ['document_id', 'created_scan_date']),
+    ('ix_scan_status_batch_id', 'scan_status', ['batch_id']),
+    ('ix_scan_results_status_version', 'scan_results', ['status_id', 'version']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    for table_name, column in COLUMNS:
+        if column.name not in {c['name'] for c in inspector.get_columns(table_name)}:
+            op.add_column(table_name, column)
+
+    for index_name, table_name, columns in INDEXES:
+        # Databases booted with db.create_all() after the models declared the index already have it
+        if index_name not in {i['name'] for i in inspector.get_indexes(table_name)}:
+            op.create_index(index_name, table_name, columns)
+
+
+def downgrade():
+    # MySQL needs an index on every foreign key column; keep single column ones in place of the composites
+    op.create_index('ix_scan_status_document_id', 'scan_status', ['document_id'])
+    op.create_index('ix_scan_results_status_id', 'scan_results', ['status_id'])
+    for index_name, table_name, _ in reversed(INDEXES):
+        op.drop_index(index_name, table_name=table_name)
@@ -0,0 +1,70 @@
+"""retention and scan output archive
+
+Index for the outbox retention job, superseded/archived flags on scan_results and the compressed
+scan_result_archives table. Results that were already superseded are marked so the first
+compaction run archives them.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    scan_result_columns = {c['name'] for c in inspector.get_columns('scan_results')}
+
+    if 'superseded_at' not in scan_result_columns:
+        op.add_column('scan_results', sa.Column('superseded_at', sa.DateTime(), nullable=True))
+    if 'is_archived' not in scan_result_columns:
+        op.add_column('scan_results', sa.Column('is_archived', sa.Boolean(), nullable=False,
+                                                server_default=sa.false()))
+
+    if not inspector.has_table('scan_result_archives'):
+        op.create_table(
+            'scan_result_archives',
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('scan_result_id', sa.BigInteger(), nullable=False),
+            sa.Column('output_data', sa.LargeBinary(length=2**32 - 1), nullable=False),
+            sa.Column('original_size', sa.BigInteger(), nullable=False),
+            sa.Column('compressed_size', sa.BigInteger(), nullable=False),
+            sa.Column('archived_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['scan_result_id'], ['scan_results.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('scan_result_id')
+        )
+
+    indexes = {
+        'outbox_events': {i['name'] for i in inspector.get_indexes('outbox_events')},
+        'scan_results': {i['name'] for i in inspector.get_indexes('scan_results')}
+    }
+    if 'ix_outbox_events_retention' not in indexes['outbox_events']:
+        op.create_index('ix_outbox_events_retention', 'outbox_events', ['processed', 'failed', 'timestamp'])
+    if 'ix_scan_results_archive_queue' not in indexes['scan_results']:
+        op.create_index('ix_scan_results_archive_queue', 'scan_results', ['is_archived', 'superseded_at'])
+
+    op.execute("""
+        UPDATE scan_results old
+        JOIN (SELECT status_id, MAX(version) AS latest FROM scan_results GROUP BY status_id) latest
+          ON latest.status_id = old.status_id
+        SET old.superseded_at = UTC_TIMESTAMP()
+        WHERE old.version < latest.latest AND old.superseded_at IS NULL
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_scan_results_archive_queue', table_name='scan_results')
+    op.drop_index('ix_outbox_events_retention', table_name='outbox_events')
+    op.drop_table('scan_result_archives')
+    op.drop_column('scan_results', 'is_archived')
+    op.drop_column('scan_results', 'superseded_at')
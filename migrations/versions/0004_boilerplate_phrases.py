@@ -0,0 +1,38 @@
+"""boilerplate phrases
+
+Table of corpus phrases with a high document frequency, filled by `flask boilerplate-build`.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('boilerplate_phrases'):
+        op.create_table(
+            'boilerplate_phrases',
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('phrase_hash', sa.BigInteger(), nullable=False),
+            sa.Column('phrase', sa.String(length=255), nullable=False),
+            sa.Column('document_frequency', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('phrase_hash')
+        )
+
+
+def downgrade():
+    op.drop_table('boilerplate_phrases')
@@ -0,0 +1,44 @@
+"""scan profiles
+
+Stored profiles of scans run with the admin profiling switch.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('scan_profiles'):
+        op.create_table(
+            'scan_profiles',
+            sa.Column('id', sa.BigInteger(), nullable=False),
+            sa.Column('scan_id', sa.String(length=64), nullable=False),
+            sa.Column('source', sa.String(length=32), nullable=False),
+            sa.Column('filename', sa.String(length=255), nullable=True),
+            sa.Column('total_seconds', sa.Float(), nullable=False),
+            sa.Column('stages', sa.JSON(), nullable=False),
+            sa.Column('samples', sa.Integer(), nullable=False),
+            sa.Column('collapsed_stacks', sa.LargeBinary(length=2**24 - 1), nullable=False),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_scan_profiles_scan_id', 'scan_profiles', ['scan_id', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_scan_profiles_scan_id', table_name='scan_profiles')
+    op.drop_table('scan_profiles')